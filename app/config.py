@@ -15,6 +15,15 @@ PORT = int(os.getenv("PORT", 8000))
 # Security
 SECRET_KEY = os.getenv("SECRET_KEY", "you-should-change-this")
 
+# Sessions
+SESSION_TTL = int(os.getenv("SESSION_TTL", 12 * 60 * 60))          # seconds a login lasts
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 5 * 60))    # seconds a cached summary lives
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 10000))
+SESSION_CACHE_SHARDS = int(os.getenv("SESSION_CACHE_SHARDS", 1))
+
+# Instrumentation: request/storage timings served at /metrics
+METRICS = os.getenv("METRICS", "false").lower() == "true"
+
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./deleteMe.db")
 
@@ -0,0 +1,224 @@
+"""Static asset build: fingerprinting, precompression and PNG optimisation.
+
+``build()`` copies ``app/static`` into ``app/build/static``:
+
+* every file is renamed with a content hash (``style.css`` ->
+  ``style.3f9a1c0b2d4e.css``) and listed in ``manifest.json``
+* text assets get ``.gz`` siblings, and ``.br`` ones when the optional
+  ``brotli`` package is installed
+* PNGs are recompressed losslessly: ancillary metadata chunks are dropped and
+  the image data is re-deflated at level 9 in a single ``IDAT``
+
+``PrecompressedStaticFiles`` serves that directory, picking the ``.br``/``.gz``
+variant the client accepts and marking hashed files ``immutable``. Templates
+reference assets through ``asset_url('style.css')``.
+
+Run ``python -m app.core.assets`` to rebuild by hand; the app also rebuilds on
+startup whenever a source was added, removed or changed since the manifest.
+Each build is written to its own ``mkdtemp`` directory beside the build dir
+and renamed into place, so server workers starting together never share a
+scratch directory.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+APP_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = APP_DIR / "static"
+BUILD_DIR = APP_DIR / "build" / "static"
+MANIFEST = "manifest.json"
+
+COMPRESSIBLE = {'.css', '.js', '.svg', '.html', '.json', '.txt', '.map'}
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Chunks that change how the image looks; everything else ancillary is dropped.
+_PNG_KEEP = {b'IHDR', b'PLTE', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT', b'IEND'}
+
+
+# -----------------------------------------------------------------------------
+# Build
+# -----------------------------------------------------------------------------
+def _png_chunks(data):
+    pos = len(_PNG_SIGNATURE)
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+def _png_chunk(kind, body):
+    return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def optimize_png(data):
+    """Lossless PNG shrink; returns ``data`` unchanged if it is not smaller."""
+    if not data.startswith(_PNG_SIGNATURE):
+        return data
+    try:
+        chunks = list(_png_chunks(data))
+        pixels = zlib.decompress(b"".join(body for kind, body in chunks if kind == b'IDAT'))
+    except (struct.error, zlib.error):
+        return data
+    out = [_PNG_SIGNATURE]
+    for kind, body in chunks:
+        if kind == b'IDAT':
+            if pixels is not None:
+                out.append(_png_chunk(b'IDAT', zlib.compress(pixels, 9)))
+                pixels = None
+        elif kind in _PNG_KEEP:
+            out.append(_png_chunk(kind, body))
+    optimized = b"".join(out)
+    return optimized if len(optimized) < len(data) else data
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _sources(source_dir):
+    for path in sorted(source_dir.rglob("*")):
+        # Skip Finder-style copies ("style 2.css") and dotfiles.
+        if path.is_file() and " " not in path.name and not path.name.startswith("."):
+            yield path
+
+
+def build(source_dir=SOURCE_DIR, build_dir=BUILD_DIR):
+    """Rebuild ``build_dir`` from ``source_dir``; return the manifest."""
+    build_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{build_dir.name}.", dir=build_dir.parent))
+    try:
+        tmp_dir.chmod(0o755)   # mkdtemp makes it private; the build is served as-is
+        manifest = _build_into(source_dir, tmp_dir)
+        _swap_in(tmp_dir, build_dir)
+    finally:
+        # Only still there if the build failed or another worker's build won the swap.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+
+def _build_into(source_dir, tmp_dir):
+    manifest = {}
+    for path in _sources(source_dir):
+        rel = path.relative_to(source_dir).as_posix()
+        data = path.read_bytes()
+        if path.suffix == '.png':
+            data = optimize_png(data)
+        hashed = fingerprint(rel, data)
+        compress = path.suffix in COMPRESSIBLE and len(data) >= MIN_COMPRESS_SIZE
+        gz = gzip.compress(data, 9, mtime=0) if compress else None
+        br = brotli.compress(data) if compress and BROTLI_AVAILABLE else None
+        # The plain name stays available for anything not yet using asset_url().
+        for name in (hashed, rel):
+            target = tmp_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            if gz:
+                target.with_name(target.name + ".gz").write_bytes(gz)
+            if br:
+                target.with_name(target.name + ".br").write_bytes(br)
+        manifest[rel] = hashed
+    (tmp_dir / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def _swap_in(new_dir, build_dir):
+    """Rename ``new_dir`` to ``build_dir``, moving any previous build out of the way first."""
+    old_dir = new_dir.with_name(new_dir.name + ".old")
+    try:
+        os.replace(build_dir, old_dir)
+    except FileNotFoundError:
+        pass
+    try:
+        os.replace(new_dir, build_dir)
+    except OSError:
+        # Another worker renamed its build in first; it came from the same sources.
+        pass
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def ensure_built(source_dir=SOURCE_DIR, build_dir=BUILD_DIR):
+    """The current manifest, rebuilt first if sources were added, removed or changed since."""
+    manifest_path = build_dir / MANIFEST
+    try:
+        built = manifest_path.stat().st_mtime
+        manifest = json.loads(manifest_path.read_text())
+        sources = list(_sources(source_dir))
+        if ({p.relative_to(source_dir).as_posix() for p in sources} == set(manifest)
+                and all(p.stat().st_mtime <= built for p in sources)):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    manifest = build(source_dir, build_dir)
+    logging.info(f"Built {len(manifest)} static assets into {build_dir}")
+    return manifest
+
+
+def asset_url_for(manifest, prefix="/static/"):
+    """Template helper: ``asset_url('style.css')`` -> ``/static/style.<hash>.css``."""
+    def asset_url(name):
+        return prefix + manifest.get(name, name)
+    return asset_url
+
+
+# -----------------------------------------------------------------------------
+# Serving
+# -----------------------------------------------------------------------------
+class PrecompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that prefers ``.br``/``.gz`` siblings and caches hashed files forever."""
+
+    def __init__(self, *args, manifest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_manifest(manifest or {})
+
+    def use_manifest(self, manifest):
+        """Serve the fingerprinted names in ``manifest`` as immutable."""
+        self.hashed = set(manifest.values())
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code != 200 or not isinstance(response, FileResponse):
+            return response
+        accepted = {token.split(";")[0].strip().lower()
+                    for token in Headers(scope=scope).get("accept-encoding", "").split(",")}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = self.lookup_path(path + suffix)
+            if stat_result is None:
+                continue
+            response = FileResponse(full_path, stat_result=stat_result,
+                                    media_type=response.media_type,
+                                    headers={"Content-Encoding": encoding})
+            break
+        response.headers["Vary"] = "Accept-Encoding"
+        if path in self.hashed:
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+
+if __name__ == "__main__":
+    for name, hashed in build().items():
+        print(f"{name} ➜ {hashed}")
+    if not BROTLI_AVAILABLE:
+        print("brotli not installed; wrote gzip only. Install with 'pip install brotli' for .br files.")
@@ -0,0 +1,93 @@
+"""In-process pub/sub for live dashboard updates.
+
+``Storage`` reports each change (one broker's status, one link verdict, new
+brokers) to ``EventBus.publish``. The change is encoded as a Server-Sent Events
+frame once and the same string is queued for every subscriber watching that
+user, plus every subscriber when the change is household-wide. Browsers apply
+the delta to the table they already have; nothing is re-rendered or re-polled.
+
+Publishing is thread-safe (storage writes run in the threadpool); delivery
+happens on the event loop. A subscriber that falls more than ``QUEUE_SIZE``
+events behind is sent a single ``resync`` event instead, telling the page to
+reload.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+
+QUEUE_SIZE = 256
+HEARTBEAT = 15.0   # seconds between keep-alive comments on idle streams
+
+_RESYNC = "event: resync\ndata: {}\n\n"
+
+
+class Subscription:
+    def __init__(self, bus, user_id):
+        self.bus = bus
+        self.user_id = user_id
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def offer(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind to catch up with deltas; swap the backlog for one resync.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_RESYNC)
+
+    async def frames(self, heartbeat=HEARTBEAT):
+        """SSE frames for this subscriber, with a comment line whenever it is idle."""
+        while True:
+            try:
+                yield await asyncio.wait_for(self.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self._loop = None
+        self._by_user = {}
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def bind(self, loop):
+        self._loop = loop
+
+    def __len__(self):
+        return sum(len(subs) for subs in self._by_user.values())
+
+    def subscribe(self, user_id):
+        sub = Subscription(self, user_id)
+        self._by_user.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        subs = self._by_user.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._by_user[sub.user_id]
+
+    def publish(self, user_id, change):
+        """Queue ``change`` for ``user_id``'s subscribers (everyone when None). Thread-safe."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        payload = dict(change, ts=time.time())
+        frame = f"id: {next(self._ids)}\nevent: {change['type']}\ndata: {json.dumps(payload)}\n\n"
+        self._loop.call_soon_threadsafe(self._deliver, user_id, frame)
+
+    def _deliver(self, user_id, frame):
+        self.published += 1
+        if user_id is None:
+            targets = [sub for subs in self._by_user.values() for sub in subs]
+        else:
+            targets = self._by_user.get(user_id, ())
+        for sub in list(targets):
+            sub.offer(frame)
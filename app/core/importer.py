@@ -0,0 +1,231 @@
+"""Incremental parsing of uploaded broker CSVs.
+
+``BrokerCSVImport`` is fed raw bytes as they arrive and hands back batches of
+validated ``{'name', 'opt_out_link'}`` rows ready for ``Storage.import_brokers``.
+Nothing beyond the current partial record and one batch is held, so a 50 MB
+registry parses in the same memory as a 5 KB one.
+
+The schema is picked from the header row:
+
+    v4  name,opt_out_link,covered_by,completed
+    v3  name,url,email,notes,covered_by,status
+
+Only the registry columns (name and link) are imported; covered_by and
+status/completed are one household member's progress, not registry data.
+Rows without a name, or whose link does not start with ``http``/``mailto:``,
+are reported by line number instead of being imported.
+"""
+
+import codecs
+import csv
+
+from app.core.metrics import timed
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+MAX_RECORD_SIZE = 64 * 1024   # longest record accepted, so an unclosed quote cannot grow forever
+
+# schema -> (name column, link column)
+SCHEMAS = {
+    'v4': ('name', 'opt_out_link'),
+    'v3': ('name', 'url'),
+}
+
+
+class CSVImportError(ValueError):
+    """The upload as a whole cannot be imported (bad encoding or unknown header)."""
+
+
+def detect_schema(header):
+    """``(schema, name index, link index)`` for a header row; CSVImportError if unknown."""
+    columns = [h.strip().lower() for h in header]
+    for schema, (name_col, link_col) in SCHEMAS.items():
+        if name_col in columns and link_col in columns:
+            return schema, columns.index(name_col), columns.index(link_col)
+    raise CSVImportError(f"Unrecognised header {','.join(header)!r}; expected "
+                         + " or ".join(f"{s} ({','.join(cols)})" for s, cols in SCHEMAS.items()))
+
+
+def _ends_quoted(line, quoted):
+    """Whether ``line`` ends inside a quoted field, following ``csv.reader``'s rules.
+
+    ``quoted`` says whether the line starts inside one. A quote only opens a
+    field as its first character; anywhere else in an unquoted field it is a
+    literal character, so counting quotes is not enough.
+    """
+    if not quoted and '"' not in line:
+        return False
+    at = 0
+    while True:
+        if quoted:
+            end = line.find('"', at)
+            if end < 0:
+                return True
+            if line.startswith('"', end + 1):     # "" escape
+                at = end + 2
+                continue
+            quoted, at = False, end + 1
+        elif line.startswith('"', at):
+            quoted, at = True, at + 1
+            continue
+        comma = line.find(',', at)
+        if comma < 0:
+            return False
+        at = comma + 1
+
+
+class _Lines:
+    """Iterator that ``csv.reader`` pulls lines from; refilled between records."""
+
+    def __init__(self):
+        self.pending = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.pending:
+            raise StopIteration
+        return self.pending.pop()
+
+
+class BrokerCSVImport:
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, max_errors=MAX_REPORTED_ERRORS):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.schema = None
+        self.rows = 0
+        self.valid = 0
+        self.error_count = 0
+        self.errors = []
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._tail = ''            # text after the last newline seen
+        self._skip_line = False    # dropping an over-long line up to its newline
+        self._record = []          # lines of a record whose quotes are still open
+        self._record_size = 0
+        self._in_quotes = False
+        self._line = 0             # physical line number of the last complete line
+        self._lines = _Lines()
+        self._reader = csv.reader(self._lines)
+        self._batch = []
+        self._columns = None
+
+    # ------------------------------------------------------------------ #
+    # Feeding
+    # ------------------------------------------------------------------ #
+    @timed("import.parse")
+    def feed(self, data):
+        """Consume the next chunk of bytes; return the batches it completed."""
+        try:
+            text = self._decoder.decode(data)
+        except UnicodeDecodeError as exc:
+            raise CSVImportError(f"Upload is not UTF-8 text ({exc.reason} near byte {exc.start})") from None
+        if self._skip_line:
+            end = text.find('\n')
+            if end < 0:
+                return []
+            text = text[end + 1:]
+            self._skip_line = False
+        if not text:
+            return []
+        lines = (self._tail + text).split('\n')
+        self._tail = lines.pop()
+        ready = []
+        for line in lines:
+            self._add_line(line + '\n', ready)
+        if len(self._tail) + self._record_size > MAX_RECORD_SIZE:
+            self._too_long()
+            self._line += 1
+            self._tail = ''
+            self._skip_line = True
+        return ready
+
+    def close(self):
+        """Flush the final line and partial batch; return the remaining batches."""
+        try:
+            self._tail += self._decoder.decode(b'', final=True)
+        except UnicodeDecodeError as exc:
+            raise CSVImportError(f"Upload ends inside a UTF-8 character ({exc.reason})") from None
+        ready = []
+        if self._tail and not self._skip_line:
+            self._add_line(self._tail, ready)
+            self._tail = ''
+        if self._record:
+            self.rows += 1
+            self._error(self._line - len(self._record) + 1, "unterminated quoted field")
+            self._record = []
+        if self._batch:
+            ready.append(self._batch)
+            self._batch = []
+        if self.schema is None:
+            raise CSVImportError("Upload is empty; expected a header row")
+        return ready
+
+    def _add_line(self, line, ready):
+        self._line += 1
+        self._record.append(line)
+        self._record_size += len(line)
+        self._in_quotes = _ends_quoted(line, self._in_quotes)
+        if self._in_quotes:
+            if self._record_size > MAX_RECORD_SIZE:
+                self._too_long()
+            return
+        start = self._line - len(self._record) + 1
+        self._lines.pending = self._record[::-1]
+        self._record, self._record_size = [], 0
+        try:
+            fields = next(self._reader, None)
+        except csv.Error as exc:
+            self._lines.pending = []
+            self._error(start, f"malformed CSV: {exc}")
+            return
+        if fields:
+            self._row(start, fields, ready)
+
+    def _too_long(self):
+        """Count the open record as a row rejected for its length, and drop it."""
+        self.rows += 1
+        self._error(self._line - len(self._record) + 1, f"record longer than {MAX_RECORD_SIZE} characters")
+        self._record, self._record_size, self._in_quotes = [], 0, False
+
+    # ------------------------------------------------------------------ #
+    # Rows
+    # ------------------------------------------------------------------ #
+    def _row(self, line, fields, ready):
+        if self.schema is None:
+            self.schema, name_at, link_at = detect_schema(fields)
+            self._columns = (name_at, link_at, len(fields))
+            return
+        self.rows += 1
+        name_at, link_at, width = self._columns
+        if len(fields) <= max(name_at, link_at):
+            self._error(line, f"expected {width} columns, got {len(fields)}")
+            return
+        name, link = fields[name_at].strip(), fields[link_at].strip()
+        if not name:
+            self._error(line, "missing broker name")
+            return
+        if not link.startswith(('http', 'mailto:')):
+            self._error(line, f"{name}: link must start with http, https or mailto:")
+            return
+        self.valid += 1
+        self._batch.append({'name': name, 'opt_out_link': link})
+        if len(self._batch) >= self.batch_size:
+            ready.append(self._batch)
+            self._batch = []
+
+    def _error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    def report(self, added):
+        return {
+            'schema': self.schema,
+            'rows': self.rows,
+            'imported': self.valid,
+            'added': added,
+            'rejected': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
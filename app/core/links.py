@@ -0,0 +1,40 @@
+"""Link health for the web registry.
+
+``check_registry`` runs the v4 link checker (``deleteMe_v4/link_checker.py``,
+through ``app.core.v4``) over every registry broker and records each changed
+verdict with ``Storage.set_link_health``, which pushes a ``link`` event to the
+open dashboards. The conditional-request cache is kept by the caller between
+runs, so a repeat check is mostly 304s.
+"""
+
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core import v4  # noqa: F401  (makes the v4 modules importable)
+import link_checker
+
+AVAILABLE = link_checker.AIOHTTP_AVAILABLE
+
+
+async def check_registry(storage, cache, **kwargs):
+    """Check every registry link; return how many brokers' ``link_health`` changed."""
+    brokers = await run_in_threadpool(_all_brokers, storage)
+    results = await link_checker.check_links([b['opt_out_link'] for b in brokers], cache, **kwargs)
+    changed = 0
+    for b in brokers:
+        result = results.get(b['opt_out_link'].strip())
+        if result and result['health'] != b['link_health']:
+            changed += await run_in_threadpool(storage.set_link_health, b['id'], result['health'])
+    logging.info(f"Link check: {len(results)} links, {changed} brokers changed health")
+    return changed
+
+
+def _all_brokers(storage, chunk=1000):
+    brokers, after = [], 0
+    while True:
+        page = storage.brokers_page(after, chunk)
+        brokers += page
+        if len(page) < chunk:
+            return brokers
+        after = page[-1]['id']
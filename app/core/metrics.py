@@ -0,0 +1,57 @@
+"""Request and storage timings, exported in the Prometheus text format.
+
+The recorder itself is the v4 CLI's ``instrument`` module, re-exported here:
+``@timed("storage.user_brokers_page")`` and ``with span(...)`` record call
+count, total and longest time under a name; ``count(...)`` bumps a counter;
+``prometheus()`` renders them. The CLI runs standalone and cannot import this
+package, so the app imports it instead (see ``app.core.v4``) and both programs
+share one implementation. ``MetricsMiddleware`` times every request under its
+route template (for example ``GET /users/{user_id}/brokers``), up to the last
+body chunk, so streamed pages are measured in full.
+
+Everything is off unless ``METRICS=true``. In that case the app adds the
+middleware and serves ``GET /metrics``; otherwise a ``timed`` wrapper costs
+one global lookup and a branch.
+"""
+
+import time
+
+from app.core import v4  # noqa: F401  (makes the v4 modules importable)
+import instrument
+from instrument import count, enable, prometheus, record, reset, snapshot, span, timed  # noqa: F401
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def enabled():
+    return instrument.ENABLED
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request under ``"<METHOD> <route path>"``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not instrument.ENABLED:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            path = getattr(scope.get("route"), "path", None)
+            if path is None:
+                # Mounted apps (static files) only leave their mount point behind.
+                path = scope.get("root_path") if scope.get("endpoint") else "unmatched"
+            record(f"{scope['method']} {path}", time.perf_counter() - start)
+            count(f"http_{status // 100}xx")
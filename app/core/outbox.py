@@ -0,0 +1,415 @@
+"""Persistent outbox for emailing opt-out requests.
+
+Messages are queued in the app's SQLite database (``DATABASE_URL``) and sent by a
+background worker, so anything still queued when the server stops goes out after
+the next start. Delivery goes through a small pool of SMTP connections that stay
+open and logged in between messages; each one sends queued mail back to back
+instead of reconnecting per message.
+
+Several outboxes (one per server worker) can share the table. A message is
+claimed with a conditional UPDATE inside ``BEGIN IMMEDIATE``, so only one of them
+sends it, and the claim is a lease: while a row is 'sending', ``next_attempt``
+holds the time the lease runs out. A row is only requeued at startup once its
+lease has expired, so a restart never resends mail another worker is sending.
+
+Each recipient domain gets at most one message every ``domain_interval`` seconds.
+Temporary failures (4xx replies, dropped connections) are retried with
+exponential backoff; 5xx replies and exhausted retries mark the message failed.
+"""
+
+import logging
+import queue
+import random
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from urllib.parse import unquote, urlsplit
+
+from app import config
+from app.core.metrics import timed
+from app.core.storage import sqlite_path
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_DOMAIN_INTERVAL = 5.0     # seconds between messages to one recipient domain
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BACKOFF = 60.0            # first retry delay, doubled per attempt
+MAX_BACKOFF = 6 * 60 * 60
+LEASE = 10 * 60                   # seconds a claimed message stays 'sending' before it may be resent
+IDLE_CHECK = 60.0                 # NOOP a pooled connection idle longer than this
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY,
+    recipient    TEXT NOT NULL,
+    domain       TEXT NOT NULL,
+    subject      TEXT NOT NULL,
+    body         TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,   -- lease expiry while status = 'sending'
+    last_error   TEXT,
+    created      REAL NOT NULL,
+    sent_at      REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+
+# The v3 letter (deleteMe_v3 LETTER_TEMPLATE), cut down to what a web profile holds.
+LETTER_TEMPLATE = """Subject: Data Privacy Request – {full_name}
+
+Dear {broker} Privacy Team,
+
+I am exercising my privacy rights and request the removal of my personal data from your systems.
+
+Identifiers:
+- Full name: {full_name}
+
+Please confirm once completed.
+
+Sincerely,
+{full_name}
+"""
+
+
+def draft_letter(full_name, broker):
+    """The opt-out letter ``full_name`` sends to ``broker`` (a name), as a draft."""
+    return LETTER_TEMPLATE.format(full_name=full_name, broker=broker)
+
+
+def mailto_address(link):
+    """Recipient of a ``mailto:`` opt-out link, or None for any other link."""
+    parts = urlsplit(link.strip())
+    if parts.scheme.lower() != "mailto":
+        return None
+    address = unquote(parts.path).split(",")[0].strip()
+    return address if "@" in address else None
+
+
+def split_draft(draft):
+    """Split a v3 email draft (``Subject: ...`` line, blank line, body) into (subject, body)."""
+    first, _, rest = draft.partition("\n")
+    if first.lower().startswith("subject:"):
+        return first.split(":", 1)[1].strip(), rest.lstrip("\n")
+    return "Data Privacy Request", draft
+
+
+class _Permanent(Exception):
+    """The server rejected the message for good; retrying will not help."""
+
+
+# -----------------------------------------------------------------------------
+# Connection pool
+# -----------------------------------------------------------------------------
+class SMTPPool:
+    """Up to ``size`` logged-in SMTP connections, handed out one per sender."""
+
+    def __init__(self, host, port, user=None, password=None, size=DEFAULT_POOL_SIZE, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        context = ssl.create_default_context()
+        if self.port == 465:
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            conn.ehlo()
+            if conn.has_extn("starttls"):
+                conn.starttls(context=context)
+                conn.ehlo()
+        if self.user:
+            conn.login(self.user, self.password or "")
+        return conn
+
+    def acquire(self):
+        self._slots.acquire()
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - last_used < IDLE_CHECK:
+                return conn
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(conn)
+        try:
+            return self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                self._discard(conn)
+
+
+# -----------------------------------------------------------------------------
+# Outbox
+# -----------------------------------------------------------------------------
+class Outbox:
+    def __init__(self, db_path, host, port=587, user=None, password=None, sender=None,
+                 pool_size=DEFAULT_POOL_SIZE, domain_interval=DEFAULT_DOMAIN_INTERVAL,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF):
+        self.sender = sender or user
+        self.pool = SMTPPool(host, port, user, password, pool_size)
+        self.pool_size = pool_size
+        self.domain_interval = domain_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._domain_next = {}
+        self._in_flight = 0
+        self._worker = None
+        with self._lock:
+            self._db.executescript(SCHEMA)
+            # Anything caught mid-send by a crash goes out again, once its lease runs out.
+            self._db.execute("UPDATE outbox SET status = 'queued'"
+                             " WHERE status = 'sending' AND next_attempt <= ?", (time.time(),))
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        """Outbox for the ``EMAIL_*`` settings, or None when no mail server is configured."""
+        if not config.EMAIL_HOST:
+            return None
+        return cls(sqlite_path(config.DATABASE_URL), config.EMAIL_HOST,
+                   int(config.EMAIL_PORT or 587), config.EMAIL_USER, config.EMAIL_PASS, **kwargs)
+
+    # ------------------------------------------------------------------ #
+    # Queue
+    # ------------------------------------------------------------------ #
+    def enqueue(self, recipient, subject, body):
+        """Queue one message; returns its outbox id."""
+        local, at, domain = recipient.strip().rpartition("@")
+        domain = domain.lower()
+        if not (local and at and domain):
+            raise ValueError(f"Not an email address: {recipient!r}")
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO outbox (recipient, domain, subject, body, next_attempt, created)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (recipient.strip(), domain, subject, body, now, now),
+            )
+        self._wake.set()
+        return cur.lastrowid
+
+    def enqueue_draft(self, recipient, draft):
+        return self.enqueue(recipient, *split_draft(draft))
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def _claim(self, limit):
+        """Lease up to ``limit`` due messages ('sending'), at most one per ready domain.
+
+        A row another outbox claimed first fails the ``status = 'queued'`` check and is skipped.
+        """
+        now = time.time()
+        claimed = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, recipient, domain, subject, body, attempts FROM outbox"
+                    " WHERE status = 'queued' AND next_attempt <= ? ORDER BY next_attempt, id",
+                    (now,),
+                ).fetchall()
+                for row in rows:
+                    domain = row[2]
+                    if self._domain_next.get(domain, 0) > now:
+                        continue
+                    taken = self._db.execute(
+                        "UPDATE outbox SET status = 'sending', next_attempt = ?"
+                        " WHERE id = ? AND status = 'queued'",
+                        (now + LEASE, row[0]),
+                    ).rowcount
+                    if taken != 1:
+                        continue
+                    self._domain_next[domain] = now + self.domain_interval
+                    claimed.append(row)
+                    if len(claimed) >= limit:
+                        break
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return claimed
+
+    def _seconds_to_next(self, now):
+        """How long until ``_claim`` could return something (None when the queue is empty)."""
+        with self._lock:
+            due = self._db.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = 'queued'").fetchone()[0]
+            throttled = [t for t in self._domain_next.values() if t > now]
+        if due is None:
+            return None
+        if due > now:
+            return due - now
+        # Due now but waiting on a domain's rate limit.
+        return min(throttled, default=now) - now
+
+    # ------------------------------------------------------------------ #
+    # Sending
+    # ------------------------------------------------------------------ #
+    def _message(self, recipient, subject, body):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid(domain=(self.sender or "localhost").rpartition("@")[2])
+        msg.set_content(body)
+        return msg
+
+    @timed("outbox.send")
+    def _send(self, msg):
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            conn.send_message(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            codes = [code for code, _ in e.recipients.values()]
+            if all(code >= 500 for code in codes):
+                raise _Permanent(str(e)) from e
+            raise
+        except smtplib.SMTPResponseException as e:
+            # A refused message leaves the session usable; reset it for the next one.
+            try:
+                conn.rset()
+            except (smtplib.SMTPException, OSError):
+                broken = True
+            if e.smtp_code >= 500 and not isinstance(e, smtplib.SMTPAuthenticationError):
+                raise _Permanent(f"{e.smtp_code} {e.smtp_error!r}") from e
+            raise
+        except (smtplib.SMTPException, OSError):
+            broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken)
+
+    def _deliver(self, row):
+        message_id, recipient, domain, subject, body, attempts = row
+        try:
+            self._send(self._message(recipient, subject, body))
+        except _Permanent as e:
+            self._finish(message_id, 'failed', attempts + 1, str(e))
+            logging.warning(f"Outbox message {message_id} to {recipient} rejected: {e}")
+        except (smtplib.SMTPException, OSError) as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self._finish(message_id, 'failed', attempts, repr(e))
+                logging.warning(f"Outbox message {message_id} to {recipient} gave up: {e!r}")
+            else:
+                delay = min(self.backoff * 2 ** (attempts - 1), MAX_BACKOFF)
+                delay *= random.uniform(1.0, 1.1)
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE outbox SET status = 'queued', attempts = ?, next_attempt = ?,"
+                        " last_error = ? WHERE id = ?",
+                        (attempts, time.time() + delay, repr(e), message_id),
+                    )
+                logging.info(f"Outbox message {message_id} to {recipient} retry in {delay:.0f}s: {e!r}")
+        else:
+            self._finish(message_id, 'sent', attempts + 1, None)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._wake.set()
+
+    def _finish(self, message_id, status, attempts, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, sent_at = ? WHERE id = ?",
+                (status, attempts, error, time.time() if status == 'sent' else None, message_id),
+            )
+
+    def _dispatch(self, pool):
+        """Hand every sendable message to ``pool``; return how many were handed out."""
+        with self._lock:
+            free = self.pool_size * 2 - self._in_flight
+        rows = self._claim(free) if free > 0 else []
+        with self._lock:
+            self._in_flight += len(rows)
+        for row in rows:
+            pool.submit(self._deliver, row)
+        return len(rows)
+
+    def run_pending(self):
+        """Send everything due now in the foreground (honouring rate limits); return the counts."""
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="outbox") as pool:
+            while True:
+                self._wake.clear()
+                self._dispatch(pool)
+                wait = self._seconds_to_next(time.time())
+                if not self._in_flight and (wait is None or time.time() + wait > started + 1):
+                    break
+                self._wake.wait(max(0.01, wait or 0.05))
+        return self.counts()
+
+    # ------------------------------------------------------------------ #
+    # Background worker
+    # ------------------------------------------------------------------ #
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="outbox") as pool:
+            while not self._stop.is_set():
+                self._wake.clear()
+                self._dispatch(pool)
+                wait = self._seconds_to_next(time.time())
+                self._wake.wait(30.0 if wait is None else min(30.0, max(0.01, wait)))
+
+    def start(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout=30):
+        """Stop the worker after in-flight messages finish; queued ones stay for next start."""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+        self.pool.close()
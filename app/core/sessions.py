@@ -0,0 +1,194 @@
+"""Signed-cookie sessions with an in-process profile cache.
+
+The browser only holds ``<session id>.<signature>``, signed with ``SECRET_KEY``;
+which user a session belongs to lives server-side. Both that mapping and each
+user's profile plus broker-status summary are kept in ``TTLCache``s -- LRU
+dicts whose entries also expire after a fixed time -- so a dashboard hit is
+answered from memory. ``ShardedTTLCache`` splits one cache over several locks
+for many concurrent requests.
+
+``Storage`` reports every status change to ``SessionManager.invalidate``, which
+drops that user's cached summary; the next request reloads it.
+
+``session_user_id`` and ``own_user_id`` are the FastAPI dependencies routes use
+to require a session: the first answers 401 without one, the second also 403
+when a ``{user_id}`` in the path is not the signed-in user.
+"""
+
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request
+
+from app import config
+
+COOKIE_NAME = "deleteMe_session"
+
+
+class TTLCache:
+    """LRU mapping with at most ``maxsize`` entries, each living ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= self._clock():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ShardedTTLCache:
+    """``TTLCache`` split across ``shards`` independent locks by key hash."""
+
+    def __init__(self, maxsize=1024, ttl=300.0, shards=8, clock=time.monotonic):
+        per_shard = max(1, -(-maxsize // shards))
+        self._shards = [TTLCache(per_shard, ttl, clock) for _ in range(shards)]
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key, default=None):
+        return self._shard(key).get(key, default)
+
+    def set(self, key, value):
+        self._shard(key).set(key, value)
+
+    def pop(self, key, default=None):
+        return self._shard(key).pop(key, default)
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    @property
+    def hits(self):
+        return sum(shard.hits for shard in self._shards)
+
+    @property
+    def misses(self):
+        return sum(shard.misses for shard in self._shards)
+
+
+def make_cache(maxsize, ttl, shards):
+    return ShardedTTLCache(maxsize, ttl, shards) if shards > 1 else TTLCache(maxsize, ttl)
+
+
+class SessionManager:
+    def __init__(self, storage, secret=None, ttl=None, profile_ttl=None, maxsize=None, shards=None):
+        self.storage = storage
+        self.ttl = ttl or config.SESSION_TTL
+        self._key = (secret or config.SECRET_KEY).encode()
+        maxsize = maxsize or config.SESSION_CACHE_SIZE
+        shards = shards or config.SESSION_CACHE_SHARDS
+        self.sessions = make_cache(maxsize, self.ttl, shards)
+        self.profiles = make_cache(maxsize, profile_ttl or config.PROFILE_CACHE_TTL, shards)
+        storage.add_listener(self.invalidate)
+
+    # ------------------------------------------------------------------ #
+    # Cookies
+    # ------------------------------------------------------------------ #
+    def _sign(self, session_id):
+        digest = hmac.new(self._key, session_id.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def create(self, user_id):
+        """Start a session for ``user_id``; returns the signed cookie value."""
+        session_id = secrets.token_urlsafe(18)
+        self.sessions.set(session_id, user_id)
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def _session_id(self, cookie):
+        session_id, _, signature = (cookie or "").partition(".")
+        if session_id and hmac.compare_digest(signature, self._sign(session_id)):
+            return session_id
+        return None
+
+    def user_id(self, cookie):
+        """The user behind a cookie value, or None if it is forged, unknown or expired."""
+        session_id = self._session_id(cookie)
+        return self.sessions.get(session_id) if session_id else None
+
+    def end(self, cookie):
+        session_id = self._session_id(cookie)
+        if session_id:
+            self.sessions.pop(session_id)
+
+    # ------------------------------------------------------------------ #
+    # Profile cache
+    # ------------------------------------------------------------------ #
+    def profile(self, user_id):
+        """``{'user': ..., 'counts': ...}`` from cache, loading it on a miss."""
+        cached = self.profiles.get(user_id)
+        if cached is None:
+            user = self.storage.get_user(user_id=user_id)
+            if user is None:
+                return None
+            cached = {'user': user, 'counts': self.storage.status_counts(user_id)}
+            self.profiles.set(user_id, cached)
+        return cached
+
+    def invalidate(self, user_id=None, change=None):
+        """Forget cached summaries for ``user_id`` (all users when None)."""
+        if change is not None and change['type'] == 'link':
+            return
+        if user_id is None:
+            self.profiles.clear()
+        else:
+            self.profiles.pop(user_id)
+
+
+# ---------------------------------------------------------------------- #
+# Route dependencies
+# ---------------------------------------------------------------------- #
+def session_user_id(request: Request):
+    """Id of the signed-in user; 401 when the request has no valid session."""
+    user_id = request.app.state.sessions.user_id(request.cookies.get(COOKIE_NAME))
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Sign in first")
+    return user_id
+
+
+def own_user_id(user_id: int, session_user: int = Depends(session_user_id)):
+    """The path's ``user_id``, provided it is the signed-in user (403 otherwise)."""
+    if user_id != session_user:
+        raise HTTPException(status_code=403, detail="Not your account")
+    return user_id
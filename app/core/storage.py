@@ -0,0 +1,390 @@
+"""SQLite storage for users, brokers and each user's opt-out progress.
+
+The database named by ``DATABASE_URL`` runs in WAL mode, so page loads keep
+reading while a status change is being written. Connections come from a small
+pool and keep their compiled statements between requests (``cached_statements``);
+every query below is a fixed, parameterised SQL string so those caches hit.
+
+Tables::
+
+    users         one row per household member
+    brokers       the shared broker registry, unique on (name, opt_out_link)
+    user_brokers  per-user status ('pending' / 'done') and covered_by for every
+                  broker, indexed on (user_id, status)
+    registry      a single row holding the registry's link-health revision
+
+A user's dashboard is a single query on ``user_brokers`` joined to ``brokers``.
+Lists are paged by key (``id > cursor``), never by offset. ``users.revision``
+is bumped whenever that user's rows change, which gives the API a cheap ETag;
+``registry.revision`` does the same for link-health changes to the shared list.
+"""
+
+import csv
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app import config
+from app.core.metrics import timed
+
+DEFAULT_POOL_SIZE = 4
+CACHED_STATEMENTS = 128
+BUNDLED_BROKERS_CSV = Path(__file__).resolve().parents[2] / "deleteMe_v4" / "brokers.csv"
+
+STATUSES = ('pending', 'done')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id       INTEGER PRIMARY KEY,
+    name     TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    created  REAL NOT NULL,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS brokers (
+    id           INTEGER PRIMARY KEY,
+    name         TEXT NOT NULL,
+    opt_out_link TEXT NOT NULL,
+    link_health  TEXT NOT NULL DEFAULT '',
+    UNIQUE (name, opt_out_link)
+);
+CREATE TABLE IF NOT EXISTS user_brokers (
+    user_id    INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    broker_id  INTEGER NOT NULL REFERENCES brokers (id) ON DELETE CASCADE,
+    status     TEXT NOT NULL DEFAULT 'pending',
+    covered_by TEXT NOT NULL DEFAULT '',
+    updated    REAL,
+    PRIMARY KEY (user_id, broker_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_brokers_status ON user_brokers (user_id, status);
+CREATE TABLE IF NOT EXISTS registry (
+    id       INTEGER PRIMARY KEY CHECK (id = 1),
+    revision INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO registry (id) VALUES (1);
+"""
+
+# Statements, kept as constants so each pooled connection compiles them once.
+_SELECT_USER = "SELECT id, name, created FROM users WHERE name = ?"
+_SELECT_USER_BY_ID = "SELECT id, name, created FROM users WHERE id = ?"
+_INSERT_USER = "INSERT INTO users (name, created) VALUES (?, ?)"
+_LIST_USERS = "SELECT id, name, created FROM users ORDER BY name"
+_INSERT_BROKER = "INSERT OR IGNORE INTO brokers (name, opt_out_link) VALUES (?, ?)"
+_COUNT_BROKERS = "SELECT COUNT(*) FROM brokers"
+_LINK_NEW_USER = ("INSERT OR IGNORE INTO user_brokers (user_id, broker_id)"
+                  " SELECT ?, id FROM brokers")
+_LINK_ALL_USERS = ("INSERT OR IGNORE INTO user_brokers (user_id, broker_id)"
+                   " SELECT users.id, brokers.id FROM users CROSS JOIN brokers WHERE brokers.id > ?")
+_MAX_BROKER_ID = "SELECT COALESCE(MAX(id), 0) FROM brokers"
+_USER_BROKERS = (
+    "SELECT b.id, b.name, b.opt_out_link, b.link_health, ub.status, ub.covered_by, ub.updated"
+    " FROM user_brokers ub JOIN brokers b ON b.id = ub.broker_id"
+    " WHERE ub.user_id = ? ORDER BY b.id"
+)
+_USER_BROKERS_BY_STATUS = (
+    "SELECT b.id, b.name, b.opt_out_link, b.link_health, ub.status, ub.covered_by, ub.updated"
+    " FROM user_brokers ub JOIN brokers b ON b.id = ub.broker_id"
+    " WHERE ub.user_id = ? AND ub.status = ? ORDER BY b.id"
+)
+_SET_STATUS = ("UPDATE user_brokers SET status = ?, covered_by = ?, updated = ?"
+               " WHERE user_id = ? AND broker_id = ?")
+_STATUS_COUNTS = "SELECT status, COUNT(*) FROM user_brokers WHERE user_id = ? GROUP BY status"
+_SET_LINK_HEALTH = "UPDATE brokers SET link_health = ? WHERE id = ? AND link_health != ?"
+_SET_STATUS_REVISION = "UPDATE users SET revision = revision + 1 WHERE id = ?"
+_ALL_REVISIONS = "UPDATE users SET revision = revision + 1"
+_USER_REVISION = "SELECT revision FROM users WHERE id = ?"
+_REGISTRY_REVISION = "UPDATE registry SET revision = revision + 1"
+_REGISTRY_VERSION = "SELECT COUNT(*), COALESCE(MAX(id), 0), (SELECT revision FROM registry) FROM brokers"
+_BROKERS_PAGE = "SELECT id, name, opt_out_link, link_health FROM brokers WHERE id > ? ORDER BY id LIMIT ?"
+_SELECT_BROKER = "SELECT id, name, opt_out_link, link_health FROM brokers WHERE id = ?"
+# Keyed on (status filter?, service filter?). covered_by is ';'-separated, matched exactly.
+_USER_BROKERS_PAGE = {
+    (status, service): (
+        "SELECT b.id, b.name, b.opt_out_link, b.link_health, ub.status, ub.covered_by, ub.updated"
+        " FROM user_brokers ub JOIN brokers b ON b.id = ub.broker_id"
+        " WHERE ub.user_id = ? AND ub.broker_id > ?"
+        + (" AND ub.status = ?" if status else "")
+        + (" AND instr(';' || lower(replace(ub.covered_by, ' ', '')) || ';', ';' || ? || ';')"
+           if service else "")
+        + " ORDER BY ub.broker_id LIMIT ?"
+    )
+    for status in (False, True) for service in (False, True)
+}
+_HOUSEHOLD = (
+    "SELECT u.id, u.name, ub.status, COUNT(*) FROM users u"
+    " JOIN user_brokers ub ON ub.user_id = u.id GROUP BY u.id, ub.status ORDER BY u.name"
+)
+
+
+def sqlite_path(url):
+    """``sqlite:///./deleteMe.db`` -> ``./deleteMe.db``."""
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        raise ValueError(f"Only sqlite DATABASE_URLs are supported, got {url!r}")
+    return url[len(prefix):]
+
+
+# -----------------------------------------------------------------------------
+# Connection pool
+# -----------------------------------------------------------------------------
+class ConnectionPool:
+    """Up to ``size`` WAL-mode connections to one SQLite file, shared across threads."""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                               cached_statements=CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# -----------------------------------------------------------------------------
+# Storage
+# -----------------------------------------------------------------------------
+class Storage:
+    def __init__(self, path, pool_size=DEFAULT_POOL_SIZE):
+        self.pool = ConnectionPool(path, pool_size)
+        self._listeners = []
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(brokers)")}
+            if 'link_health' not in columns:
+                conn.execute("ALTER TABLE brokers ADD COLUMN link_health TEXT NOT NULL DEFAULT ''")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(sqlite_path(config.DATABASE_URL), **kwargs)
+
+    def close(self):
+        self.pool.close()
+
+    def add_listener(self, callback):
+        """Call ``callback(user_id, change)`` after opt-out state changes.
+
+        ``user_id`` is None when the change affects every user. ``change`` is a small
+        dict describing it, e.g. ``{'type': 'status', 'broker_id': 12, 'status': 'done',
+        'covered_by': 'manual'}``, ``{'type': 'link', 'broker_id': 12, 'link_health':
+        'dead'}`` or ``{'type': 'brokers', 'added': 3}``.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, user_id, change):
+        for callback in self._listeners:
+            callback(user_id, change)
+
+    # ------------------------------------------------------------------ #
+    # Users
+    # ------------------------------------------------------------------ #
+    def get_user(self, name=None, user_id=None):
+        with self.pool.connection() as conn:
+            if user_id is not None:
+                row = conn.execute(_SELECT_USER_BY_ID, (user_id,)).fetchone()
+            else:
+                row = conn.execute(_SELECT_USER, (name.strip(),)).fetchone()
+        return dict(row) if row else None
+
+    def get_or_create_user(self, name):
+        """Load ``name``'s profile, creating it (with every broker pending) on first visit."""
+        name = name.strip()
+        if not name:
+            raise ValueError("User name cannot be empty")
+        user = self.get_user(name)
+        if user:
+            return user
+        with self.pool.transaction() as conn:
+            row = conn.execute(_SELECT_USER, (name,)).fetchone()
+            if row is None:
+                user_id = conn.execute(_INSERT_USER, (name, time.time())).lastrowid
+                conn.execute(_LINK_NEW_USER, (user_id,))
+                row = conn.execute(_SELECT_USER_BY_ID, (user_id,)).fetchone()
+        return dict(row)
+
+    def list_users(self):
+        with self.pool.connection() as conn:
+            return [dict(r) for r in conn.execute(_LIST_USERS)]
+
+    # ------------------------------------------------------------------ #
+    # Brokers
+    # ------------------------------------------------------------------ #
+    def broker_count(self):
+        with self.pool.connection() as conn:
+            return conn.execute(_COUNT_BROKERS).fetchone()[0]
+
+    @timed("storage.import_brokers")
+    def import_brokers(self, brokers, notify=True):
+        """Upsert ``{'name', 'opt_out_link'}`` dicts; every user gets the new ones as pending.
+
+        Pass ``notify=False`` when importing in batches and call ``brokers_added``
+        once at the end, so listeners see one change rather than one per batch.
+        """
+        rows = [(b['name'].strip(), b['opt_out_link'].strip()) for b in brokers
+                if b.get('name', '').strip() and b.get('opt_out_link', '').strip()]
+        with self.pool.transaction() as conn:
+            newest = conn.execute(_MAX_BROKER_ID).fetchone()[0]
+            before = conn.total_changes
+            conn.executemany(_INSERT_BROKER, rows)
+            added = conn.total_changes - before
+            if added:
+                # Only the new ids need linking; rowids only grow, so they are all > newest.
+                conn.execute(_LINK_ALL_USERS, (newest,))
+                conn.execute(_ALL_REVISIONS)
+        if notify:
+            self.brokers_added(added)
+        return added
+
+    def brokers_added(self, added):
+        """Tell listeners ``added`` brokers were imported (no-op for zero)."""
+        if added:
+            self._notify(None, {'type': 'brokers', 'added': added})
+
+    @timed("storage.brokers_page")
+    def brokers_page(self, after=0, limit=100):
+        """Up to ``limit`` registry brokers with id > ``after``, in id order."""
+        with self.pool.connection() as conn:
+            return [dict(r) for r in conn.execute(_BROKERS_PAGE, (after, limit))]
+
+    def get_broker(self, broker_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(_SELECT_BROKER, (broker_id,)).fetchone()
+        return dict(row) if row else None
+
+    def registry_version(self):
+        """(broker count, highest id, health revision) -- changes on imports and link-health updates."""
+        with self.pool.connection() as conn:
+            return tuple(conn.execute(_REGISTRY_VERSION).fetchone())
+
+    def seed_brokers(self, csv_path=BUNDLED_BROKERS_CSV):
+        """Load the bundled v4 registry into an empty database."""
+        if self.broker_count() or not Path(csv_path).exists():
+            return 0
+        with open(csv_path, newline='', encoding='utf-8') as fh:
+            return self.import_brokers(csv.DictReader(fh))
+
+    # ------------------------------------------------------------------ #
+    # Opt-out state
+    # ------------------------------------------------------------------ #
+    @timed("storage.user_brokers")
+    def user_brokers(self, user_id, status=None):
+        """The user's brokers with their opt-out state, optionally only one ``status``."""
+        with self.pool.connection() as conn:
+            if status is None:
+                rows = conn.execute(_USER_BROKERS, (user_id,))
+            else:
+                rows = conn.execute(_USER_BROKERS_BY_STATUS, (user_id, status))
+            return [dict(r) for r in rows]
+
+    @timed("storage.user_brokers_page")
+    def user_brokers_page(self, user_id, after=0, limit=100, status=None, service=None):
+        """Up to ``limit`` of the user's brokers with id > ``after``, filtered by status/service."""
+        sql = _USER_BROKERS_PAGE[status is not None, bool(service)]
+        params = [user_id, after]
+        if status is not None:
+            params.append(status)
+        if service:
+            params.append(service.replace(' ', '').lower())
+        params.append(limit)
+        with self.pool.connection() as conn:
+            return [dict(r) for r in conn.execute(sql, params)]
+
+    def iter_user_brokers(self, user_id, status=None, service=None, chunk=500):
+        """Every matching broker for the user, fetched ``chunk`` rows at a time."""
+        after = 0
+        while True:
+            rows = self.user_brokers_page(user_id, after, chunk, status, service)
+            yield from rows
+            if len(rows) < chunk:
+                return
+            after = rows[-1]['id']
+
+    def user_revision(self, user_id):
+        """Counter bumped on every change to the user's broker rows; None for unknown users."""
+        with self.pool.connection() as conn:
+            row = conn.execute(_USER_REVISION, (user_id,)).fetchone()
+        return row[0] if row else None
+
+    @timed("storage.set_status")
+    def set_status(self, user_id, broker_id, status, covered_by=''):
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status {status!r}; expected one of {STATUSES}")
+        with self.pool.transaction() as conn:
+            changed = conn.execute(_SET_STATUS, (status, covered_by, time.time(),
+                                                 user_id, broker_id)).rowcount
+            if changed:
+                conn.execute(_SET_STATUS_REVISION, (user_id,))
+        if changed:
+            self._notify(user_id, {'type': 'status', 'broker_id': broker_id,
+                                   'status': status, 'covered_by': covered_by})
+        return changed == 1
+
+    def set_link_health(self, broker_id, link_health):
+        """Record a link-check verdict for a registry broker (shared by every user)."""
+        with self.pool.transaction() as conn:
+            changed = conn.execute(_SET_LINK_HEALTH, (link_health, broker_id, link_health)).rowcount
+            if changed:
+                # Every list shows link_health, so every cached copy is now stale.
+                conn.execute(_ALL_REVISIONS)
+                conn.execute(_REGISTRY_REVISION)
+        if changed:
+            self._notify(None, {'type': 'link', 'broker_id': broker_id, 'link_health': link_health})
+        return changed == 1
+
+    @timed("storage.status_counts")
+    def status_counts(self, user_id):
+        with self.pool.connection() as conn:
+            counts = dict(conn.execute(_STATUS_COUNTS, (user_id,)).fetchall())
+        return {s: counts.get(s, 0) for s in STATUSES}
+
+    def household(self):
+        """``[{'id', 'name', 'pending', 'done'}, ...]`` for every user, in one query."""
+        users = {}
+        with self.pool.connection() as conn:
+            for user_id, name, status, count in conn.execute(_HOUSEHOLD):
+                user = users.setdefault(user_id, dict({'id': user_id, 'name': name},
+                                                      **dict.fromkeys(STATUSES, 0)))
+                user[status] = count
+        return list(users.values())
@@ -0,0 +1,81 @@
+"""Jinja2 setup for the web pages.
+
+Templates are compiled once at startup (``precompile``) and their bytecode is
+kept on disk under the user cache dir, so a cold start loads bytecode instead
+of re-parsing every template. Pages with long broker tables are sent with
+``stream_template``: the template is rendered as a generator and flushed in
+chunks, so the browser gets the page head while later rows are still rendering.
+"""
+
+import time
+from pathlib import Path
+
+import platformdirs
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from app import config
+from app.core import metrics
+
+BYTECODE_CACHE_DIR = Path(platformdirs.user_cache_dir(config.APP_NAME, config.APP_AUTHOR)) / "jinja"
+STREAM_CHUNK = 16 * 1024   # characters per flushed chunk
+
+
+def make_templates(directory, cache_dir=BYTECODE_CACHE_DIR):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=select_autoescape(),
+        bytecode_cache=FileSystemBytecodeCache(str(cache_dir)),
+        auto_reload=config.DEBUG,
+    )
+    return Jinja2Templates(env=env)
+
+
+def precompile(templates):
+    """Load every template into the in-memory cache (and bytecode cache); return how many."""
+    env = templates.env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html") and " " not in name)
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def _chunks(parts, size):
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _timed(parts, name):
+    """``parts`` unchanged; the time spent producing them is recorded as one render."""
+    elapsed = 0.0
+    parts = iter(parts)
+    while True:
+        start = time.perf_counter()
+        part = next(parts, None)
+        elapsed += time.perf_counter() - start
+        if part is None:
+            break
+        yield part
+    metrics.record(f"render {name}", elapsed)
+
+
+def stream_template(templates, request, name, context, chunk_size=STREAM_CHUNK, **kwargs):
+    """Like ``TemplateResponse`` but rendered incrementally.
+
+    ``context`` may hold generators (e.g. broker rows paged from storage); they are
+    consumed as the template reaches them. Rendering runs in the threadpool.
+    """
+    template = templates.get_template(name)
+    parts = template.generate(dict(context, request=request))
+    if metrics.enabled():
+        parts = _timed(parts, name)
+    return StreamingResponse(_chunks(parts, chunk_size), media_type="text/html", **kwargs)
@@ -0,0 +1,16 @@
+"""Access to the v4 CLI's modules from the web app.
+
+``deleteMe_v4`` is a directory of top-level modules run as a script, not a
+package, and it ships without the web app. The app reuses its dependency-free
+modules (``instrument``, and ``link_checker`` with ``broker_store``) rather
+than keeping copies: importing this module puts that directory on
+``sys.path`` once, after which they import by their plain names.
+"""
+
+import sys
+from pathlib import Path
+
+V4_DIR = Path(__file__).resolve().parents[2] / "deleteMe_v4"
+
+if str(V4_DIR) not in sys.path:
+    sys.path.append(str(V4_DIR))
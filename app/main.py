@@ -1,30 +1,123 @@
-from fastapi import FastAPI, Form, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Form, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
 
+from app.core.assets import BUILD_DIR, PrecompressedStaticFiles, asset_url_for, ensure_built
+from app.core import metrics
+from app.core.events import EventBus
+from app.core.outbox import Outbox
+from app.core.sessions import COOKIE_NAME, SessionManager
+from app.core.storage import Storage
+from app.core.templating import make_templates, precompile, stream_template
+from app import config
+from app.routers import brokers, users
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.storage = Storage.from_config()
+    app.state.storage.seed_brokers()
+    app.state.sessions = SessionManager(app.state.storage)
+    app.state.events = EventBus()
+    app.state.events.bind(asyncio.get_running_loop())
+    app.state.storage.add_listener(app.state.events.publish)
+    if config.SECRET_KEY == "you-should-change-this":
+        logging.warning("SECRET_KEY is the default; set it in .env so session cookies cannot be forged.")
+    precompile(templates)
+    # Fingerprinted, precompressed copy of app/static, rebuilt when the sources change.
+    manifest = ensure_built()
+    static_files.use_manifest(manifest)
+    templates.env.globals["asset_url"] = asset_url_for(manifest)
+    # Outgoing opt-out emails; None unless EMAIL_HOST is configured.
+    app.state.outbox = Outbox.from_config()
+    if app.state.outbox:
+        app.state.outbox.start()
+    # POST /brokers/check-links: the running check and its conditional-request cache.
+    app.state.link_check = None
+    app.state.link_cache = {}
+    yield
+    if app.state.link_check:
+        app.state.link_check.cancel()
+    if app.state.outbox:
+        app.state.outbox.stop()
+    app.state.storage.close()
+
+app = FastAPI(lifespan=lifespan)
+
+if config.METRICS:
+    metrics.enable()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(metrics.prometheus(), media_type=metrics.CONTENT_TYPE)
+
+# The build dir is filled in at startup (lifespan), not at import.
+static_files = PrecompressedStaticFiles(directory=BUILD_DIR, check_dir=False)
+app.mount("/static", static_files, name="static")
+templates = make_templates(os.path.join(BASE_DIR, "templates"))
 
-app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
-templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+app.include_router(users.router)
+app.include_router(brokers.router)
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("home.html", {"request": request})
+    return templates.TemplateResponse(request, "home.html", {})
 
 @app.post("/start")
-async def start_session(username: str = Form(...)):
-    # Future: Load user profile here
-    return RedirectResponse(url=f"/welcome/{username}", status_code=303)
-
-@app.get("/welcome/{username}", response_class=HTMLResponse)
-async def welcome_user(username: str, request: Request):
-    return templates.TemplateResponse("home.html", {
-        "request": request,
-        "username": username,
-        "message": f"Welcome back, {username}! We're preparing your data scrub session."
+async def start_session(request: Request, username: str = Form(...)):
+    state = request.app.state
+    user = await run_in_threadpool(state.storage.get_or_create_user, username)
+    response = RedirectResponse(url="/welcome", status_code=303)
+    response.set_cookie(COOKIE_NAME, state.sessions.create(user["id"]), max_age=state.sessions.ttl,
+                        httponly=True, samesite="lax", secure=request.url.scheme == "https")
+    return response
+
+@app.post("/logout")
+async def end_session(request: Request):
+    request.app.state.sessions.end(request.cookies.get(COOKIE_NAME))
+    response = RedirectResponse(url="/", status_code=303)
+    response.delete_cookie(COOKIE_NAME)
+    return response
+
+def _session_profile(request):
+    # A cache miss reads SQLite; the async routes call this through run_in_threadpool.
+    sessions = request.app.state.sessions
+    user_id = sessions.user_id(request.cookies.get(COOKIE_NAME))
+    return sessions.profile(user_id) if user_id is not None else None
+
+@app.get("/welcome", response_class=HTMLResponse)
+async def welcome_user(request: Request):
+    profile = await run_in_threadpool(_session_profile, request)
+    if profile is None:
+        return RedirectResponse(url="/", status_code=303)
+    user, counts = profile["user"], profile["counts"]
+    return stream_template(templates, request, "dashboard.html", {
+        "username": user["name"],
+        "counts": counts,
+        "brokers": request.app.state.storage.iter_user_brokers(user["id"]),
     })
 
+@app.get("/events")
+async def dashboard_events(request: Request):
+    """Server-Sent Events stream of changes to the signed-in user's brokers."""
+    profile = await run_in_threadpool(_session_profile, request)
+    if profile is None:
+        return Response(status_code=401)
+    subscription = request.app.state.events.subscribe(profile["user"]["id"])
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            async for frame in subscription.frames():
+                yield frame
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
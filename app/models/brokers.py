@@ -0,0 +1,18 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class UserBroker(BaseModel):
+    id: int
+    name: str
+    opt_out_link: str
+    link_health: str = ""
+    status: str
+    covered_by: str = ""
+    updated: Optional[float] = None
+
+
+class StatusChange(BaseModel):
+    status: str
+    covered_by: str = ""
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class User(BaseModel):
+    id: int
+    name: str
+    created: float
+
+
+class StatusCounts(BaseModel):
+    pending: int = 0
+    done: int = 0
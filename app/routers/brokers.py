@@ -0,0 +1,265 @@
+"""Broker registry and per-user opt-out state over JSON.
+
+Both lists are paged by key: each page carries ``next_cursor``, an opaque token
+for the last id returned, and the next request continues with ``id > cursor``.
+``?format=ndjson`` (or ``Accept: application/x-ndjson``) streams every matching
+row from the cursor onward as one JSON object per line instead.
+
+Responses carry a weak ``ETag`` built from the registry size and health
+revision or the user's revision counter, so a poll with ``If-None-Match`` is answered with 304 after
+one indexed lookup, before any page is read.
+
+The ``/users/{user_id}/...`` routes only serve the signed-in user: without a
+session cookie they answer 401, and for anyone else's id 403.
+
+``POST /brokers/upload`` takes a v3 or v4 broker CSV, either as the ``file``
+field of a multipart form or as a raw ``text/csv`` body. It is parsed as the
+request streams in and upserted a batch at a time, so uploads of any size use
+constant memory; the reply lists every rejected row by line number. Uploads
+change every user's list, so they need a session too.
+
+``POST /brokers/check-links`` (with a session) starts a background check of every
+registry link; each verdict that changes is stored and pushed to the dashboards
+as a ``link`` event.
+
+``POST /users/{user_id}/brokers/{broker_id}/email`` drafts the opt-out letter
+for a broker whose link is ``mailto:`` and queues it in the outbox; it answers
+503 when no mail server (``EMAIL_HOST``) is configured.
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core import links
+from app.core.importer import BrokerCSVImport, CSVImportError
+from app.core.outbox import draft_letter, mailto_address
+from app.core.sessions import own_user_id, session_user_id
+from app.core.storage import STATUSES
+from app.models.brokers import StatusChange
+
+router = APIRouter(tags=["Brokers"])
+
+MAX_PAGE = 500
+STREAM_CHUNK = 500
+NDJSON = "application/x-ndjson"
+
+
+def encode_cursor(broker_id):
+    return base64.urlsafe_b64encode(str(broker_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def _wants_ndjson(request, fmt):
+    return fmt == "ndjson" or NDJSON in request.headers.get("accept", "")
+
+
+def _not_modified(request, etag):
+    candidates = request.headers.get("if-none-match", "")
+    return etag in (c.strip() for c in candidates.split(",")) or candidates.strip() == "*"
+
+
+async def _respond(request, etag, cache_control, fetch, after, limit, ndjson):
+    """Shared 304 / NDJSON / JSON-page handling; ``fetch(after, limit)`` returns rows."""
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if ndjson:
+        async def stream():
+            cursor = after
+            while True:
+                rows = await run_in_threadpool(fetch, cursor, STREAM_CHUNK)
+                if not rows:
+                    return
+                yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+                if len(rows) < STREAM_CHUNK:
+                    return
+                cursor = rows[-1]["id"]
+
+        return StreamingResponse(stream(), media_type=NDJSON, headers=headers)
+
+    # One extra row tells us whether another page exists without a COUNT.
+    rows = await run_in_threadpool(fetch, after, limit + 1)
+    next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+    if next_cursor:
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse({"items": rows[:limit], "next_cursor": next_cursor}, headers=headers)
+
+
+@router.get("/brokers")
+async def list_brokers(request: Request,
+                       cursor: Optional[str] = None,
+                       limit: int = Query(100, ge=1, le=MAX_PAGE),
+                       format: Optional[str] = Query(None, pattern="^(json|ndjson)$")):
+    storage = request.app.state.storage
+    count, max_id, revision = await run_in_threadpool(storage.registry_version)
+    return await _respond(
+        request, f'W/"brokers-{count}-{max_id}-{revision}"', "public, max-age=60",
+        storage.brokers_page, decode_cursor(cursor), limit, _wants_ndjson(request, format),
+    )
+
+
+@router.get("/users/{user_id}/brokers")
+async def list_user_brokers(request: Request, user_id: int = Depends(own_user_id),
+                            cursor: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=MAX_PAGE),
+                            status: Optional[str] = None,
+                            service: Optional[str] = Query(None, description="only brokers covered by this service"),
+                            format: Optional[str] = Query(None, pattern="^(json|ndjson)$")):
+    if status is not None and status not in STATUSES:
+        raise HTTPException(status_code=422, detail=f"status must be one of {', '.join(STATUSES)}")
+    storage = request.app.state.storage
+    revision = await run_in_threadpool(storage.user_revision, user_id)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="No such user")
+
+    def fetch(after, limit):
+        return storage.user_brokers_page(user_id, after, limit, status, service)
+
+    # Filters are part of the URL, so one revision tag per user is enough.
+    return await _respond(
+        request, f'W/"user-{user_id}-{revision}"', "private, no-cache",
+        fetch, decode_cursor(cursor), limit, _wants_ndjson(request, format),
+    )
+
+
+async def _upload_chunks(request):
+    """Bytes of the uploaded CSV as they arrive, from a multipart form or a raw body."""
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data":
+        async for chunk in request.stream():
+            yield chunk
+        return
+    boundary = options.get(b"boundary")
+    if not boundary:
+        raise HTTPException(status_code=400, detail="Missing multipart boundary")
+
+    # The first part named "file" (or carrying a filename) is the CSV; others are skipped.
+    out = []
+    part = {"header": b"", "headers": {}, "capture": False, "found": False}
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        name = part["header"].lower()
+        part["headers"][name] = part["headers"].get(name, b"") + data[start:end]
+
+    def on_header_end():
+        part["header"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["capture"] = not part["found"] and (
+            disposition.get(b"name") == b"file" or b"filename" in disposition)
+        part["headers"] = {}
+
+    def on_part_data(data, start, end):
+        if part["capture"]:
+            out.append(bytes(data[start:end]))
+
+    def on_part_end():
+        if part["capture"]:
+            part["found"], part["capture"] = True, False
+
+    parser = MultipartParser(boundary, {
+        "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    async for chunk in request.stream():
+        parser.write(chunk)
+        yield b"".join(out)
+        out.clear()
+    parser.finalize()
+    if not part["found"]:
+        raise HTTPException(status_code=422, detail="No CSV file in the upload; send it as the 'file' field")
+
+
+@router.post("/brokers/upload", dependencies=[Depends(session_user_id)])
+async def upload_brokers(request: Request):
+    storage = request.app.state.storage
+    parsed = BrokerCSVImport()
+    added = 0
+    try:
+        async for data in _upload_chunks(request):
+            for batch in parsed.feed(data):
+                added += await run_in_threadpool(storage.import_brokers, batch, False)
+        for batch in parsed.close():
+            added += await run_in_threadpool(storage.import_brokers, batch, False)
+    except CSVImportError as exc:
+        raise HTTPException(status_code=422, detail=f"{exc} ({added} brokers added before the error)") from None
+    finally:
+        storage.brokers_added(added)
+    return parsed.report(added)
+
+
+def _link_check_done(task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error("Link check failed", exc_info=task.exception())
+
+
+@router.post("/brokers/check-links", status_code=202, dependencies=[Depends(session_user_id)])
+async def check_broker_links(request: Request):
+    state = request.app.state
+    if not links.AVAILABLE:
+        raise HTTPException(status_code=503, detail="aiohttp is not installed")
+    if state.link_check is not None and not state.link_check.done():
+        raise HTTPException(status_code=409, detail="A link check is already running")
+    state.link_check = asyncio.create_task(links.check_registry(state.storage, state.link_cache))
+    state.link_check.add_done_callback(_link_check_done)
+    return {"checking": True}
+
+
+@router.put("/users/{user_id}/brokers/{broker_id}")
+async def set_user_broker_status(request: Request, broker_id: int, change: StatusChange,
+                                 user_id: int = Depends(own_user_id)):
+    if change.status not in STATUSES:
+        raise HTTPException(status_code=422, detail=f"status must be one of {', '.join(STATUSES)}")
+    storage = request.app.state.storage
+    updated = await run_in_threadpool(storage.set_status, user_id, broker_id,
+                                      change.status, change.covered_by)
+    if not updated and await run_in_threadpool(storage.user_revision, user_id) is None:
+        raise HTTPException(status_code=404, detail="No such user")
+    return {"ok": True, "changed": updated}
+
+
+@router.post("/users/{user_id}/brokers/{broker_id}/email", status_code=202)
+async def email_opt_out(request: Request, broker_id: int, user_id: int = Depends(own_user_id)):
+    outbox = request.app.state.outbox
+    if outbox is None:
+        raise HTTPException(status_code=503, detail="No mail server configured; set EMAIL_HOST")
+    storage = request.app.state.storage
+    broker = await run_in_threadpool(storage.get_broker, broker_id)
+    if broker is None:
+        raise HTTPException(status_code=404, detail="No such broker")
+    recipient = mailto_address(broker["opt_out_link"])
+    if recipient is None:
+        raise HTTPException(status_code=409, detail=f"{broker['name']} takes opt-outs on the web, not by email")
+    user = await run_in_threadpool(storage.get_user, user_id=user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="No such user")
+    message_id = await run_in_threadpool(outbox.enqueue_draft, recipient,
+                                         draft_letter(user["name"], broker["name"]))
+    return {"queued": message_id, "to": recipient}
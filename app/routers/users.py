@@ -1,12 +1,36 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from app.core.sessions import COOKIE_NAME, own_user_id
+from app.models.users import StatusCounts, User
+
 router = APIRouter(prefix="/users", tags=["Users"])
 
 class UserProfile(BaseModel):
     name: str
 
 @router.post("/create")
-def create_user(profile: UserProfile):
-    return {"message": f"Welcome {profile.name}!", "status": "ok"}
+def create_user(profile: UserProfile, request: Request):
+    # Signs the caller in, like POST /start: the other /users routes need the session.
+    sessions = request.app.state.sessions
+    user = request.app.state.storage.get_or_create_user(profile.name)
+    response = JSONResponse({"message": f"Welcome {user['name']}!", "status": "ok",
+                             "user": User(**user).model_dump(mode="json")})
+    response.set_cookie(COOKIE_NAME, sessions.create(user["id"]), max_age=sessions.ttl,
+                        httponly=True, samesite="lax", secure=request.url.scheme == "https")
+    return response
+
+@router.get("/{user_id}", response_model=User)
+def get_user(request: Request, user_id: int = Depends(own_user_id)):
+    user = request.app.state.storage.get_user(user_id=user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="No such user")
+    return user
+
+@router.get("/{user_id}/counts", response_model=StatusCounts)
+def get_counts(request: Request, user_id: int = Depends(own_user_id)):
+    if request.app.state.storage.get_user(user_id=user_id) is None:
+        raise HTTPException(status_code=404, detail="No such user")
+    return request.app.state.storage.status_counts(user_id)
 
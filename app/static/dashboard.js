@@ -0,0 +1,49 @@
+// Live dashboard: apply broker deltas pushed over /events to the table in place.
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+    var counts = {
+        pending: document.getElementById("pending-count"),
+        done: document.getElementById("done-count")
+    };
+
+    function bump(status, delta) {
+        var el = counts[status];
+        if (el) {
+            el.textContent = String(parseInt(el.textContent, 10) + delta);
+        }
+    }
+
+    var events = new EventSource("/events");
+
+    events.addEventListener("status", function (e) {
+        var change = JSON.parse(e.data);
+        var row = document.getElementById("broker-" + change.broker_id);
+        if (!row) {
+            return;
+        }
+        var cell = row.querySelector(".status");
+        if (cell.textContent !== change.status) {
+            bump(cell.textContent, -1);
+            bump(change.status, 1);
+            row.classList.remove(cell.textContent);
+            row.classList.add(change.status);
+            cell.textContent = change.status;
+        }
+        row.querySelector(".covered-by").textContent = change.covered_by;
+    });
+
+    events.addEventListener("link", function (e) {
+        var change = JSON.parse(e.data);
+        var row = document.getElementById("broker-" + change.broker_id);
+        if (row) {
+            row.classList.remove("ok", "dead", "blocked", "error", "skipped");
+            row.classList.add(change.link_health);
+        }
+    });
+
+    // New brokers or a backlog we could not keep up with: fetch the page again.
+    events.addEventListener("brokers", function () { location.reload(); });
+    events.addEventListener("resync", function () { location.reload(); });
+})();
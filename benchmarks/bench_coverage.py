@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""bench_coverage.py
+
+Time the v3 coverage helpers on a synthetic registry:
+
+* ``_filter_brokers`` -- per-row ``split(';')`` + set intersection (before) vs.
+  the ``CoverageIndex`` row bitmaps (after)
+* ``auto_mark_coverage`` -- substring test per row (before) vs. one OR over the
+  service's row bitmap (after); only the in-memory marking is timed, not the CSV
+
+The "before" versions are copied from footprint_scrubber.py as it was, so both
+sides run in the same process on the same rows. Bitmap build time is reported
+separately since ``load_brokers()`` pays it once per registry.
+
+Usage::
+
+    python benchmarks/bench_coverage.py --rows 1000000
+"""
+
+import argparse
+import importlib.util
+import random
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SERVICES = ["", "", "", "None", "Incogni", "DeleteMe", "Incogni;DeleteMe", "Kanary",
+            "Optery;OneRep", "JustDelete.me"]
+
+
+def load_scrubber():
+    spec = importlib.util.spec_from_file_location(
+        "footprint_scrubber", ROOT / "deleteMe_v3" / "footprint_scrubber.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_rows(rows, seed=0):
+    rnd = random.Random(seed)
+    return [{
+        'name': f"Broker {i}",
+        'url': f"https://broker{i}.example.com/optout",
+        'email': '',
+        'notes': '',
+        'covered_by': rnd.choice(SERVICES),
+        'status': '',
+    } for i in range(rows)]
+
+
+def legacy_filter_brokers(brokers, paid_services):
+    if not paid_services:
+        return brokers
+    ps = {s.lower() for s in paid_services}
+    filtered = []
+    for b in brokers:
+        covered = {svc.strip().lower() for svc in b.get('covered_by', '').split(';') if svc.strip()}
+        if not covered.intersection(ps):
+            filtered.append(b)
+    return filtered
+
+
+def legacy_mark(brokers, service):
+    updated = 0
+    for b in brokers:
+        if service.lower() in b.get('covered_by', '').lower():
+            continue
+        existing = b.get('covered_by', '')
+        b['covered_by'] = existing + ';' + service if existing else service
+        updated += 1
+    return updated
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--paid", default="Incogni,Kanary", help="comma-separated paid services")
+    parser.add_argument("--mark", default="Optery", help="service for the bulk-mark run")
+    args = parser.parse_args(argv)
+    paid = [s for s in args.paid.split(',') if s]
+    fs = load_scrubber()
+
+    print(f"{args.rows:,} brokers, paid={paid}, mark={args.mark!r}")
+    rows = make_rows(args.rows)
+    brokers = fs.BrokerList(rows)
+
+    t_build, _ = timed(lambda: brokers.coverage)
+    t_old, old = timed(legacy_filter_brokers, rows, paid)
+    t_new, new = timed(fs._filter_brokers, brokers, paid)
+    assert [b['name'] for b in old] == [b['name'] for b in new], "filter results differ"
+    print(f"  bitmap build         {t_build * 1000:9.1f} ms (once per load)")
+    print(f"  _filter_brokers      before {t_old * 1000:9.1f} ms   after {t_new * 1000:9.1f} ms"
+          f"   x{t_old / t_new:5.1f}   ({len(new):,} kept)")
+
+    legacy_rows = make_rows(args.rows)
+    t_old, n_old = timed(legacy_mark, legacy_rows, args.mark)
+    t_new, n_new = timed(fs.mark_coverage, brokers, args.mark)
+    print(f"  mark coverage        before {t_old * 1000:9.1f} ms   after {t_new * 1000:9.1f} ms"
+          f"   x{t_old / t_new:5.1f}   ({n_new:,} rows changed)")
+    if n_old != n_new:
+        # Substring matching counts e.g. "OneRep" as covered by "Rep"; exact matching does not.
+        print(f"  note: substring matching changed {n_old:,} rows, exact matching {n_new:,}")
+
+
+if __name__ == "__main__":
+    main()
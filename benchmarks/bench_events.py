@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""bench_events.py
+
+Fan-out benchmark for the live dashboard's ``/events`` Server-Sent Events stream.
+
+Starts one ``uvicorn app.main:app`` worker on a throwaway database, signs in
+``--sessions`` browser sessions spread over ``--users`` users (so each status
+change reaches ``sessions / users`` open streams), then sends ``--changes``
+``PUT /users/{id}/brokers/{broker}`` requests at ``--rate`` per second.
+Every stream parses the frames it receives and compares the ``ts`` stamped at
+publish time with its own clock, giving publish-to-delivery latency.
+
+Usage::
+
+    python benchmarks/bench_events.py --sessions 300 --users 3 --changes 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_web import ROOT, free_port, percentile, wait_ready  # noqa: E402
+
+
+async def listen(client, cookie, latencies, ready, done):
+    headers = {"Cookie": cookie, "Accept": "text/event-stream"}
+    async with client.stream("GET", "/events", headers=headers) as resp:
+        resp.raise_for_status()
+        event = None
+        async for line in resp.aiter_lines():
+            if line.startswith("retry:"):
+                ready.release()
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "status":
+                latencies.append(time.time() - json.loads(line[5:])["ts"])
+                if done.is_set():
+                    return
+            elif line.startswith("data:") and event == "resync":
+                latencies.append(None)
+
+
+async def run(base, args):
+    limits = httpx.Limits(max_connections=args.sessions + 16, max_keepalive_connections=16)
+    async with httpx.AsyncClient(base_url=base, timeout=None, limits=limits) as client:
+        users, cookies = [], []
+        for i in range(args.users):
+            resp = await client.post("/users/create", json={"name": f"user{i}"})
+            users.append(resp.json()["user"]["id"])
+        for i in range(args.sessions):
+            resp = await client.post("/start", data={"username": f"user{i % args.users}"})
+            cookies.append("; ".join(f"{k}={v}" for k, v in resp.cookies.items()))
+        client.cookies.clear()
+        # cookies[k] belongs to users[k]; the per-user routes only accept their own session.
+        page = (await client.get(f"/users/{users[0]}/brokers", params={"limit": 500},
+                                 headers={"Cookie": cookies[0]})).json()
+        broker_ids = [b["id"] for b in page["items"]]
+
+        latencies, ready, done = [], asyncio.Semaphore(0), asyncio.Event()
+        start = time.perf_counter()
+        listeners = [asyncio.create_task(listen(client, c, latencies, ready, done)) for c in cookies]
+        for _ in cookies:
+            await ready.acquire()
+        print(f"{args.sessions} streams open in {time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        for i in range(args.changes):
+            status = "done" if (i // len(broker_ids)) % 2 == 0 else "pending"
+            k = i % len(users)
+            await client.put(f"/users/{users[k]}/brokers/{broker_ids[i % len(broker_ids)]}",
+                             json={"status": status, "covered_by": "bench"}, headers={"Cookie": cookies[k]})
+            await asyncio.sleep(1 / args.rate)
+        expected = args.changes * args.sessions // args.users
+        deadline = time.monotonic() + 10
+        while len(latencies) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        done.set()
+        for task in listeners:
+            task.cancel()
+        await asyncio.gather(*listeners, return_exceptions=True)
+
+    delivered = [lat for lat in latencies if lat is not None]
+    print(f"{args.changes} changes -> {len(delivered)}/{expected} deliveries"
+          f" ({len(latencies) - len(delivered)} resyncs) in {elapsed:.2f} s,"
+          f" {len(delivered) / elapsed:,.0f} frames/s")
+    if delivered:
+        print(f"  publish -> client latency p50 {percentile(delivered, 50) * 1000:.1f} ms,"
+              f" p99 {percentile(delivered, 99) * 1000:.1f} ms,"
+              f" max {max(delivered) * 1000:.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50.0, help="status changes per second")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                   XDG_CACHE_HOME=f"{tmp}/cache", EMAIL_HOST="")
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", "1",
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            wait_ready(base, proc)
+            asyncio.run(run(base, args))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""bench_logging.py
+
+Compare the v4 CLI's old logging setup with ``log_writer.setup_logging``.
+
+The old setup is ``logging.basicConfig(filename=...)``: every ``debug()`` call
+formats, writes and flushes the log file on the caller's thread. The new one
+only queues the record; a background listener writes and flushes in batches.
+Reports the time the calling thread spends in ``logging.debug`` for
+``--records`` messages, then how long the listener needs to drain the queue.
+
+Usage::
+
+    python benchmarks/bench_logging.py --records 200000
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "deleteMe_v4"))
+from log_writer import setup_logging  # noqa: E402
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def emit(records):
+    start = time.perf_counter()
+    for i in range(records):
+        logging.debug("Replayed %d journal entries for %s", i, "bench-user")
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reset_root()
+        logging.basicConfig(filename=f"{tmp}/old.log", filemode='a', level=logging.DEBUG,
+                            format='[%(asctime)s] %(levelname)s: %(message)s')
+        old = emit(args.records)
+        reset_root()
+        print(f"basicConfig file handler: {old:.2f} s in the caller"
+              f" ({old / args.records * 1e6:.1f} us/record)")
+
+        for json_lines in (False, True):
+            listener = setup_logging(f"{tmp}/{'json' if json_lines else 'text'}", json_lines=json_lines)
+            new = emit(args.records)
+            start = time.perf_counter()
+            listener.stop()
+            drain = time.perf_counter() - start
+            reset_root()
+            label = "JSON lines" if json_lines else "text"
+            print(f"queued writer ({label}): {new:.2f} s in the caller"
+                  f" ({new / args.records * 1e6:.1f} us/record), listener drained {drain:.2f} s later")
+
+
+if __name__ == "__main__":
+    main()
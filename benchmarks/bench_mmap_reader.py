@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""bench_mmap_reader.py
+
+Compare reading a large broker registry with ``csv.DictReader`` (as both
+``load_brokers()`` variants do) against ``MappedBrokerTable`` from
+``deleteMe_v4/broker_mmap.py``, for three jobs:
+
+* names   -- list every broker name
+* pending -- count brokers neither covered nor completed
+* rows    -- materialize every row as a dict
+
+Each job starts from the file on disk, so the mapped numbers include building
+the row index. Also reports memory retained by the loaded registry.
+
+Usage::
+
+    python benchmarks/bench_mmap_reader.py --rows 1000000
+"""
+
+import argparse
+import csv
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "deleteMe_v4"))
+
+from broker_mmap import MappedBrokerTable  # noqa: E402
+from broker_store import is_done  # noqa: E402
+
+SERVICES = ["", "", "", "Incogni", "DeleteMe", "Kanary", "Optery", "OneRep", "manual"]
+
+
+def write_registry(path, rows, schema, seed=0):
+    rnd = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        if schema == 'v4':
+            writer.writerow(['name', 'opt_out_link', 'covered_by', 'completed', 'link_health'])
+        else:
+            writer.writerow(['name', 'url', 'email', 'notes', 'covered_by', 'status'])
+        for i in range(rows):
+            name = f"Broker {i}, LLC"
+            link = f"https://privacyportal.example{i % 997}.com/webform/{i:08x}"
+            service = rnd.choice(SERVICES)
+            done = rnd.random() < 0.2
+            if schema == 'v4':
+                writer.writerow([name, link, service, done, 'ok' if i % 3 else ''])
+            else:
+                writer.writerow([name, link, f"privacy@example{i % 997}.com", '', service,
+                                 'Completed' if done else ''])
+
+
+def load_dicts(path):
+    # Mirrors deleteMe_v4/deleteMe.py:load_brokers(); v3 keeps DictReader's rows as they are.
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        if 'url' in reader.fieldnames:
+            return list(reader)
+        return [{
+            'name': row.get('name', '').strip(),
+            'opt_out_link': row.get('opt_out_link', '').strip(),
+            'covered_by': row.get('covered_by', '').strip(),
+            'completed': row.get('completed', 'False').strip().lower() == 'true',
+            'link_health': (row.get('link_health') or '').strip()
+        } for row in reader]
+
+
+def dict_pending(b):
+    if 'status' in b:
+        return not b['covered_by'].strip() and b['status'].strip().lower() != 'completed'
+    return not is_done(b)
+
+
+JOBS = {
+    'dicts': {
+        'names': lambda path: [b['name'] for b in load_dicts(path)],
+        'pending': lambda path: sum(1 for b in load_dicts(path) if dict_pending(b)),
+        'rows': load_dicts,
+    },
+    'mapped': {
+        'names': lambda path: list(MappedBrokerTable(path).names()),
+        'pending': lambda path: MappedBrokerTable(path).count_pending(),
+        'rows': lambda path: MappedBrokerTable(path).to_dicts(),
+    },
+}
+
+
+def timed(fn, path, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def retained(loader, path):
+    gc.collect()
+    tracemalloc.start()
+    table = loader(path)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del table
+    return current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--schema', choices=('v4', 'v3', 'both'), default='both')
+    args = parser.parse_args(argv)
+
+    for schema in (('v4', 'v3') if args.schema == 'both' else (args.schema,)):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            write_registry(path, args.rows, schema)
+            print(f"{schema}: {args.rows:,} brokers, {os.path.getsize(path) / 2**20:.0f} MiB")
+            for job in ('names', 'pending', 'rows'):
+                old, old_result = timed(JOBS['dicts'][job], path, args.repeat)
+                new, new_result = timed(JOBS['mapped'][job], path, args.repeat)
+                if job != 'rows':
+                    assert old_result == new_result, job
+                print(f"  {job:<8} DictReader {old:6.2f} s   mapped {new:6.2f} s   ({old / new:.1f}x)")
+            index, _ = timed(MappedBrokerTable, path, args.repeat)
+            print(f"  {'index':<8} {'':>10} {'':>8}   mapped {index:6.2f} s")
+            old_mem = retained(load_dicts, path)
+            new_mem = retained(MappedBrokerTable, path)
+            print(f"  {'memory':<8} DictReader {old_mem / 2**20:6.1f} MiB mapped {new_mem / 2**20:6.1f} MiB"
+                  f" (+ page cache)")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""bench_startup.py
+
+Time from launching ``deleteMe_v4/deleteMe.py`` to its first prompt.
+
+Two modes are measured: piped stdin/stdout (scripted use, splash auto-disabled)
+and a pseudo-terminal with the splash animation on. Both must reach the name
+prompt within ``--budget-ms``; the script exits non-zero otherwise.
+
+Usage::
+
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 100
+"""
+
+import argparse
+import os
+import select
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / "deleteMe_v4" / "deleteMe.py"
+PROMPT = "what’s your name?".encode('utf-8')
+
+
+def _env(home):
+    env = dict(os.environ, HOME=home, XDG_DATA_HOME=os.path.join(home, "data"))
+    env.pop("DELETEME_NO_SPLASH", None)
+    return env
+
+
+def time_piped(home):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, str(SCRIPT)], cwd=home, env=_env(home),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    out = b''
+    try:
+        while PROMPT not in out:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("deleteMe exited before prompting")
+            out += chunk
+        return time.perf_counter() - start
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def time_tty(home):
+    import pty
+
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(home)
+        os.execve(sys.executable, [sys.executable, str(SCRIPT)], _env(home))
+    out = b''
+    try:
+        while PROMPT not in out:
+            ready, _, _ = select.select([fd], [], [], 10)
+            if not ready:
+                raise RuntimeError("timed out waiting for prompt")
+            out += os.read(fd, 4096)
+        return time.perf_counter() - start
+    finally:
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        os.close(fd)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=100.0)
+    args = parser.parse_args(argv)
+
+    modes = {'piped': time_piped}
+    if os.name == 'posix':
+        modes['tty+splash'] = time_tty
+
+    failed = False
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        for label, timer in modes.items():
+            timer(home)  # warm the bytecode cache
+            samples = [timer(home) * 1000 for _ in range(args.runs)]
+            median = statistics.median(samples)
+            results[label] = median
+            ok = median <= args.budget_ms
+            failed |= not ok
+            print(f"{label:<11} time-to-first-prompt median {median:6.1f} ms "
+                  f"(min {min(samples):.1f}, max {max(samples):.1f}) {'OK' if ok else 'OVER BUDGET'}")
+    if failed:
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
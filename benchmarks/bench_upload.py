@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""bench_upload.py
+
+Upload a large broker CSV to ``POST /brokers/upload`` and report throughput and
+the server's peak memory.
+
+Writes a ``--rows``-row v4 CSV (about 95 bytes a row, so the default is ~50 MB;
+every 1000th row has an invalid link to exercise the error report), starts
+``uvicorn app.main:app`` on a throwaway database and sends the file as a
+multipart form. Peak RSS is read from ``/proc/<pid>/status`` (Linux only)
+before and after the upload.
+
+Usage::
+
+    python benchmarks/bench_upload.py --rows 550000
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_web import ROOT, free_port, wait_ready  # noqa: E402
+
+
+def write_registry(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["name", "opt_out_link", "covered_by", "completed"])
+        for i in range(rows):
+            name = f'Broker {i}, "Holdings" LLC' if i % 7 == 0 else f"Broker {i}"
+            link = f"https://broker{i}.example.com/privacy/opt-out?ref=bench-{i:08d}" if i % 1000 else f"ftp://broker{i}"
+            writer.writerow([name, link, "Incogni;DeleteMe" if i % 3 == 0 else "", "False"])
+
+
+def peak_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=550_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "registry.csv"
+        write_registry(csv_path, args.rows)
+        size_mb = csv_path.stat().st_size / 2**20
+
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                   XDG_CACHE_HOME=f"{tmp}/cache", EMAIL_HOST="")
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            wait_ready(base, proc)
+            with httpx.Client(base_url=base, timeout=None) as client:
+                client.post("/start", data={"username": "bench"})   # uploads need a session
+                before = peak_rss_mb(proc.pid)
+                start = time.perf_counter()
+                with open(csv_path, "rb") as fh:
+                    resp = client.post("/brokers/upload", files={"file": ("registry.csv", fh, "text/csv")})
+                elapsed = time.perf_counter() - start
+            resp.raise_for_status()
+            report = resp.json()
+            after = peak_rss_mb(proc.pid)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print(f"{size_mb:.1f} MB, {report['rows']:,} rows ({report['schema']}) in {elapsed:.2f} s"
+          f" -> {report['rows'] / elapsed:,.0f} rows/s, {size_mb / elapsed:.1f} MB/s")
+    print(f"  added {report['added']:,}, rejected {report['rejected']:,}"
+          f" ({len(report['errors'])} listed{', truncated' if report['errors_truncated'] else ''})")
+    print(f"  server peak RSS {before:.1f} MB before upload, {after:.1f} MB after")
+
+
+if __name__ == "__main__":
+    main()
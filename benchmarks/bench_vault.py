@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""bench_vault.py
+
+Compare reading user data from v3 ``footprint_scrubber.py``:
+
+* before -- what option 3 used to do on every use: read the ``.key`` file,
+  build a ``Fernet``, decrypt the whole ``user_data.enc`` and ``json.loads`` it
+* after  -- ``ProfileVault``: one scrypt unlock per session, then reading a
+  single field (first read decrypts that field only; repeats hit the cache)
+
+Usage::
+
+    python benchmarks/bench_vault.py --reads 1000
+"""
+
+import argparse
+import importlib.util
+import json
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+USER_DATA = {
+    'full_name': "Jane Q. Public",
+    'emails': [f"jane{i}@example.com" for i in range(5)],
+    'usernames': [f"janeq{i}" for i in range(10)],
+    'phone_numbers': ["555-0100", "555-0101"],
+    'addresses': [f"{i} Main St, Springfield" for i in range(20)],
+}
+
+
+def load_scrubber():
+    spec = importlib.util.spec_from_file_location(
+        "footprint_scrubber", ROOT / "deleteMe_v3" / "footprint_scrubber.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--reads", type=int, default=1000)
+    parser.add_argument("--unlocks", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    fs = load_scrubber()
+    if not fs.CRYPTO_AVAILABLE:
+        raise SystemExit("cryptography not installed; install with 'pip install cryptography'.")
+    from cryptography.fernet import Fernet
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        legacy = tmp / "user_data.enc"
+        key = Fernet.generate_key()
+        legacy.with_suffix('.key').write_bytes(key)
+        legacy.write_bytes(Fernet(key).encrypt(json.dumps(USER_DATA).encode()))
+
+        def legacy_read():
+            cipher = Fernet(legacy.with_suffix('.key').read_bytes())
+            return json.loads(cipher.decrypt(legacy.read_bytes()).decode())['emails']
+
+        vault = fs.ProfileVault(tmp / "user_data.vault")
+        vault.create("correct horse")
+        vault.update(USER_DATA)
+
+        def unlock():
+            v = fs.ProfileVault(tmp / "user_data.vault")
+            v.unlock("correct horse")
+            return v
+
+        def first_read():
+            vault._plain.clear()
+            return vault['emails']
+
+        t_legacy = per_call(legacy_read, args.reads)
+        t_unlock = per_call(unlock, args.unlocks)
+        t_first = per_call(first_read, args.reads)
+        t_cached = per_call(lambda: vault['emails'], args.reads * 100)
+
+    print(f"scrypt n={fs.VAULT_KDF['n']} r={fs.VAULT_KDF['r']} p={fs.VAULT_KDF['p']}")
+    print(f"  before  key file + Fernet + whole blob    {t_legacy * 1e6:10.1f} us per read")
+    print(f"  after   unlock (once per session)         {t_unlock * 1e6:10.1f} us")
+    print(f"  after   one field, first read             {t_first * 1e6:10.1f} us "
+          "(decrypt + parse that field)")
+    print(f"  after   one field, cached                 {t_cached * 1e6:10.3f} us")
+
+
+if __name__ == "__main__":
+    main()
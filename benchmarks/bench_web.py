@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""bench_web.py
+
+Load-test the FastAPI app and report p50/p99 latency per route.
+
+Starts ``uvicorn app.main:app`` on a free port with a throwaway database and
+cache dir, signs in ``--users`` users (each gets every bundled broker, so
+``/welcome`` streams a ~1,000-row table), then fires ``--requests``
+GETs per route from ``--concurrency`` client threads. For streamed pages the
+time to first byte is reported next to the total.
+
+Also times template compilation with a cold vs. warm bytecode cache.
+
+Usage::
+
+    python benchmarks/bench_web.py --requests 500 --concurrency 16
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("uvicorn exited during startup")
+        try:
+            httpx.get(base + "/", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise SystemExit("uvicorn did not start")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def timed_get(client, url, cookies=None):
+    start = time.perf_counter()
+    headers = {"Cookie": "; ".join(f"{k}={v}" for k, v in cookies.items())} if cookies else None
+    with client.stream("GET", url, headers=headers) as resp:
+        first = None
+        for _ in resp.iter_raw():
+            if first is None:
+                first = time.perf_counter() - start
+        resp.raise_for_status()
+    return first or 0.0, time.perf_counter() - start
+
+
+def load(base, request_for, requests, concurrency):
+    with httpx.Client(base_url=base, timeout=30,
+                      limits=httpx.Limits(max_connections=concurrency)) as client:
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(lambda i: timed_get(client, *request_for(i)), range(requests)))
+
+
+def bytecode_cold_warm(cache_dir):
+    from app.core.templating import make_templates, precompile
+    directory = ROOT / "app" / "templates"
+    times = []
+    for _ in range(2):
+        templates = make_templates(str(directory), cache_dir)
+        start = time.perf_counter()
+        precompile(templates)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                   XDG_CACHE_HOME=f"{tmp}/cache", EMAIL_HOST="")
+        os.environ.update(XDG_CACHE_HOME=env["XDG_CACHE_HOME"])
+        sys.path.insert(0, str(ROOT))
+        cold, warm = bytecode_cold_warm(Path(tmp) / "jinja-bench")
+        print(f"template compile: cold {cold * 1000:.1f} ms, warm bytecode cache {warm * 1000:.1f} ms")
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT, env=env,
+        )
+        try:
+            wait_ready(base, proc)
+            sessions = []
+            for i in range(args.users):
+                resp = httpx.post(base + "/start", data={"username": f"user{i}"})
+                sessions.append(dict(resp.cookies))
+
+            routes = {
+                "/": lambda i: ("/",),
+                "/welcome": lambda i: ("/welcome", sessions[i % len(sessions)]),
+            }
+            print(f"{args.requests} requests per route, {args.concurrency} concurrent")
+            for route, request_for in routes.items():
+                load(base, request_for, min(50, args.requests), args.concurrency)  # warm-up
+                results = load(base, request_for, args.requests, args.concurrency)
+                ttfb = [r[0] for r in results]
+                total = [r[1] for r in results]
+                print(f"  {route:<22} p50 {percentile(total, 50) * 1000:7.1f} ms"
+                      f"   p99 {percentile(total, 99) * 1000:7.1f} ms"
+                      f"   (first byte p50 {percentile(ttfb, 50) * 1000:6.1f} ms,"
+                      f" p99 {percentile(ttfb, 99) * 1000:6.1f} ms;"
+                      f" mean {statistics.mean(total) * 1000:.1f} ms)")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
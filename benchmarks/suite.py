@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""suite.py
+
+Regression-checked benchmark suite for the registry and web hot paths.
+
+Every case runs against synthetic registries of 1k, 100k and 1M brokers
+(``--sizes``); each run repeats the timed call ``--repeat`` times after an
+untimed setup and keeps the median. Medians are compared with the stored
+baselines in ``benchmarks/baselines.json``: a case slower than its baseline by
+more than the threshold (``--threshold``, or the case's own, looser, value for
+the noisier web routes) and by over a millisecond is reported as a regression,
+and the script exits 1.
+
+Cases::
+
+    v3.load_brokers / v3.save_brokers      deleteMe_v3 CSV round trip
+    v3._filter_brokers                     uncovered brokers for two paid services
+    v3.auto_mark_coverage                  load, mark one service, save
+    v3.export_email_templates              mbox export of every uncovered broker
+    v4.load_brokers / v4.save_brokers      deleteMe_v4 CSV round trip
+    web GET / and GET /welcome             FastAPI app in-process, signed-in user
+
+Baselines are machine-specific: record your own before comparing, e.g.::
+
+    python benchmarks/suite.py --sizes 1k,100k --save-baseline
+    python benchmarks/suite.py --sizes 1k,100k           # later, after a change
+    python benchmarks/suite.py --filter v3. --sizes 1m   # one group, one size
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines.json"
+
+SIZES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_SIZES = '1k,100k'
+DEFAULT_THRESHOLD = 1.25   # median may be up to 25% slower than its baseline
+NOISE_FLOOR = 0.001        # seconds; smaller slowdowns are timer noise, never regressions
+PAID = ["Incogni", "Kanary"]
+SERVICES = ["", "", "", "None", "Incogni", "DeleteMe", "Incogni;DeleteMe", "Kanary",
+            "Optery;OneRep", "JustDelete.me"]
+
+CASES = []
+
+
+class Bench:
+    """One prepared measurement: ``run`` is timed, ``setup`` runs untimed before each repeat."""
+
+    def __init__(self, run, setup=None, teardown=None):
+        self.run = run
+        self.setup = setup
+        self.teardown = teardown
+
+
+def case(name, sizes=tuple(SIZES), threshold=None):
+    def register(fn):
+        CASES.append((name, fn, sizes, threshold))
+        return fn
+    return register
+
+
+# -----------------------------------------------------------------------------
+# Synthetic registries (written once per size and shared between cases)
+# -----------------------------------------------------------------------------
+class Workspace:
+    def __init__(self, root):
+        self.root = Path(root)
+        self._files = {}
+        self._modules = {}
+
+    def registry(self, version, n):
+        key = (version, n)
+        if key not in self._files:
+            path = self.root / f"{version}_{n}.csv"
+            rnd = random.Random(n)
+            with open(path, 'w', newline='', encoding='utf-8') as fh:
+                writer = csv.writer(fh)
+                if version == 'v3':
+                    writer.writerow(['name', 'url', 'email', 'notes', 'covered_by', 'status'])
+                    for i in range(n):
+                        email = f"privacy@broker{i}.example.com" if i % 10 == 0 else ''
+                        writer.writerow([f"Broker {i}", f"https://broker{i}.example.com/optout",
+                                         email, '', rnd.choice(SERVICES), ''])
+                else:
+                    writer.writerow(['name', 'opt_out_link', 'covered_by', 'completed', 'link_health'])
+                    for i in range(n):
+                        covered = rnd.choice(SERVICES)
+                        writer.writerow([f"Broker {i}", f"https://broker{i}.example.com/optout",
+                                         covered, str(bool(covered)), ''])
+            self._files[key] = path
+        return self._files[key]
+
+    def scratch(self, name):
+        path = self.root / name
+        path.mkdir(exist_ok=True)
+        return path
+
+    def v3(self):
+        if 'v3' not in self._modules:
+            import importlib.util
+            spec = importlib.util.spec_from_file_location(
+                "footprint_scrubber", ROOT / "deleteMe_v3" / "footprint_scrubber.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.APP_DIR = self.scratch("v3")
+            self._modules['v3'] = module
+        return self._modules['v3']
+
+    def v4(self):
+        if 'v4' not in self._modules:
+            # deleteMe.py creates its data dir at import; keep it inside the workspace.
+            os.environ['XDG_DATA_HOME'] = str(self.scratch("data"))
+            sys.path.insert(0, str(ROOT / "deleteMe_v4"))
+            import deleteMe
+            deleteMe.journal = None
+            self._modules['v4'] = deleteMe
+        return self._modules['v4']
+
+    def web(self):
+        if 'web' not in self._modules:
+            os.environ['XDG_CACHE_HOME'] = str(self.scratch("cache"))
+            sys.path.insert(0, str(ROOT))
+            from app import config
+            from app.core.storage import Storage
+            from app.main import app
+            from fastapi.testclient import TestClient
+            self._modules['web'] = (config, Storage, app, TestClient)
+        return self._modules['web']
+
+
+def quiet(fn):
+    """``fn`` with its prints swallowed (the v3 helpers report to stdout)."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+# -----------------------------------------------------------------------------
+# v3
+# -----------------------------------------------------------------------------
+@case("v3.load_brokers")
+def v3_load(ws, n):
+    fs = ws.v3()
+    path = ws.registry('v3', n)
+
+    def setup():
+        fs.BROKERS_FILE = path
+    return Bench(fs.load_brokers, setup)
+
+
+@case("v3.save_brokers")
+def v3_save(ws, n):
+    fs = ws.v3()
+    fs.BROKERS_FILE = ws.registry('v3', n)
+    brokers = fs.load_brokers()
+    out = ws.scratch("v3") / "saved.csv"
+
+    def setup():
+        fs.BROKERS_FILE = out
+    return Bench(lambda: fs._save_brokers(brokers), setup)
+
+
+@case("v3._filter_brokers")
+def v3_filter(ws, n):
+    fs = ws.v3()
+    fs.BROKERS_FILE = ws.registry('v3', n)
+    brokers = fs.load_brokers()
+    brokers.coverage   # built once per load, as in the app
+    return Bench(lambda: fs._filter_brokers(brokers, PAID))
+
+
+@case("v3.auto_mark_coverage")
+def v3_auto_mark(ws, n):
+    fs = ws.v3()
+    source = ws.registry('v3', n)
+    target = ws.scratch("v3") / "marked.csv"
+
+    def setup():
+        shutil.copyfile(source, target)
+        fs.BROKERS_FILE = target
+    return Bench(quiet(lambda: fs.auto_mark_coverage("Optery")), setup)
+
+
+@case("v3.export_email_templates")
+def v3_export(ws, n):
+    fs = ws.v3()
+    fs.BROKERS_FILE = ws.registry('v3', n)
+    brokers = fs.load_brokers()
+    user = {'full_name': "Alex Example", 'emails': ["alex@example.com"], 'usernames': ["alexe"],
+            'phone_numbers': ["555-0100"], 'addresses': ["1 Main St, Springfield"]}
+    return Bench(quiet(lambda: fs.export_email_templates(brokers, user, PAID, fmt='mbox')))
+
+
+# -----------------------------------------------------------------------------
+# v4
+# -----------------------------------------------------------------------------
+@case("v4.load_brokers")
+def v4_load(ws, n):
+    dm = ws.v4()
+    path = ws.registry('v4', n)
+
+    def setup():
+        dm.BROKERS_FILE, dm.journal = str(path), None
+    return Bench(dm.load_brokers, setup)
+
+
+@case("v4.save_brokers")
+def v4_save(ws, n):
+    dm = ws.v4()
+    dm.BROKERS_FILE, dm.journal = str(ws.registry('v4', n)), None
+    brokers = dm.load_brokers()
+    out = str(ws.scratch("v4") / "saved.csv")
+
+    def setup():
+        dm.BROKERS_FILE, dm.journal = out, None
+    return Bench(lambda: dm.save_brokers(brokers), setup)
+
+
+# -----------------------------------------------------------------------------
+# Web
+# -----------------------------------------------------------------------------
+def _web_client(ws, n):
+    config, Storage, app, TestClient = ws.web()
+    db = ws.root / f"web_{n}.db"
+    if not db.exists():
+        storage = Storage(str(db))
+        with open(ws.registry('v4', n), newline='', encoding='utf-8') as fh:
+            storage.import_brokers(csv.DictReader(fh))
+        storage.close()
+    config.DATABASE_URL = f"sqlite:///{db}"
+    client = TestClient(app)
+    client.__enter__()
+    client.post("/start", data={"username": "bench"}, follow_redirects=False)
+    return client
+
+
+def _get(client, url):
+    def run():
+        resp = client.get(url)
+        resp.raise_for_status()
+        return len(resp.content)
+    return run
+
+
+# Rendering 1M table rows is not a realistic page; the web cases stop at 100k.
+@case("web GET /", sizes=('1k', '100k'), threshold=1.5)
+def web_home(ws, n):
+    client = _web_client(ws, n)
+    return Bench(_get(client, "/"), teardown=lambda: client.__exit__(None, None, None))
+
+
+@case("web GET /welcome", sizes=('1k', '100k'), threshold=1.5)
+def web_welcome(ws, n):
+    client = _web_client(ws, n)
+    return Bench(_get(client, "/welcome"), teardown=lambda: client.__exit__(None, None, None))
+
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+def measure(bench, repeat):
+    times = []
+    for _ in range(repeat):
+        if bench.setup:
+            bench.setup()
+        start = time.perf_counter()
+        bench.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times)
+
+
+def load_baselines(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {'results': {}}
+
+
+def save_baselines(path, baselines):
+    baselines['machine'] = f"{platform.node()} / {platform.machine()} / Python {platform.python_version()}"
+    tmp_path = str(path) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(baselines, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated, from {','.join(SIZES)}")
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed median / baseline ratio (default: %(default)s)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these medians as the new baselines instead of comparing")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip().lower() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s) {', '.join(unknown)}; choose from {', '.join(SIZES)}")
+    baselines = load_baselines(args.baseline)
+    stored = baselines.setdefault('results', {})
+
+    regressions = 0
+    print(f"{'case':<30} {'size':>5} {'median ms':>11} {'min ms':>10} {'baseline':>10} {'ratio':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        ws = Workspace(tmp)
+        for name, factory, case_sizes, case_threshold in CASES:
+            if args.filter not in name:
+                continue
+            for size in sizes:
+                if size not in case_sizes:
+                    continue
+                key = f"{name}[{size}]"
+                bench = factory(ws, SIZES[size])
+                try:
+                    median, fastest = measure(bench, args.repeat)
+                finally:
+                    if bench.teardown:
+                        bench.teardown()
+
+                line = f"{name:<30} {size:>5} {median * 1000:>11.1f} {fastest * 1000:>10.1f}"
+                if args.save_baseline:
+                    stored[key] = {'median': round(median, 6)}
+                    print(f"{line} {'saved':>10}")
+                    continue
+                base = stored.get(key)
+                if base is None:
+                    print(f"{line} {'-':>10} {'-':>7}  (no baseline)")
+                    continue
+                ratio = median / base['median']
+                limit = max(args.threshold, case_threshold or 0)
+                if ratio > limit and median - base['median'] > NOISE_FLOOR:
+                    verdict = "REGRESSION"
+                else:
+                    verdict = "faster" if ratio < 1 / limit else "ok"
+                regressions += verdict == "REGRESSION"
+                print(f"{line} {base['median'] * 1000:>10.1f} {ratio:>6.2f}x  {verdict}")
+
+    if args.save_baseline:
+        save_baselines(args.baseline, baselines)
+        print(f"Baselines written to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} case(s) regressed beyond the threshold")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
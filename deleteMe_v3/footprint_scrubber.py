@@ -13,21 +13,32 @@ Highlights
 Author: William “TwoWheelJunky” Peterson, 2025‑06‑19
 """
 
+import base64
 import csv
+import getpass
+import hashlib
 import json
+import os
+import re
+import time
 import webbrowser
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain, compress
 from pathlib import Path
 
 # Optional encryption
 try:
-    from cryptography.fernet import Fernet
+    from cryptography.fernet import Fernet, InvalidToken
     CRYPTO_AVAILABLE = True
 except ImportError:
     CRYPTO_AVAILABLE = False
 
 APP_DIR = Path(__file__).resolve().parent
 BROKERS_FILE = APP_DIR / "brokers.csv"
-USER_DATA_FILE = APP_DIR / "user_data.enc"
+USER_DATA_FILE = APP_DIR / "user_data.enc"      # pre-vault format, migrated on first unlock
+VAULT_FILE = APP_DIR / "user_data.vault"
 CONFIG_FILE = APP_DIR / "scrubber_config.json"
 
 PAID_SERVICES = ["Incogni", "DeleteMe", "Kanary", "Optery", "OneRep"]
@@ -101,51 +112,271 @@ def collect_user_data():
     }
     return user_data
 
-def _encrypt_and_save(data: dict, path: Path):
-    from cryptography.fernet import Fernet
-    key_path = path.with_suffix('.key')
-    if not key_path.exists():
-        key = Fernet.generate_key()
-        key_path.write_bytes(key)
+# scrypt cost: ~32 MiB and a fraction of a second, paid once per session in unlock().
+VAULT_KDF = {'n': 2 ** 15, 'r': 8, 'p': 1}
+
+class ProfileVault:
+    """Passphrase-protected user profile with every field encrypted separately.
+
+    ``unlock()`` derives the Fernet key from the passphrase with scrypt and keeps
+    it in memory, so later reads skip both the key derivation and the key file.
+    Each profile field is its own token: ``vault['emails']`` decrypts and parses
+    just that field, once per session.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._doc = json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+        self._cipher = None
+        self._plain = {}
+
+    @property
+    def exists(self):
+        return self._doc is not None
+
+    @property
+    def unlocked(self):
+        return self._cipher is not None
+
+    @staticmethod
+    def _derive(passphrase: str, kdf: dict):
+        key = hashlib.scrypt(
+            passphrase.encode(), salt=base64.b64decode(kdf['salt']),
+            n=kdf['n'], r=kdf['r'], p=kdf['p'], maxmem=256 * kdf['n'] * kdf['r'], dklen=32,
+        )
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def create(self, passphrase: str):
+        kdf = dict(VAULT_KDF, salt=base64.b64encode(os.urandom(16)).decode())
+        self._cipher = self._derive(passphrase, kdf)
+        self._doc = {
+            'version': 1,
+            'kdf': kdf,
+            'check': self._cipher.encrypt(b'deleteMe').decode(),
+            'fields': {},
+        }
+        self._plain = {}
+        self.save()
+
+    def unlock(self, passphrase: str):
+        cipher = self._derive(passphrase, self._doc['kdf'])
+        try:
+            cipher.decrypt(self._doc['check'].encode())
+        except InvalidToken:
+            raise ValueError("Wrong passphrase") from None
+        self._cipher = cipher
+
+    def __contains__(self, field):
+        return field in self._doc['fields']
+
+    def __getitem__(self, field):
+        if field not in self._plain:
+            token = self._doc['fields'][field]
+            self._plain[field] = json.loads(self._cipher.decrypt(token.encode()))
+        return self._plain[field]
+
+    def get(self, field, default=None):
+        return self[field] if field in self else default
+
+    def update(self, data: dict):
+        for field, value in data.items():
+            self._doc['fields'][field] = self._cipher.encrypt(json.dumps(value).encode()).decode()
+            self._plain[field] = value
+        self.save()
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self._doc, indent=2), encoding='utf-8')
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+
+_vault = None
+
+def _load_legacy_user_data(path: Path):
+    """Decrypt a pre-vault ``user_data.enc`` with the key file stored beside it."""
+    key = path.with_suffix('.key').read_bytes()
+    return json.loads(Fernet(key).decrypt(path.read_bytes()).decode())
+
+def open_vault():
+    """The session's unlocked vault, asking for the passphrase only the first time."""
+    global _vault
+    if _vault is not None:
+        return _vault
+    vault = ProfileVault(VAULT_FILE)
+    if vault.exists:
+        for _ in range(3):
+            try:
+                vault.unlock(getpass.getpass("Vault passphrase: "))
+                break
+            except ValueError:
+                print("Wrong passphrase.")
+        else:
+            return None
     else:
-        key = key_path.read_bytes()
-    cipher = Fernet(key)
-    token = cipher.encrypt(json.dumps(data).encode())
-    path.write_bytes(token)
+        print("Choose a passphrase to protect your personal data (it is never stored).")
+        while True:
+            passphrase = getpass.getpass("New vault passphrase: ")
+            if passphrase and passphrase == getpass.getpass("Repeat passphrase: "):
+                break
+            print("Passphrases were empty or did not match; try again.")
+        vault.create(passphrase)
+        legacy_key = USER_DATA_FILE.with_suffix('.key')
+        if USER_DATA_FILE.exists() and legacy_key.exists():
+            vault.update(_load_legacy_user_data(USER_DATA_FILE))
+            USER_DATA_FILE.unlink()
+            legacy_key.unlink()
+            print(f"Moved existing user data into the vault and removed the plain-text key ➜ {VAULT_FILE}")
+    _vault = vault
+    return vault
 
 def _save_plain(data: dict, path: Path):
     path.write_text(json.dumps(data, indent=2))
 
 def save_user_data(data: dict):
     if CRYPTO_AVAILABLE:
-        _encrypt_and_save(data, USER_DATA_FILE)
-        print(f"Encrypted user data saved ➜ {USER_DATA_FILE}")
+        vault = open_vault()
+        if vault is None:
+            print("Vault is locked; user data not saved.")
+            return
+        vault.update(data)
+        print(f"Encrypted user data saved ➜ {VAULT_FILE}")
     else:
         _save_plain(data, USER_DATA_FILE.with_suffix('.json'))
         print("cryptography not installed; saved unencrypted JSON. Install with 'pip install cryptography' for encryption.")
 
+def load_user_data():
+    """Stored user data (the unlocked vault, or the plain JSON fallback); None if there is none."""
+    if CRYPTO_AVAILABLE:
+        if not (VAULT_FILE.exists() or USER_DATA_FILE.exists()):
+            return None
+        vault = open_vault()
+        return vault if vault is not None and 'full_name' in vault else None
+    plain = USER_DATA_FILE.with_suffix('.json')
+    return json.loads(plain.read_text()) if plain.exists() else None
+
 # -----------------------------------------------------------------------------
 # Broker helpers
 # -----------------------------------------------------------------------------
+BROKER_FIELDS = ['name', 'url', 'email', 'notes', 'covered_by', 'status']
+
+class BrokerList(list):
+    """List of broker rows that carries its precomputed coverage bitmasks."""
+    _coverage = None
+
+    @property
+    def coverage(self):
+        if self._coverage is None or self._coverage.size != len(self):
+            self._coverage = CoverageIndex(self)
+        return self._coverage
+
+class CoverageIndex:
+    """`covered_by` as bitmasks, computed once per registry.
+
+    Every known service gets one bit. ``masks[i]`` holds the services covering
+    broker ``i``, and ``rows[bit]`` is the transposed view: an int with bit ``i``
+    set for every broker that service covers. Filtering and bulk marking are then
+    a handful of big-int AND/OR operations over the whole registry, and service
+    names match exactly (case-insensitive), never as substrings.
+    """
+
+    # Bit-to-bool expansion of one byte, for turning a row bitmap into a selector.
+    _BYTE_BITS = [tuple(bool(b >> k & 1) for k in range(8)) for b in range(256)]
+
+    def __init__(self, brokers):
+        self.size = len(brokers)
+        self.bits = {}      # casefolded service -> bit number
+        self.names = []     # bit number -> service name as first seen
+        self.rows = []      # bit number -> row bitmap
+        self.masks = []
+        for b in PAID_SERVICES + list(FREE_SERVICES):
+            self.bit_for(b)
+        by_value = {}
+        members = {}
+        for i, b in enumerate(brokers):
+            value = b.get('covered_by') or ''
+            mask = by_value.get(value)
+            if mask is None:
+                mask = by_value[value] = self._parse(value)
+            self.masks.append(mask)
+            if mask:
+                members.setdefault(mask, []).append(i)
+        nbytes = (self.size + 7) // 8
+        for mask, ids in members.items():
+            packed = bytearray(nbytes)
+            for i in ids:
+                packed[i >> 3] |= 1 << (i & 7)
+            selected = int.from_bytes(packed, 'little')
+            for bit in range(mask.bit_length()):
+                if mask >> bit & 1:
+                    self.rows[bit] |= selected
+
+    def _parse(self, value):
+        mask = 0
+        for svc in value.split(';'):
+            svc = svc.strip()
+            if svc and svc.lower() != 'none':
+                mask |= 1 << self.bit_for(svc)
+        return mask
+
+    @property
+    def all_rows(self):
+        return (1 << self.size) - 1
+
+    def bit_for(self, service):
+        key = service.strip().casefold()
+        bit = self.bits.get(key)
+        if bit is None:
+            bit = self.bits[key] = len(self.names)
+            self.names.append(service.strip())
+            self.rows.append(0)
+        return bit
+
+    def covering(self, services):
+        """Row bitmap of brokers covered by any of ``services``."""
+        selected = 0
+        for s in services:
+            bit = self.bits.get(s.strip().casefold())
+            if bit is not None:
+                selected |= self.rows[bit]
+        return selected
+
+    def select(self, brokers, row_bitmap):
+        """Brokers whose bit is set in ``row_bitmap``, in registry order."""
+        if not row_bitmap:
+            return []
+        data = row_bitmap.to_bytes((self.size + 7) // 8, 'little')
+        selector = chain.from_iterable(map(self._BYTE_BITS.__getitem__, data))
+        return list(compress(brokers, selector))
+
+    def mark(self, service):
+        """Cover every broker with ``service``; return the bitmap of rows that changed."""
+        bit = self.bit_for(service)
+        changed = self.all_rows & ~self.rows[bit]
+        self.rows[bit] |= changed
+        flag = 1 << bit
+        self.masks = [m | flag for m in self.masks]
+        return changed
+
 def load_brokers():
     # CSV columns: name,url,email,notes,covered_by,status
     if not BROKERS_FILE.exists():
         print(f"Broker list not found: {BROKERS_FILE}")
-        return []
-    with BROKERS_FILE.open(newline='', encoding='utf‑8') as fh:
+        return BrokerList()
+    with BROKERS_FILE.open(newline='', encoding='utf-8') as fh:
         reader = csv.DictReader(fh)
-        return list(reader)
+        return BrokerList(reader)
+
+def _save_brokers(brokers):
+    with BROKERS_FILE.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=BROKER_FIELDS)
+        writer.writeheader()
+        writer.writerows(brokers)
 
 def _filter_brokers(brokers, paid_services):
     if not paid_services:
         return brokers
-    ps = {s.lower() for s in paid_services}
-    filtered = []
-    for b in brokers:
-        covered = {svc.strip().lower() for svc in b.get('covered_by', '').split(';') if svc.strip()}
-        if not covered.intersection(ps):
-            filtered.append(b)
-    return filtered
+    coverage = brokers.coverage if isinstance(brokers, BrokerList) else CoverageIndex(brokers)
+    return coverage.select(brokers, coverage.all_rows & ~coverage.covering(paid_services))
 
 def open_opt_out_pages(brokers, paid_services):
     targets = _filter_brokers(brokers, paid_services)
@@ -154,31 +385,117 @@ def open_opt_out_pages(brokers, paid_services):
             print(f"Opening {b['name']} : {b['url']}")
             webbrowser.open(b['url'])
 
-def export_email_templates(brokers, user_data, paid_services):
-    targets = _filter_brokers(brokers, paid_services)
-    out_dir = APP_DIR / "emails"
-    out_dir.mkdir(exist_ok=True)
-    for b in targets:
-        if b.get('email'):
-            tpl = f"""Subject: Data Privacy Request – {user_data['full_name']}
+LETTER_TEMPLATE = """Subject: Data Privacy Request – {full_name}
 
-Dear {b['name']} Privacy Team,
+Dear {broker} Privacy Team,
 
 I am exercising my privacy rights and request the removal of my personal data from your systems.
 
 Identifiers:
-- Full name: {user_data['full_name']}
-- Email(s): {', '.join(user_data['emails'])}
-- Phone(s): {', '.join(user_data['phone_numbers'])}
-- Address(es): {', '.join(user_data['addresses'])}
+- Full name: {full_name}
+- Email(s): {emails}
+- Phone(s): {phone_numbers}
+- Address(es): {addresses}
 
 Please confirm once completed.
 
 Sincerely,
-{user_data['full_name']}
+{full_name}
 """
-            (out_dir / f"{b['name'].lower().replace(' ', '_')}.txt").write_text(tpl)
-    print(f"Email drafts saved to ➜ {out_dir}")
+EXPORT_FORMATS = ('dir', 'zip', 'mbox')
+EXPORT_BATCH_SIZE = 1000
+EXPORT_WORKERS = min(8, os.cpu_count() or 1)
+
+_UNSAFE_FILENAME = re.compile(r'[^a-z0-9._-]+')
+
+class LetterTemplate:
+    """A letter with the user's details filled in once.
+
+    Only the broker name differs between letters, so the template is split
+    around it up front and rendering one letter is a single ``str.join``.
+    """
+
+    _SLOT = '\x00broker\x00'
+
+    def __init__(self, text, user_data):
+        filled = text.format(
+            broker=self._SLOT,
+            full_name=user_data['full_name'],
+            emails=', '.join(user_data['emails']),
+            phone_numbers=', '.join(user_data['phone_numbers']),
+            addresses=', '.join(user_data['addresses']),
+        )
+        self._parts = filled.split(self._SLOT)
+
+    def render(self, broker):
+        return broker['name'].join(self._parts)
+
+def letter_filenames(brokers, suffix='.txt'):
+    """One safe, distinct file name per broker, in order.
+
+    Names are lower-cased and anything outside ``[a-z0-9._-]`` (``/`` included)
+    becomes ``_``; repeats get ``-2``, ``-3``, ... so no letter overwrites another.
+    """
+    taken = set()
+    names = []
+    for b in brokers:
+        stem = _UNSAFE_FILENAME.sub('_', b['name'].lower()).strip('._')[:100] or 'broker'
+        name, n = stem + suffix, 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}{suffix}"
+        taken.add(name)
+        names.append(name)
+    return names
+
+def _mbox_entry(template, stamp, broker):
+    body = template.render(broker).replace('\nFrom ', '\n>From ')
+    return f"From deleteMe@localhost {stamp}\nTo: {broker['email']}\n{body}\n"
+
+def _render_batch(render, batch):
+    return [render(broker) for _, broker in batch]
+
+def _write_letters(out_dir, template, batch):
+    for name, broker in batch:
+        with open(out_dir / name, 'w', encoding='utf-8') as fh:
+            fh.write(template.render(broker))
+
+def export_email_templates(brokers, user_data, paid_services, fmt='dir',
+                           workers=EXPORT_WORKERS, batch_size=EXPORT_BATCH_SIZE):
+    """Write one opt-out letter per uncovered broker with an email address.
+
+    ``fmt`` is ``'dir'`` (``emails/<broker>.txt``), ``'zip'`` (``emails.zip``) or
+    ``'mbox'`` (``emails.mbox``). Letters are rendered in batches on a thread
+    pool; the zip and mbox are written from the main thread in batch order.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}; expected one of {EXPORT_FORMATS}")
+    targets = [b for b in _filter_brokers(brokers, paid_services) if b.get('email')]
+    template = LetterTemplate(LETTER_TEMPLATE, user_data)
+    pairs = list(zip(letter_filenames(targets), targets))
+    batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if fmt == 'dir':
+            out = APP_DIR / "emails"
+            out.mkdir(exist_ok=True)
+            # list() so a failed write surfaces here instead of being dropped.
+            list(pool.map(partial(_write_letters, out, template), batches))
+        elif fmt == 'zip':
+            out = APP_DIR / "emails.zip"
+            render = partial(_render_batch, template.render)
+            with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+                for batch, texts in zip(batches, pool.map(render, batches)):
+                    for (name, _), text in zip(batch, texts):
+                        zf.writestr(name, text)
+        else:
+            out = APP_DIR / "emails.mbox"
+            render = partial(_render_batch, partial(_mbox_entry, template, time.asctime()))
+            with open(out, 'w', encoding='utf-8', buffering=1 << 20) as fh:
+                for texts in pool.map(render, batches):
+                    fh.write(''.join(texts))
+    print(f"{len(targets)} email drafts saved to ➜ {out}")
+    return out
 
 def open_free_resources(free_services):
     for name in free_services:
@@ -270,40 +587,30 @@ def broker_editor():
             print("Invalid selection.")
 
     # Save brokers back to CSV
-    with BROKERS_FILE.open('w', newline='', encoding='utf-8') as f:
-        fieldnames = ['name', 'url', 'email', 'notes', 'covered_by', 'status']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(brokers)
+    _save_brokers(brokers)
 
 
-def auto_mark_coverage(service):
-    brokers = load_brokers()
-    updated = False
-    for b in brokers:
-        if service.lower() in b.get('covered_by', '').lower():
-            continue
+def mark_coverage(brokers, service):
+    """Mark every broker in ``brokers`` as covered by ``service``; return how many changed."""
+    coverage = brokers.coverage if isinstance(brokers, BrokerList) else CoverageIndex(brokers)
+    changed = coverage.select(brokers, coverage.mark(service))
+    for b in changed:
         existing = b.get('covered_by', '')
-        if existing:
+        if existing and existing.strip().lower() != 'none':
             b['covered_by'] = existing + ';' + service
         else:
             b['covered_by'] = service
-        updated = True
-
-    if updated:
-        with BROKERS_FILE.open('w', newline='', encoding='utf-8') as f:
-            fieldnames = ['name', 'url', 'email', 'notes', 'covered_by', 'status']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(brokers)
+    return len(changed)
+
+
+def auto_mark_coverage(service):
+    brokers = load_brokers()
+    if mark_coverage(brokers, service):
+        _save_brokers(brokers)
         print(f"Brokers updated to reflect coverage by: {service}")
 
 def main_menu():
     cfg = load_config()
-        elif choice == '6':
-            manage_services(cfg)
-        elif choice == '7':
-            broker_editor()
     paid = cfg.get('paid_services', [])
     free = cfg.get('free_services', [])
 
@@ -319,6 +626,7 @@ def main_menu():
         print("6. Manage services")
         print("7. Edit broker list")
         print("8. Quit")
+        choice = input("Select> ").strip()
 
         if choice == '1':
             data = collect_user_data()
@@ -329,19 +637,14 @@ def main_menu():
             open_opt_out_pages(brokers, [s.lower() for s in paid])
             _pause()
         elif choice == '3':
-            if not USER_DATA_FILE.exists():
+            data = load_user_data()
+            if data is None:
                 print("No stored user data found; run option 1 first.")
             else:
-                if CRYPTO_AVAILABLE:
-                    from cryptography.fernet import Fernet
-                    key_path = USER_DATA_FILE.with_suffix('.key')
-                    key = key_path.read_bytes()
-                    cipher = Fernet(key)
-                    data = json.loads(cipher.decrypt(USER_DATA_FILE.read_bytes()).decode())
-                else:
-                    data = json.loads(USER_DATA_FILE.with_suffix('.json').read_text())
+                fmt = input("Save drafts as 1) text files 2) zip 3) mbox [1]: ").strip() or '1'
+                fmt = {'1': 'dir', '2': 'zip', '3': 'mbox'}.get(fmt, 'dir')
                 brokers = load_brokers()
-                export_email_templates(brokers, data, [s.lower() for s in paid])
+                export_email_templates(brokers, data, [s.lower() for s in paid], fmt)
             _pause()
         elif choice == '4':
             open_free_resources(free)
@@ -349,11 +652,13 @@ def main_menu():
         elif choice == '5':
             cfg = _setup_wizard()
             paid = cfg.get('paid_services', [])
+            free = cfg.get('free_services', [])
         elif choice == '6':
             manage_services(cfg)
+            paid = cfg.get('paid_services', [])
+            free = cfg.get('free_services', [])
         elif choice == '7':
             broker_editor()
-            free = cfg.get('free_services', [])
         elif choice == '8':
             break
         else:
@@ -0,0 +1,197 @@
+"""broker_dedup.py
+
+Group duplicate registry rows into canonical brokers.
+
+The state registries list the same company several times -- once per opt-out
+channel ("33Across, Inc." has a cookie opt-out *and* a PDF notice) and once per
+spelling of its legal name ("Apihub, Inc" / "Apihub, Inc."). ``dedupe()``
+merges those rows into one canonical broker that carries every channel.
+
+Rows are never compared all-against-all. Two blocking passes keep the work
+roughly linear:
+
+1. Exact block on ``canonical_name()`` (case, punctuation, spacing and legal
+   suffixes such as Inc./LLC removed) -- a dict lookup per row.
+2. Within each registrable-domain block of opt-out links, names one typo apart
+   (a single insertion, deletion, substitution or swap of neighbouring letters:
+   "NC Ventures" / "NC Vnetures") are merged. A looser similarity ratio merged
+   different companies ("BH Marketing Group" / "US Marketing Group"). Domains
+   shared by many unrelated companies (OneTrust, Termly, ...) are skipped, so
+   every block compared pairwise is small.
+
+A row without a name has no key and is never merged with anything.
+"""
+
+import re
+
+from broker_store import link_host
+
+LEGAL_SUFFIXES = {
+    'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation',
+    'co', 'company', 'lp', 'llp', 'plc', 'pllc', 'gmbh', 'sa', 'ag', 'bv', 'pty',
+}
+SHARED_HOST_LIMIT = 8     # domains used by more distinct names than this are platforms
+MIN_TYPO_LENGTH = 6       # shorter keys must match exactly ("awl" / "aws" are not typos)
+# Second-level labels under a country TLD that are not registrable themselves (example.co.uk).
+_GENERIC_SLD = {'co', 'com', 'net', 'org', 'gov', 'ac', 'edu'}
+
+_PUNCT = re.compile(r"[^\w\s]+")
+
+
+def canonical_name(name):
+    """Blocking key for a company name: ``"Live Intent, Inc."`` -> ``"liveintent"``."""
+    words = _PUNCT.sub(' ', name.casefold()).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return ''.join(words)
+
+
+def registrable_domain(host):
+    """``"privacy.liveintent.com"`` -> ``"liveintent.com"`` (``"x.example.co.uk"`` -> ``"example.co.uk"``)."""
+    labels = host.split('.')
+    keep = 3 if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in _GENERIC_SLD else 2
+    return '.'.join(labels[-keep:])
+
+
+def one_typo_apart(a, b):
+    """True if ``b`` is ``a`` with one letter inserted, deleted, changed or swapped with its neighbour."""
+    if a == b or abs(len(a) - len(b)) > 1:
+        return a == b
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    a, b = a[start:], b[start:]
+    if len(a) != len(b):
+        return a[1:] == b or b[1:] == a
+    return a[1:] == b[1:] or (a[2:] == b[2:] and a[:2] == b[1::-1])
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # Keep the earliest row as root so groups stay in registry order.
+            if rb < ra:
+                ra, rb = rb, ra
+            self.parent[rb] = ra
+
+
+def group_ids(brokers, shared_host_limit=SHARED_HOST_LIMIT, min_typo_length=MIN_TYPO_LENGTH):
+    """Return lists of row indexes, one list per canonical broker, in registry order."""
+    keys = [canonical_name(b.get('name', '')) for b in brokers]
+    uf = _UnionFind(len(brokers))
+
+    first_by_key = {}
+    for i, key in enumerate(keys):
+        if not key:
+            continue
+        if key in first_by_key:
+            uf.union(first_by_key[key], i)
+        else:
+            first_by_key[key] = i
+
+    by_domain = {}
+    for i, b in enumerate(brokers):
+        host = link_host(b.get('opt_out_link', ''))
+        if host and len(keys[i]) >= min_typo_length:
+            by_domain.setdefault(registrable_domain(host), {}).setdefault(keys[i], i)
+    for names in by_domain.values():
+        if len(names) < 2 or len(names) > shared_host_limit:
+            continue
+        items = list(names.items())
+        for a in range(len(items)):
+            for b in range(a + 1, len(items)):
+                if one_typo_apart(items[a][0], items[b][0]):
+                    uf.union(items[a][1], items[b][1])
+
+    groups = {}
+    for i in range(len(brokers)):
+        groups.setdefault(uf.find(i), []).append(i)
+    return list(groups.values())
+
+
+def merge(brokers, ids):
+    """Collapse the rows at ``ids`` into one canonical broker dict."""
+    rows = [brokers[i] for i in ids]
+    names = list(dict.fromkeys(r['name'] for r in rows))
+    services = list(dict.fromkeys(
+        s.strip() for r in rows for s in r.get('covered_by', '').split(';') if s.strip()
+    ))
+    health = {r['opt_out_link']: r.get('link_health', '') for r in rows if r['opt_out_link']}
+    # Links the checker found dead go last so the first channel is the one worth opening.
+    channels = sorted(health, key=lambda link: health[link] == 'dead')
+    return {
+        'name': names[0],
+        'aliases': names[1:],
+        'channels': channels,
+        'link_health': health[channels[0]] if channels else '',
+        'covered_by': ';'.join(services),
+        'completed': all(r.get('completed') for r in rows),
+        'ids': list(ids),
+    }
+
+
+def dedupe(brokers, **kwargs):
+    """Canonical brokers for a list of broker dicts."""
+    return [merge(brokers, ids) for ids in group_ids(brokers, **kwargs)]
+
+
+class BrokerGroups:
+    """Canonical-broker view over a ``BrokerStore`` that follows later ``add()`` calls."""
+
+    def __init__(self, store, **kwargs):
+        self.store = store
+        self.groups = group_ids(store.rows, **kwargs)
+        self._group_of = {}
+        self._by_key = {}
+        for g, ids in enumerate(self.groups):
+            for i in ids:
+                self._group_of[i] = g
+                key = canonical_name(store[i]['name'])
+                if key:
+                    self._by_key.setdefault(key, g)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def add(self, broker_id):
+        key = canonical_name(self.store[broker_id]['name'])
+        g = self._by_key.get(key) if key else None
+        if g is None:
+            g = len(self.groups)
+            self.groups.append([])
+            if key:
+                self._by_key[key] = g
+        self.groups[g].append(broker_id)
+        self._group_of[broker_id] = g
+        return g
+
+    def find(self, name):
+        """Group number for a broker name (any spelling of it), or None."""
+        return self._by_key.get(canonical_name(name))
+
+    def members(self, g):
+        return self.groups[g]
+
+    def group_of(self, broker_id):
+        return self._group_of[broker_id]
+
+    def merged(self, g):
+        return merge(self.store.rows, self.groups[g])
+
+    def pending(self):
+        """Group numbers with at least one pending channel, in registry order."""
+        return list(dict.fromkeys(self._group_of[i] for i in self.store.pending_ids()))
+
+    def done(self):
+        pending = set(self.pending())
+        return [g for g in range(len(self.groups)) if g not in pending]
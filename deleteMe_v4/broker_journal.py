@@ -0,0 +1,191 @@
+"""broker_journal.py
+
+Append-only change journal for the per-user broker CSV.
+
+Marking one broker done used to rewrite the whole ``deleteMe_brokers_<name>.csv``.
+Instead, every status change or added broker is appended as one JSON line to a
+sidecar ``.journal`` file. ``replay()`` applies those lines on top of the CSV when
+the registry is loaded, and once the journal grows past ``threshold`` bytes it is
+compacted back into the CSV on a background thread.
+
+Record shapes::
+
+    {"op": "set", "i": 12, "name": "Spokeo", "fields": {"covered_by": "manual"}}
+    {"op": "add", "i": 40, "broker": {"name": "...", "opt_out_link": "...", ...}}
+
+An ``add`` carries the index its broker landed at. Compaction rewrites the CSV
+before it trims the journal, so after a crash between the two, replay meets
+adds that are already in the CSV; their index is taken and they are skipped
+rather than appended twice. (``set`` records are idempotent already.)
+"""
+
+import csv
+import json
+import logging
+import os
+import threading
+
+import instrument
+
+FIELDNAMES = ['name', 'opt_out_link', 'covered_by', 'completed', 'link_health']
+DEFAULT_THRESHOLD = 64 * 1024  # bytes of journal before compacting
+
+
+def journal_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".journal"
+
+
+def write_csv(path, brokers, fieldnames=FIELDNAMES):
+    """Atomically rewrite ``path`` with ``brokers`` (temp file + rename)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for b in brokers:
+            writer.writerow({
+                'name': b['name'],
+                'opt_out_link': b['opt_out_link'],
+                'covered_by': b.get('covered_by', ''),
+                'completed': b.get('completed', False),
+                'link_health': b.get('link_health', '')
+            })
+    os.replace(tmp_path, path)
+
+
+class BrokerJournal:
+    def __init__(self, csv_path, threshold=DEFAULT_THRESHOLD):
+        self.csv_path = csv_path
+        self.path = journal_path(csv_path)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+    def replay(self, brokers):
+        """Apply journal records to ``brokers`` in place; return how many applied."""
+        if not os.path.exists(self.path):
+            return 0
+        applied = 0
+        with open(self.path, encoding='utf-8') as fh:
+            for lineno, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final write from a crash; everything before it is intact.
+                    logging.warning(f"Skipping corrupt journal line {lineno} in {self.path}")
+                    continue
+                if self._apply(brokers, record):
+                    applied += 1
+                else:
+                    logging.warning(f"Journal line {lineno} does not match registry; skipped")
+        return applied
+
+    @staticmethod
+    def _apply(brokers, record):
+        op = record.get('op')
+        if op == 'add':
+            i = record.get('i', len(brokers))   # journals written before adds had an index
+            if i < len(brokers):
+                return brokers[i]['name'] == record['broker'].get('name')
+            if i == len(brokers):
+                brokers.append(dict(record['broker']))
+                return True
+            return False
+        if op == 'set':
+            i = record.get('i', -1)
+            if 0 <= i < len(brokers) and brokers[i]['name'] == record.get('name'):
+                brokers[i].update(record.get('fields', {}))
+                return True
+        return False
+
+    # ------------------------------------------------------------------ #
+    # Writing
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _number_adds(brokers, records):
+        """Give ``add`` records their index; their brokers are the last rows of ``brokers``."""
+        adds = [r for r in records if r.get('op') == 'add' and 'i' not in r]
+        for i, record in enumerate(adds, len(brokers) - len(adds)):
+            record['i'] = i
+
+    def _append_lines(self, records):
+        data = ''.join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(data)
+                fh.flush()
+                return fh.tell()
+
+    def _append(self, record):
+        return self._append_lines([record])
+
+    def record_update(self, brokers, index, **fields):
+        """Journal a change to ``brokers[index]`` (already applied in memory)."""
+        size = self._append({'op': 'set', 'i': index, 'name': brokers[index]['name'], 'fields': fields})
+        self._maybe_compact(brokers, size)
+
+    def record_add(self, brokers, broker):
+        """Journal a broker that was just appended to ``brokers``."""
+        size = self._append({'op': 'add', 'i': len(brokers) - 1, 'broker': broker})
+        self._maybe_compact(brokers, size)
+
+    @instrument.timed("journal.append")
+    def record_batch(self, brokers, records):
+        """Journal several records with a single write."""
+        if not records:
+            return
+        self._number_adds(brokers, records)
+        size = self._append_lines(records)
+        self._maybe_compact(brokers, size)
+
+    # ------------------------------------------------------------------ #
+    # Compaction
+    # ------------------------------------------------------------------ #
+    def _maybe_compact(self, brokers, size):
+        if size < self.threshold:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        snapshot = [dict(b) for b in brokers]
+        with self._lock:
+            offset = os.path.getsize(self.path)
+        self._compactor = threading.Thread(
+            target=self._compact, args=(snapshot, offset), name="journal-compactor"
+        )
+        self._compactor.start()
+
+    @instrument.timed("journal.compact")
+    def _compact(self, snapshot, offset):
+        try:
+            write_csv(self.csv_path, snapshot)
+            with self._lock:
+                # Keep whatever was appended while the CSV was being written.
+                with open(self.path, 'rb') as fh:
+                    fh.seek(offset)
+                    tail = fh.read()
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'wb') as fh:
+                    fh.write(tail)
+                os.replace(tmp_path, self.path)
+            logging.debug(f"Compacted journal into {self.csv_path} ({len(snapshot)} brokers)")
+        except OSError as e:
+            logging.warning(f"Journal compaction failed: {e}")
+
+    @instrument.timed("journal.compact")
+    def compact_now(self, brokers):
+        """Synchronously fold everything into the CSV and empty the journal."""
+        self.wait()
+        with self._lock:
+            write_csv(self.csv_path, brokers)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def wait(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
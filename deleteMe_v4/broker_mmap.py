@@ -0,0 +1,310 @@
+"""broker_mmap.py
+
+Read-only, memory-mapped view of a broker registry CSV.
+
+``load_brokers()`` runs every row through ``csv.DictReader``: a fresh dict
+with its own key strings per row, then a ``.strip()`` of every field, even
+when the caller only wants names or a count of pending rows.
+``MappedBrokerTable`` maps the file instead and scans it once into an array
+of row start offsets (8 bytes per row). A compiled pattern, matched at a
+row's offset, finds the byte spans of just the columns a caller needs; a
+field is only decoded, straight from a ``memoryview`` slice, when it is
+asked for (a row read through ``table[i]`` is decoded on its first key).
+``names()`` decodes one column; counting pending rows compares the raw
+``covered_by``/``completed`` bytes, so no opt-out URL is decoded for either.
+
+Both schemas from ``broker_records`` are understood, and rows come out in
+the v4 shape (``name, opt_out_link, covered_by, completed, link_health``):
+
+* v4: ``name,opt_out_link,covered_by,completed[,link_health]``
+* v3: ``name,url,email,notes,covered_by,status``  (``status == Completed``)
+
+Quoted fields are scanned in place (``""`` escapes, commas and line breaks
+inside quotes) with ``csv.reader``'s rules: a quote opens a quoted field only
+as the field's first character, and anywhere else it is an ordinary character
+(``Acme "X,https://...`` is the name ``Acme "X``). Text after a closing quote
+is kept, and a quote left open runs to the end of the file. Rows and fields
+therefore come out as ``DictReader`` reads them, malformed quoting included.
+
+The table also takes ``BrokerJournal.replay``: ``append`` and a row's
+``update`` land in an in-memory overlay and never touch the file.
+"""
+
+import csv
+import mmap
+import os
+import re
+from array import array
+from collections.abc import Mapping
+
+from broker_records import detect_schema
+from broker_store import is_done
+
+ROW_FIELDS = ('name', 'opt_out_link', 'covered_by', 'completed', 'link_health')
+_BOM = b'\xef\xbb\xbf'
+# A quoted run, with "" escapes, commas and line breaks inside; a quote left open runs to EOF.
+_QUOTED_PART = rb'(?:"[^"]*(?:"|\Z))+'
+# One CSV field: a quoted run and any text after its closing quote, or bare up to the
+# next comma / line end with any quotes in it taken literally.
+_FIELD = _QUOTED_PART + rb'[^,\r\n]*|[^,\r\n]*'
+# One record, skipping blank lines before it (as DictReader does); group 1 starts the row.
+# A quote first in the row or right after a comma opens a quoted field; any other is literal.
+_ROW = re.compile(rb'[\r\n]*((?:' + _QUOTED_PART + rb'|[^"\r\n])(?:[^"\r\n]+|(?<=,)' + _QUOTED_PART + rb'|")*)')
+# The same for a file without quotes, where every line is a record (about twice as fast).
+_LINE = re.compile(rb'[\r\n]*([^\r\n]+)')
+_QUOTED = re.compile(rb'(' + _QUOTED_PART + rb')(.*)', re.S)
+
+
+def _unquote(raw):
+    """A raw field starting with a quote, as ``csv.reader`` reads it."""
+    quoted, rest = _QUOTED.match(raw).groups()
+    # Every closed part holds two quotes; a part left open at the end of the file holds one.
+    inner = quoted[1:-1] if quoted.count(b'"') % 2 == 0 else quoted[1:]
+    return inner.replace(b'""', b'"') + rest
+
+
+def _flag(value):
+    """A raw field (``None`` for a missing one) as stripped bytes, quotes removed."""
+    value = value or b''
+    if value[:1] == b'"':
+        value = _unquote(value)
+    return value.strip()
+
+
+class MappedBrokerRecord(Mapping):
+    """One row of a ``MappedBrokerTable``, decoded (in one go) when first read."""
+
+    __slots__ = ('_table', '_i', '_row')
+
+    def __init__(self, table, i):
+        self._table = table
+        self._i = i
+        self._row = None
+
+    def __getitem__(self, key):
+        if self._row is None:
+            self._row = self._table._decode(self._i)
+        return self._row[key]
+
+    def __iter__(self):
+        return iter(ROW_FIELDS)
+
+    def __len__(self):
+        return len(ROW_FIELDS)
+
+    def update(self, fields):
+        """Copy the row into the table's overlay with ``fields`` applied."""
+        row = dict(self)
+        row.update(fields)
+        self._table._changed[self._i] = row
+
+    def __repr__(self):
+        return f"MappedBrokerRecord({self._i}, {self['name']!r})"
+
+
+class MappedBrokerTable:
+    def __init__(self, path):
+        self.path = path
+        self._starts = array('q')   # byte offset of each row
+        self._changed = {}          # row id -> dict, from update()
+        self._added = []            # dicts from append()
+        self._matchers = {}         # column names -> (match, groups)
+        self._rows = 0
+        self._cols = {}
+        self._done_value = self.schema = None
+        with open(path, 'rb') as fh:
+            # An empty file cannot be mapped; it simply has no rows.
+            if os.fstat(fh.fileno()).st_size:
+                self._buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._buf = b''
+        self._view = memoryview(self._buf)
+        if self._buf:
+            self._index()
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            if isinstance(self._buf, mmap.mmap):
+                self._buf.close()
+            self._view = self._buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------ #
+    # Indexing
+    # ------------------------------------------------------------------ #
+    def _index(self):
+        buf = self._buf
+        start = len(_BOM) if buf[:len(_BOM)] == _BOM else 0
+        end = buf.find(b'\n', start)
+        if end < 0:
+            end = len(buf)
+        header = next(csv.reader([str(self._view[start:end], 'utf-8')]), [])
+        self.schema = detect_schema(header)
+        cols = {name.strip(): k for k, name in enumerate(header)}
+        if self.schema == 'v3':
+            cols['opt_out_link'] = cols['url']
+            cols['completed'] = cols.get('status')
+            self._done_value = b'completed'
+        else:
+            self._done_value = b'true'
+        self._cols = {name: k for name, k in cols.items() if k is not None}
+        rows = _ROW if buf.find(b'"', end) >= 0 else _LINE
+        self._starts.extend(m.start(1) for m in rows.finditer(buf, end))
+        self._rows = len(self._starts)
+
+    def __len__(self):
+        return self._rows + len(self._added)
+
+    # ------------------------------------------------------------------ #
+    # Fields
+    # ------------------------------------------------------------------ #
+    def _matcher(self, names):
+        """``(match, groups)``: ``match(buf, row_offset).span(groups[k])`` locates ``names[k]``.
+
+        A column the file does not have gets an empty group, so it reads as ``''``.
+        """
+        found = self._matchers.get(names)
+        if found is not None:
+            return found
+        cols = [self._cols.get(name) for name in names]
+        wanted = sorted({c for c in cols if c is not None})
+        # Later columns are optional, so a short row still matches (DictReader fills in None).
+        pattern = b''
+        for k in range(wanted[-1] if wanted else -1, -1, -1):
+            field = (b'(%s)' if k in wanted else b'(?:%s)') % _FIELD
+            pattern = field + pattern if k == 0 else b'(?:,' + field + pattern + b')?'
+        group_of = {c: n for n, c in enumerate(wanted, 1)}
+        groups = []
+        extra = len(wanted)
+        for c in cols:
+            if c is None:
+                pattern += b'()'
+                extra += 1
+                groups.append(extra)
+            else:
+                groups.append(group_of[c])
+        found = self._matchers[names] = (re.compile(pattern).match, tuple(groups))
+        return found
+
+    def _text(self, start, end):
+        if end <= start:
+            return ''
+        if self._buf[start] == 0x22:
+            return str(_unquote(self._view[start:end].tobytes()), 'utf-8').strip()
+        return str(self._view[start:end], 'utf-8').strip()
+
+    def field(self, i, name):
+        """Decoded, stripped ``name`` of row ``i`` (``''`` when the schema lacks it)."""
+        row = self._overlay(i)
+        if row is not None:
+            return row.get(name, '')
+        match, (group,) = self._matcher((name,))
+        return self._text(*match(self._buf, self._starts[i]).span(group))
+
+    def is_completed(self, i):
+        row = self._overlay(i)
+        if row is not None:
+            completed = row.get('completed', False)
+            return completed.strip().lower() == 'true' if isinstance(completed, str) else bool(completed)
+        match, (group,) = self._matcher(('completed',))
+        return _flag(match(self._buf, self._starts[i]).group(group)).lower() == self._done_value
+
+    def is_pending(self, i):
+        """Neither covered by a service nor completed (``broker_store.is_done``)."""
+        row = self._overlay(i)
+        if row is not None:
+            return not is_done(row)
+        match, groups = self._matcher(('covered_by', 'completed'))
+        covered_by, completed = match(self._buf, self._starts[i]).group(*groups)
+        return not _flag(covered_by) and _flag(completed).lower() != self._done_value
+
+    def _overlay(self, i):
+        if i >= self._rows:
+            return self._added[i - self._rows]
+        return self._changed.get(i) if self._changed else None
+
+    # ------------------------------------------------------------------ #
+    # Rows
+    # ------------------------------------------------------------------ #
+    def __getitem__(self, i):
+        n = len(self)
+        if not -n <= i < n:
+            raise IndexError(i)
+        i %= n
+        row = self._overlay(i)
+        return row if row is not None else MappedBrokerRecord(self, i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, broker):
+        self._added.append(broker)
+
+    def names(self):
+        match, (group,) = self._matcher(('name',))
+        buf, view, text, changed = self._buf, self._view, self._text, self._changed
+        find = buf.find
+        first = self._cols.get('name') == 0
+        ends = self._starts[1:]
+        ends.append(len(buf))
+        for i, (start, next_start) in enumerate(zip(self._starts, ends)):
+            if i in changed:
+                yield changed[i].get('name', '')
+                continue
+            if first:
+                # The first column is found with two finds at most, without the pattern.
+                if buf[start] != 0x22:
+                    comma = find(b',', start, next_start)
+                    if comma >= 0:
+                        yield str(view[start:comma], 'utf-8').strip()
+                        continue
+                else:
+                    close = find(b'"', start + 1, next_start)
+                    if close > start and buf[close + 1:close + 2] == b',':     # no "" escapes inside
+                        yield str(view[start + 1:close], 'utf-8').strip()
+                        continue
+            yield text(*match(buf, start).span(group))
+        for b in self._added:
+            yield b.get('name', '')
+
+    def pending_ids(self):
+        match, groups = self._matcher(('covered_by', 'completed'))
+        buf, changed, done_value = self._buf, self._changed, self._done_value
+        ids = []
+        for i, start in enumerate(self._starts):
+            covered_by, completed = match(buf, start).group(*groups)
+            if not _flag(covered_by) and _flag(completed).lower() != done_value and i not in changed:
+                ids.append(i)
+        if changed:
+            ids = sorted(ids + [i for i, b in changed.items() if not is_done(b)])
+        return ids + [self._rows + k for k, b in enumerate(self._added) if not is_done(b)]
+
+    def count_pending(self):
+        return len(self.pending_ids())
+
+    def _decode(self, i):
+        """Mapped row ``i`` as a v4 dict, every field located by one match."""
+        match, (name, link, covered, done, health) = self._matcher(ROW_FIELDS)
+        m = match(self._buf, self._starts[i])
+        text = self._text
+        return {
+            'name': text(*m.span(name)),
+            'opt_out_link': text(*m.span(link)),
+            'covered_by': text(*m.span(covered)),
+            'completed': _flag(m.group(done)).lower() == self._done_value,
+            'link_health': text(*m.span(health)),
+        }
+
+    def row(self, i):
+        return dict(self[i])
+
+    def to_dicts(self):
+        changed, decode = self._changed, self._decode
+        rows = [dict(changed[i]) if i in changed else decode(i) for i in range(self._rows)]
+        return rows + [dict(b) for b in self._added]
@@ -0,0 +1,19 @@
+"""broker_records.py
+
+The two broker CSV schemas and how to tell them apart:
+
+* v4: ``name,opt_out_link,covered_by,completed[,link_health]``
+* v3: ``name,url,email,notes,covered_by,status``  (``status == Completed``)
+"""
+
+V4_FIELDS = ['name', 'opt_out_link', 'covered_by', 'completed', 'link_health']
+V3_FIELDS = ['name', 'url', 'email', 'notes', 'covered_by', 'status']
+
+
+def detect_schema(fieldnames):
+    fields = set(fieldnames or ())
+    if 'opt_out_link' in fields:
+        return 'v4'
+    if 'url' in fields:
+        return 'v3'
+    raise ValueError(f"Unrecognized broker CSV header: {fieldnames}")
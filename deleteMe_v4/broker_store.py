@@ -0,0 +1,84 @@
+"""broker_store.py
+
+In-memory broker registry that tracks which brokers are still pending.
+
+``BrokerStore`` wraps the list of broker dicts produced by ``load_brokers()`` and
+keeps the pending and done ids up to date as brokers are added or changed, so
+``pending_ids()`` and ``count_pending()`` never rescan the list.
+
+A broker id is its position in the underlying list, so it doubles as the index
+used by the change journal.
+"""
+
+from urllib.parse import urlsplit
+
+import instrument
+
+
+def link_host(link):
+    link = link.strip()
+    if link and '://' not in link:
+        link = '//' + link  # bare host such as "spokeo.com"
+    try:
+        host = urlsplit(link).hostname or ''
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_done(broker):
+    completed = broker.get('completed', False)
+    if isinstance(completed, str):  # raw CSV row
+        completed = completed.strip().lower() == 'true'
+    return bool(broker.get('covered_by')) or completed
+
+
+class BrokerStore:
+    def __init__(self, brokers=None):
+        self.rows = brokers if brokers is not None else []
+        self._pending = set()
+        self._done = set()
+        for i, b in enumerate(self.rows):
+            self._index(i, b)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, broker_id):
+        return self.rows[broker_id]
+
+    # ------------------------------------------------------------------ #
+    # Index maintenance
+    # ------------------------------------------------------------------ #
+    def _index(self, i, broker):
+        (self._done if is_done(broker) else self._pending).add(i)
+
+    def add(self, broker):
+        """Append ``broker`` and index it; return its id."""
+        self.rows.append(broker)
+        i = len(self.rows) - 1
+        self._index(i, broker)
+        return i
+
+    def update(self, broker_id, **fields):
+        """Change fields of one broker, moving it between pending and done if needed."""
+        broker = self.rows[broker_id]
+        was_done = is_done(broker)
+        broker.update(fields)
+        if is_done(broker) != was_done:
+            (self._pending if was_done else self._done).add(broker_id)
+            (self._done if was_done else self._pending).discard(broker_id)
+        return broker
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+    @instrument.timed("filter")
+    def pending_ids(self):
+        return sorted(self._pending)
+
+    def count_pending(self):
+        return len(self._pending)
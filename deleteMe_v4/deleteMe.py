@@ -2,25 +2,32 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import csv
 import time
 import logging
-import random
 import webbrowser
 import signal
+import argparse
+import json
+import threading
+from collections import Counter
 from platformdirs import user_data_dir
+from broker_journal import BrokerJournal, FIELDNAMES, write_csv
+from broker_store import BrokerStore
+from broker_dedup import BrokerGroups
+from broker_mmap import MappedBrokerTable
+from quote_pool import QuotePool
+from log_writer import setup_logging
+import instrument
+import headless
 
-# Logging config
-logging.basicConfig(
-    filename='./deleteMe.log',
-    filemode='a',
-    format='[%(asctime)s] %(levelname)s: %(message)s',
-    level=logging.DEBUG
-)
+log = logging.getLogger("deleteMe")
 
 def debug(msg):
-    logging.debug(msg)
-    print(f"[DEBUG] {msg}")
+    # The log file is written by log_writer's listener thread; outside headless
+    # commands the console echo is printed here, in order with the prompts.
+    log.debug(msg)
 
 # Set up app-specific directories
 APP_NAME = "deleteMe"
@@ -32,96 +39,152 @@ os.makedirs(data_dir, exist_ok=True)
 user_name = ""
 user_services = []
 BROKERS_FILE = ""
+journal = None
 PAID_SERVICES = ["Incogni", "DeleteMe", "Kanary", "Optery", "OneRep"]
 FREE_SERVICES = ["SimpleOptOut", "JustDeleteMe", "StopDataBrokers"]
-QUOTES_FILE = "motivational_quotes.txt"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+QUOTES_FILE = os.path.join(APP_DIR, "motivational_quotes.txt")
+CUSTOM_QUOTES_FILES = [os.path.join(APP_DIR, "custom_quotes.txt"), os.path.join(data_dir, "custom_quotes.txt")]
+QUOTE_CACHE_FILE = os.path.join(data_dir, "quotes_cache.txt")
+BUNDLED_BROKERS_FILE = os.path.join(APP_DIR, "brokers.csv")
+LINK_CACHE_FILE = os.path.join(data_dir, "link_cache.json")
+BATCH_FILE = ""
+BATCH_SIZE = 5      # opt-out pages opened per batch
+BATCH_PACE = 2.0    # seconds between opening pages within a batch
+SHOW_SPLASH = True
+SPLASH_FRAMES = [
+    "💀💀💀  YOUR DATA IS MINE!!  💀💀💀",
+    "💀💀💀  JUST KIDDING 😄      💀💀💀",
+    "💀💀💀  Launching deleteMe  💀💀💀"
+]
+SPLASH_FRAME_SECONDS = 1.5
+quotes = QuotePool(QUOTES_FILE, CUSTOM_QUOTES_FILES, QUOTE_CACHE_FILE)
 
 def signal_handler(sig, frame):
     print("\n❌ Program interrupted. Exiting gracefully.")
+    if BATCH_FILE and os.path.exists(BATCH_FILE):
+        print("   Your batch progress is saved; choose the batch option again to resume.")
     exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 
-def show_fake_hack_animation():
-    frames = [
-        "💀💀💀  YOUR DATA IS MINE!!  💀💀💀",
-        "💀💀💀  JUST KIDDING 😄      💀💀💀",
-        "💀💀💀  Launching deleteMe  💀💀💀"
-    ]
-    for _ in range(2):
-        for frame in frames:
-            os.system("cls" if os.name == "nt" else "clear")
-            print("\n" * 3)
-            print("=" * 80)
-            print(frame.center(80))
-            print("=" * 80)
-            print("\n" * 3)
-            time.sleep(1.5)
+def splash_enabled():
+    # Scripted or piped runs never get the animation.
+    if not SHOW_SPLASH or os.environ.get("DELETEME_NO_SPLASH"):
+        return False
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+def show_fake_hack_animation(lines_below):
+    """Animate the banner in place on a background thread; returns a stop Event.
+
+    The banner's middle line sits ``lines_below`` lines above the cursor. Frames
+    are redrawn there with ANSI save/restore-cursor, so the prompt underneath is
+    already live while the animation plays.
+    """
+    stop = threading.Event()
+
+    def animate():
+        for n in range(1, 2 * len(SPLASH_FRAMES)):
+            if stop.wait(SPLASH_FRAME_SECONDS):
+                return
+            frame = SPLASH_FRAMES[n % len(SPLASH_FRAMES)].center(80)
+            sys.stdout.write(f"\0337\033[{lines_below}A\r{frame}\0338")
+            sys.stdout.flush()
+
+    threading.Thread(target=animate, name="splash", daemon=True).start()
+    return stop
 
 def setup_user_file():
-    global BROKERS_FILE
+    global BROKERS_FILE, BATCH_FILE, journal
     safe_name = ''.join(c for c in user_name if c.isalnum())
     BROKERS_FILE = os.path.join(data_dir, f"deleteMe_brokers_{safe_name}.csv")
+    BATCH_FILE = os.path.join(data_dir, f"deleteMe_batch_{safe_name}.json")
+    journal = BrokerJournal(BROKERS_FILE)
     debug(f"Using broker file for user {user_name} at: {BROKERS_FILE}")
 
+@instrument.timed("load_brokers")
 def load_brokers():
     brokers = []
     if not os.path.exists(BROKERS_FILE):
         debug(f"{BROKERS_FILE} not found; creating new one.")
         with open(BROKERS_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['name', 'opt_out_link', 'covered_by', 'completed'])
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
             writer.writeheader()
-        return brokers
-
-    with open(BROKERS_FILE, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            broker = {
-                'name': row.get('name', '').strip(),
-                'opt_out_link': row.get('opt_out_link', '').strip(),
-                'covered_by': row.get('covered_by', '').strip(),
-                'completed': row.get('completed', 'False').strip().lower() == 'true'
-            }
-            brokers.append(broker)
+    else:
+        with open(BROKERS_FILE, newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                broker = {
+                    'name': row.get('name', '').strip(),
+                    'opt_out_link': row.get('opt_out_link', '').strip(),
+                    'covered_by': row.get('covered_by', '').strip(),
+                    'completed': row.get('completed', 'False').strip().lower() == 'true',
+                    'link_health': (row.get('link_health') or '').strip()
+                }
+                brokers.append(broker)
+
+    if journal is not None:
+        replayed = journal.replay(brokers)
+        debug(f"Replayed {replayed} journal entries")
 
     debug(f"Loaded {len(brokers)} brokers")
     return brokers
 
+@instrument.timed("load_brokers.mapped")
+def load_mapped_brokers():
+    # Read-only and lazy: fields are decoded from the mapped file when a command reads them.
+    table = MappedBrokerTable(BROKERS_FILE)
+    if journal is not None:
+        replayed = journal.replay(table)
+        debug(f"Replayed {replayed} journal entries")
+    debug(f"Mapped {len(table)} brokers")
+    return table
+
+@instrument.timed("save_brokers")
 def save_brokers(brokers):
-    with open(BROKERS_FILE, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=['name', 'opt_out_link', 'covered_by', 'completed'])
-        writer.writeheader()
-        for b in brokers:
-            writer.writerow({
-                'name': b['name'],
-                'opt_out_link': b['opt_out_link'],
-                'covered_by': b.get('covered_by', ''),
-                'completed': b.get('completed', False)
-            })
+    # Full rewrite; day-to-day changes go through the journal instead.
+    if journal is not None:
+        journal.compact_now(brokers)
+    else:
+        write_csv(BROKERS_FILE, brokers)
+
+@instrument.timed("index_brokers")
+def index_brokers(brokers):
+    return BrokerGroups(BrokerStore(brokers))
+
+def open_link(link):
+    instrument.count("links_opened")
+    with instrument.span("open_link"):
+        webbrowser.open(link)
 
 def show_quote():
-    try:
-        with open(QUOTES_FILE, 'r', encoding='utf-8') as f:
-            quotes = [line.strip() for line in f if line.strip()]
-        if quotes:
-            print("\n🧠 ", random.choice(quotes))
-    except Exception as e:
-        logging.warning(f"Failed to load quote: {e}")
+    # Served from memory; the pool loads and refreshes itself on a background thread.
+    print("\n🧠 ", quotes.pick())
 
 def welcome():
     global user_name
-    print("STARTING deleteMe")
-    debug("1. Before animation")
-    show_fake_hack_animation()
-    debug("2. After animation")
+    intro = """🧹  Welcome to deleteMe!
 
-    print("🧹  Welcome to deleteMe!")
-    print("""
 This tool will guide you—step by step—through removing your personal
 information from dozens of data-broker websites.
-""")
+"""
     debug("Waiting for input: Before we begin, what’s your name?")
-    user_name = input("Before we begin, what’s your name? ").strip()
+    stop_splash = None
+    if splash_enabled():
+        print("=" * 80)
+        print(SPLASH_FRAMES[0].center(80))
+        print("=" * 80)
+        print(intro)
+        # Frame line -> prompt: bottom rule, the intro, and print()'s own newline.
+        stop_splash = show_fake_hack_animation(intro.count("\n") + 3)
+    else:
+        print(intro)
+
+    try:
+        user_name = input("Before we begin, what’s your name? ").strip()
+    finally:
+        if stop_splash is not None:
+            stop_splash.set()
     print(f"\nGreat to meet you, {user_name}! Let’s get started.\n")
 
 def first_time_setup():
@@ -139,37 +202,46 @@ def first_time_setup():
     print(f"🛡️  Services selected: {user_services}\n")
     debug(f"Services selected: {user_services}")
 
-def view_brokers(brokers):
+def describe_group(groups, g):
+    b = groups.merged(g)
+    extra = len(b['channels']) - 1
+    more = f" (+{extra} more opt-out channel{'s' if extra > 1 else ''})" if extra > 0 else ""
+    if b['link_health'] == 'dead':
+        more += " ⚠️ link reported dead"
+    return b, f"{b['name']} – {b['channels'][0] if b['channels'] else ''}{more}"
+
+def view_brokers(groups):
     print(f"\n{user_name}, here’s an overview of data-broker sites:")
-    uncovered = [b for b in brokers if not b.get('covered_by')]
-    covered = [b for b in brokers if b.get('covered_by')]
+    uncovered = groups.pending()
+    covered = groups.done()
 
     print(f"• Brokers still needing manual opt-out: {len(uncovered)}")
     print(f"• Already completed / covered: {len(covered)}\n")
 
     if uncovered:
         print("👉 Brokers you may want to tackle next:")
-        for idx, b in enumerate(uncovered):
-            print(f"[{idx}] {b['name']} – {b['opt_out_link']}")
+        for idx, g in enumerate(uncovered):
+            print(f"[{idx}] {describe_group(groups, g)[1]}")
     else:
         print("🎉 No uncovered brokers left!")
 
     if covered:
         print("\n✓ Brokers already handled:")
-        for b in covered:
+        for g in covered:
+            b = groups.merged(g)
             color = "✅" if b['covered_by'] in PAID_SERVICES + FREE_SERVICES else "🟡"
             print(f"   {color} {b['name']}")
     print()
     show_quote()
 
-def open_opt_out(brokers):
-    pending = [b for b in brokers if not b.get('covered_by')]
+def open_opt_out(groups):
+    pending = groups.pending()
     if not pending:
         print(f"Nice work, {user_name}! There are no remaining brokers.\n")
         return
 
-    for idx, b in enumerate(pending):
-        print(f"[{idx}] {b['name']} – {b['opt_out_link']}")
+    for idx, g in enumerate(pending):
+        print(f"[{idx}] {describe_group(groups, g)[1]}")
     print()
 
     choice_str = input("Which broker would you like to open? (#): ").strip()
@@ -182,50 +254,226 @@ def open_opt_out(brokers):
         print("❌ Invalid choice. Pick a number from the list.")
         return
 
-    broker = pending[choice]
-    print(f"🌐 Opening: {broker['name']} – {broker['opt_out_link']}")
-    webbrowser.open(broker['opt_out_link'])
+    broker, _ = describe_group(groups, pending[choice])
+    link = broker['channels'][0] if broker['channels'] else ''
+    print(f"🌐 Opening: {broker['name']} – {link}")
+    for other in broker['channels'][1:]:
+        print(f"   also available: {other}")
+    open_link(link)
 
     response = input(f"Did you complete the opt-out for {broker['name']}? (y/n): ").lower()
     if response == 'y':
-        broker['covered_by'] = "manual"
-        debug(f"Marked {broker['name']} as manually completed.")
-        save_brokers(brokers)
+        mark_done(groups, [pending[choice]])
         print("✅ Marked as complete!")
         show_quote()
 
-def add_broker(brokers):
+def mark_done(groups, done_groups):
+    # One company, one opt-out: every duplicate row for it is done too.
+    store = groups.store
+    records = []
+    for g in done_groups:
+        for broker_id in groups.members(g):
+            if not store[broker_id].get('covered_by'):
+                store.update(broker_id, covered_by="manual")
+                records.append({'op': 'set', 'i': broker_id, 'name': store[broker_id]['name'],
+                                'fields': {'covered_by': "manual"}})
+    debug(f"Marked {len(done_groups)} brokers ({len(records)} rows) as manually completed.")
+    journal.record_batch(store.rows, records)
+
+def load_batch_checkpoint():
+    try:
+        with open(BATCH_FILE, encoding='utf-8') as f:
+            return set(json.load(f).get('seen', []))
+    except (OSError, ValueError):
+        return set()
+
+def save_batch_checkpoint(seen):
+    tmp_path = BATCH_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'seen': sorted(seen)}, f)
+    os.replace(tmp_path, BATCH_FILE)
+
+def parse_batch_answer(answer, size):
+    answer = answer.strip().lower()
+    if answer in ('a', 'all', 'y', 'yes'):
+        return list(range(size))
+    if answer in ('', 'n', 'none', 'no'):
+        return []
+    picked = []
+    for part in answer.replace(' ', ',').split(','):
+        if part.isdigit() and 1 <= int(part) <= size:
+            picked.append(int(part) - 1)
+    return picked
+
+def batch_opt_out(groups):
+    # Brokers are keyed by their first row id so the checkpoint survives restarts.
+    seen = load_batch_checkpoint()
+    queue = [g for g in groups.pending() if groups.members(g)[0] not in seen]
+    if not queue:
+        print(f"Nice work, {user_name}! There are no remaining brokers.\n")
+        if os.path.exists(BATCH_FILE):
+            os.remove(BATCH_FILE)
+        return
+    if seen:
+        print(f"↩️  Resuming your batch session ({len(seen)} brokers already handled).")
+    print(f"📦 {len(queue)} brokers queued; opening {BATCH_SIZE} at a time.\n")
+
+    for start in range(0, len(queue), BATCH_SIZE):
+        batch = queue[start:start + BATCH_SIZE]
+        for n, g in enumerate(batch, 1):
+            broker, line = describe_group(groups, g)
+            print(f"[{n}] {line}")
+            if broker['channels']:
+                open_link(broker['channels'][0])
+            if n < len(batch):
+                time.sleep(BATCH_PACE)
+
+        answer = input("\nWhich did you complete? (all / none / numbers, e.g. 1,3): ")
+        done = [batch[i] for i in parse_batch_answer(answer, len(batch))]
+        if done:
+            mark_done(groups, done)
+        seen.update(groups.members(g)[0] for g in batch)
+        save_batch_checkpoint(seen)
+        print(f"✅ {len(done)} of {len(batch)} marked complete. "
+              f"{len(queue) - start - len(batch)} left in the queue.")
+
+        if start + BATCH_SIZE < len(queue):
+            if input("Open the next batch? (Y/n): ").strip().lower() == 'n':
+                print("⏸️  Batch paused; choose the batch option again to resume.")
+                return
+
+    os.remove(BATCH_FILE)
+    print("🎉 Batch session finished!")
+    show_quote()
+
+def add_broker(groups):
+    store = groups.store
     name = input("Broker name: ").strip()
     link = input("Opt-out link: ").strip()
-    brokers.append({"name": name, "opt_out_link": link, "covered_by": ""})
-    save_brokers(brokers)
+    broker = {"name": name, "opt_out_link": link, "covered_by": "", "completed": False}
+    groups.add(store.add(broker))
+    journal.record_add(store.rows, broker)
     print(f"✅ Added broker: {name}")
     show_quote()
 
 def main_menu():
-    brokers = load_brokers()
+    groups = index_brokers(load_brokers())
     while True:
         print("Options:")
         print("1. View brokers")
         print("2. Launch opt-out")
-        print("3. Add broker")
-        print("4. Exit")
+        print("3. Launch opt-outs in batches")
+        print("4. Add broker")
+        print("5. Exit")
         choice = input("Choose an option: ").strip()
         if choice == '1':
-            view_brokers(brokers)
+            view_brokers(groups)
         elif choice == '2':
-            open_opt_out(brokers)
+            open_opt_out(groups)
         elif choice == '3':
-            add_broker(brokers)
+            batch_opt_out(groups)
         elif choice == '4':
+            add_broker(groups)
+        elif choice == '5':
+            journal.wait()
             print(f"Goodbye, {user_name} 👋")
             break
         else:
             print("❌ Invalid option. Try again.")
         print()
 
-if __name__ == "__main__":
+def check_links(args):
+    global user_name, BROKERS_FILE, journal
+    from link_checker import check_registry  # aiohttp is slow to import; only load it here
+    if args.user:
+        user_name = args.user
+        setup_user_file()
+    else:
+        # The bundled registry ships with deleteMe and is only read; its verdicts
+        # stay in LINK_CACHE_FILE in the user data dir.
+        BROKERS_FILE = BUNDLED_BROKERS_FILE
+        journal = None
+    brokers = load_brokers()
+
+    def progress(done, total):
+        print(f"\r🔎 Checked {done}/{total} links", end="", flush=True)
+
+    changes = check_registry(
+        brokers, LINK_CACHE_FILE,
+        concurrency=args.concurrency, per_host=args.per_host,
+        min_interval=args.interval, progress=progress,
+    )
+    print()
+    for i, health in changes.items():
+        brokers[i]['link_health'] = health
+    if not args.user:
+        print(f"Checked the bundled registry; results are kept in {LINK_CACHE_FILE}")
+    else:
+        if changes:
+            save_brokers(brokers)
+        print(f"Updated {len(changes)} brokers in {BROKERS_FILE}")
+
+    summary = Counter(b.get('link_health') or 'unchecked' for b in brokers)
+    for health, count in sorted(summary.items()):
+        print(f"• {health}: {count}")
+
+def main(argv=None):
+    global BATCH_SIZE, BATCH_PACE, SHOW_SPLASH
+    parser = argparse.ArgumentParser(prog="deleteMe", description="Automated digital footprint scrubber")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="opt-out pages opened per batch (default: %(default)s)")
+    parser.add_argument("--pace", type=float, default=BATCH_PACE,
+                        help="seconds between pages within a batch (default: %(default)s)")
+    parser.add_argument("--no-splash", action="store_true",
+                        help="skip the startup animation (also off when not on a terminal)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="write the log as JSON lines instead of text")
+    parser.add_argument("--profile", action="store_true",
+                        help="time loads, saves, filters and exports and print a summary on exit")
+    parser.add_argument("--profile-dump", metavar="FILE",
+                        help="run the command under cProfile and write pstats to FILE")
+    commands = parser.add_subparsers(dest="command")
+    links = commands.add_parser("check-links", help="validate every opt-out link and record its health")
+    links.add_argument("--user", help="record results in this user's broker list (default: check the bundled brokers.csv without changing it)")
+    links.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+    links.add_argument("--per-host", type=int, default=2, help="keep-alive connections per host")
+    links.add_argument("--interval", type=float, default=0.5, help="seconds between requests to one host")
+    headless.add_commands(commands)
+    args = parser.parse_args(argv)
+    BATCH_SIZE, BATCH_PACE = max(1, args.batch_size), max(0.0, args.pace)
+    SHOW_SPLASH = not args.no_splash
+    # Headless commands keep stdout for JSON only.
+    console = None if args.command in headless.COMMANDS else sys.stdout
+    setup_logging(data_dir, json_lines=args.log_json, console=console)
+    instrument.enable(args.profile)
+    try:
+        with instrument.profiled(args.profile_dump):
+            run_command(args)
+    finally:
+        if args.profile:
+            # stderr, so headless JSON on stdout stays clean.
+            print(instrument.summary(), file=sys.stderr)
+
+def run_command(args):
+    global user_name
+    if args.command == "check-links":
+        check_links(args)
+        return
+    if args.command in headless.COMMANDS:
+        user_name = args.user
+        setup_user_file()
+        if headless.reads_rows_only(args) and os.path.exists(BROKERS_FILE):
+            with load_mapped_brokers() as table:
+                headless.run_mapped(args, table)
+        else:
+            headless.run(args, index_brokers(load_brokers()), journal)
+        return
+
+    quotes.start(offline=bool(os.environ.get("DELETEME_OFFLINE")))
     welcome()
     setup_user_file()
     first_time_setup()
     main_menu()
+
+if __name__ == "__main__":
+    main()
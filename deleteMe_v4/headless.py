@@ -0,0 +1,218 @@
+"""headless.py
+
+Non-interactive subcommands for scripting deleteMe.
+
+Every command works on one user's broker list (``--user``), never prompts, and
+writes JSON Lines to stdout -- one object per broker or per operation::
+
+    deleteMe list --user alice
+    deleteMe pending --user alice --companies
+    deleteMe pending --user alice --count
+    deleteMe mark-done --user alice 12 40 --by Incogni
+    deleteMe add --user alice --name "Acme Data" --link https://acme.example/opt-out
+    deleteMe export --user alice --format csv > alice.csv
+
+``mark-done`` and ``add`` also read JSON Lines from stdin when no arguments are
+given, e.g. ``{"id": 12}``, ``{"name": "Spokeo"}`` or
+``{"name": "Acme", "opt_out_link": "https://..."}``. All changes from one run
+are journaled in a single write.
+"""
+
+import csv
+import json
+import sys
+
+import instrument
+from broker_journal import FIELDNAMES
+from broker_store import is_done
+
+COMMANDS = ('list', 'pending', 'mark-done', 'add', 'export')
+
+
+def add_commands(commands):
+    def user_parser(name, help_text):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("--user", required=True, help="whose broker list to use")
+        return p
+
+    for name, help_text in (("list", "print every broker as JSON Lines"),
+                            ("pending", "print brokers still needing an opt-out")):
+        p = user_parser(name, help_text)
+        p.add_argument("--companies", action="store_true",
+                       help="one line per company instead of per registry row")
+        p.add_argument("--count", action="store_true", help="print only {\"count\": N}")
+
+    p = user_parser("mark-done", "mark brokers as opted out (ids, --name, or JSON on stdin)")
+    p.add_argument("ids", nargs="*", type=int, help="broker ids from 'list'")
+    p.add_argument("--name", action="append", default=[], help="broker name (repeatable)")
+    p.add_argument("--by", default="manual", help="covered_by value to record (default: manual)")
+
+    p = user_parser("add", "add a broker (--name/--link, or JSON on stdin)")
+    p.add_argument("--name")
+    p.add_argument("--link")
+
+    p = user_parser("export", "dump the whole broker list")
+    p.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+
+
+def emit(obj, out=None):
+    (out or sys.stdout).write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+
+def read_stdin_records():
+    if sys.stdin is None or sys.stdin.isatty():
+        return
+    for lineno, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            emit({'ok': False, 'line': lineno, 'error': f"invalid JSON: {e}"})
+            continue
+        if isinstance(record, dict):
+            yield record
+        else:
+            emit({'ok': False, 'line': lineno, 'error': "expected a JSON object"})
+
+
+def _row(store, i):
+    b = store[i]
+    return {
+        'id': i,
+        'name': b['name'],
+        'opt_out_link': b['opt_out_link'],
+        'covered_by': b.get('covered_by', ''),
+        'completed': bool(b.get('completed')),
+        'link_health': b.get('link_health', ''),
+    }
+
+
+def _company(groups, g):
+    merged = groups.merged(g)
+    merged['pending'] = any(not is_done(groups.store[i]) for i in merged['ids'])
+    return merged
+
+
+# -----------------------------------------------------------------------------
+# Commands
+# -----------------------------------------------------------------------------
+def cmd_list(args, groups, journal, pending_only=False):
+    if not args.companies:
+        _list_rows(args, groups.store, pending_only)
+    elif args.count:
+        emit({'count': len(groups.pending()) if pending_only else len(groups)})
+    else:
+        for g in (groups.pending() if pending_only else range(len(groups))):
+            emit(_company(groups, g))
+
+
+def _list_rows(args, store, pending_only):
+    # ``store`` is a BrokerStore or a broker_mmap.MappedBrokerTable.
+    if args.count:
+        emit({'count': store.count_pending() if pending_only else len(store)})
+    else:
+        for i in (store.pending_ids() if pending_only else range(len(store))):
+            emit(_row(store, i))
+
+
+def cmd_mark_done(args, groups, journal):
+    store = groups.store
+    targets = [('id', i) for i in args.ids] + [('name', n) for n in args.name]
+    if not targets:
+        targets = [('id', r['id']) if 'id' in r else ('name', r.get('name', ''))
+                   for r in read_stdin_records()]
+
+    records = []
+    for kind, value in targets:
+        # JSON true is an int to isinstance(), so bools are turned away explicitly.
+        if kind == 'id' and (not isinstance(value, int) or isinstance(value, bool)):
+            emit({'ok': False, 'id': value, 'error': "id must be an integer"})
+            continue
+        if kind == 'name' and not isinstance(value, str):
+            emit({'ok': False, 'name': value, 'error': "name must be a string"})
+            continue
+        if kind == 'id':
+            g = groups.group_of(value) if 0 <= value < len(store) else None
+        else:
+            g = groups.find(value)
+        if g is None:
+            emit({'ok': False, kind: value, 'error': "no such broker"})
+            continue
+        changed = []
+        for i in groups.members(g):
+            if store[i].get('covered_by') != args.by:
+                store.update(i, covered_by=args.by)
+                records.append({'op': 'set', 'i': i, 'name': store[i]['name'],
+                                'fields': {'covered_by': args.by}})
+                changed.append(i)
+        emit({'ok': True, 'name': store[groups.members(g)[0]]['name'],
+              'ids': groups.members(g), 'changed': changed, 'covered_by': args.by})
+    journal.record_batch(store.rows, records)
+
+
+def cmd_add(args, groups, journal):
+    store = groups.store
+    if args.name or args.link:
+        incoming = [{'name': args.name or '', 'opt_out_link': args.link or ''}]
+    else:
+        incoming = read_stdin_records()
+
+    records = []
+    for r in incoming:
+        name = str(r.get('name', '')).strip()
+        link = str(r.get('opt_out_link', r.get('link', ''))).strip()
+        if not name:
+            emit({'ok': False, 'name': name, 'error': "name cannot be empty"})
+            continue
+        if not link.startswith(('http', 'mailto:')):
+            emit({'ok': False, 'name': name, 'error': "link must start with http, https or mailto:"})
+            continue
+        broker = {'name': name, 'opt_out_link': link, 'covered_by': '', 'completed': False}
+        i = store.add(broker)
+        groups.add(i)
+        records.append({'op': 'add', 'broker': broker})
+        emit({'ok': True, 'id': i, 'name': name})
+    journal.record_batch(store.rows, records)
+
+
+@instrument.timed("export")
+def cmd_export(args, groups, journal):
+    store = groups.store
+    if args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDNAMES, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(store.rows)
+    else:
+        for i in range(len(store)):
+            emit(_row(store, i))
+
+
+def run(args, groups, journal):
+    with instrument.span(f"command.{args.command}"):
+        _dispatch(args, groups, journal)
+    journal.wait()
+
+
+def reads_rows_only(args):
+    """True when the command can run off a ``MappedBrokerTable`` (no store, no dedupe)."""
+    return args.command in ('list', 'pending') and not args.companies
+
+
+def run_mapped(args, table):
+    with instrument.span(f"command.{args.command}"):
+        _list_rows(args, table, pending_only=args.command == 'pending')
+
+
+def _dispatch(args, groups, journal):
+    if args.command == 'list':
+        cmd_list(args, groups, journal)
+    elif args.command == 'pending':
+        cmd_list(args, groups, journal, pending_only=True)
+    elif args.command == 'mark-done':
+        cmd_mark_done(args, groups, journal)
+    elif args.command == 'add':
+        cmd_add(args, groups, journal)
+    elif args.command == 'export':
+        cmd_export(args, groups, journal)
@@ -0,0 +1,157 @@
+"""instrument.py
+
+Timing and counters for deleteMe's hot paths.
+
+``@timed('load_brokers')`` and ``with span('dedupe'):`` record how often a
+piece of code ran and its total and longest time; ``count('links_opened')``
+bumps a plain counter. Everything is off until ``enable()`` is called
+(``deleteMe --profile``): a disabled ``timed`` wrapper costs one global lookup
+and a branch, and ``span``/``count`` return straight away.
+
+``summary()`` renders the numbers as a table for the terminal and
+``prometheus()`` in the Prometheus text format. ``profiled(path)`` runs a block
+under cProfile and writes the pstats file to ``path``.
+
+The web app's ``app/core/metrics.py`` re-exports this module rather than
+keeping its own copy, so it must stay free of third-party imports.
+"""
+
+import cProfile
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED = False
+
+_timings = {}     # name -> [calls, total seconds, max seconds]
+_counters = {}    # name -> count
+_lock = threading.Lock()
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+def reset():
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def record(name, seconds):
+    with _lock:
+        entry = _timings.get(name)
+        if entry is None:
+            _timings[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+
+def timed(name=None):
+    """Decorator: record each call of the function under ``name`` (default: its qualname)."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def span(name):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """``(timings, counters)`` copies: ``{name: (calls, total, max)}`` and ``{name: n}``."""
+    with _lock:
+        return {k: tuple(v) for k, v in _timings.items()}, dict(_counters)
+
+
+# -----------------------------------------------------------------------------
+# Output
+# -----------------------------------------------------------------------------
+def summary():
+    timings, counters = snapshot()
+    if not timings and not counters:
+        return "No timings recorded."
+    width = max(len(name) for name in list(timings) + list(counters) + ["operation"])
+    lines = [f"{'operation':<{width}}  {'calls':>7}  {'total ms':>10}  {'mean ms':>9}  {'max ms':>9}"]
+    for name, (calls, total, longest) in sorted(timings.items(), key=lambda kv: -kv[1][1]):
+        lines.append(f"{name:<{width}}  {calls:>7}  {total * 1000:>10.1f}"
+                     f"  {total / calls * 1000:>9.2f}  {longest * 1000:>9.2f}")
+    for name, n in sorted(counters.items()):
+        lines.append(f"{name:<{width}}  {n:>7}")
+    return "\n".join(lines)
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus(prefix="deleteme"):
+    timings, counters = snapshot()
+    out = [
+        f"# HELP {prefix}_op_calls_total Calls per instrumented operation.",
+        f"# TYPE {prefix}_op_calls_total counter",
+    ]
+    out += [f'{prefix}_op_calls_total{{op="{_label(n)}"}} {v[0]}' for n, v in sorted(timings.items())]
+    out += [
+        f"# HELP {prefix}_op_seconds_total Time spent per instrumented operation.",
+        f"# TYPE {prefix}_op_seconds_total counter",
+    ]
+    out += [f'{prefix}_op_seconds_total{{op="{_label(n)}"}} {v[1]:.6f}' for n, v in sorted(timings.items())]
+    out += [
+        f"# HELP {prefix}_op_seconds_max Longest single call per instrumented operation.",
+        f"# TYPE {prefix}_op_seconds_max gauge",
+    ]
+    out += [f'{prefix}_op_seconds_max{{op="{_label(n)}"}} {v[2]:.6f}' for n, v in sorted(timings.items())]
+    out += [
+        f"# HELP {prefix}_events_total Counted events.",
+        f"# TYPE {prefix}_events_total counter",
+    ]
+    out += [f'{prefix}_events_total{{event="{_label(n)}"}} {v}' for n, v in sorted(counters.items())]
+    return "\n".join(out) + "\n"
+
+
+@contextmanager
+def profiled(path):
+    """Run the block under cProfile and dump pstats to ``path`` (no-op when ``path`` is falsy)."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logging.info(f"Wrote cProfile stats to {path}")
@@ -0,0 +1,176 @@
+"""link_checker.py
+
+Validate every ``opt_out_link`` in a broker registry.
+
+Links are checked concurrently with asyncio/aiohttp:
+
+* a global semaphore bounds in-flight requests, and the connector keeps a
+  small keep-alive pool per host (``limit_per_host``)
+* requests to the same host are spaced at least ``min_interval`` seconds apart
+* ``ETag`` / ``Last-Modified`` from the previous run are replayed as
+  ``If-None-Match`` / ``If-Modified-Since``; a 304 keeps the cached verdict
+* ``HEAD`` is tried first and falls back to ``GET`` for servers that refuse it
+
+Each distinct URL gets one verdict (``ok``, ``dead``, ``blocked``, ``error`` or
+``skipped`` for mailto links). ``deleteMe check-links --user NAME`` writes them
+to that user's ``link_health`` column; the bundled registry is never written, so
+without ``--user`` the verdicts live only in the cache in the user data dir.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+import instrument
+from broker_store import link_host
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PER_HOST = 2
+DEFAULT_MIN_INTERVAL = 0.5   # seconds between requests to one host
+DEFAULT_TIMEOUT = 15
+USER_AGENT = "deleteMe-link-check/4 (+https://github.com/logicalrock/deleteMe)"
+
+_FALLBACK_TO_GET = {400, 403, 405, 501}
+
+
+def verdict_for(status):
+    if status is None:
+        return 'error'
+    if status < 400:
+        return 'ok'
+    if status in (404, 410):
+        return 'dead'
+    if status in (401, 403, 429):
+        return 'blocked'
+    return 'error'
+
+
+# -----------------------------------------------------------------------------
+# Conditional-request cache
+# -----------------------------------------------------------------------------
+def load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(cache, fh)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------------------------------------------------------
+# Checker
+# -----------------------------------------------------------------------------
+class _HostThrottle:
+    """Per-host pacing: at most one request start every ``interval`` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._locks = {}
+        self._next = {}
+
+    async def wait(self, host):
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next.get(host, 0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next[host] = loop.time() + self.interval
+
+
+async def _request(session, method, url, headers):
+    async with session.request(method, url, headers=headers, allow_redirects=True) as resp:
+        if method == 'GET':
+            # Only the status matters; drain a little so the connection can be reused.
+            await resp.content.read(64 * 1024)
+        return resp.status, resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+
+
+async def _check_one(session, sem, throttle, url, cached):
+    if not url.startswith('http'):
+        return {'health': 'skipped'}
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+
+    host = link_host(url)
+    try:
+        # Pace before taking a slot so a busy host never starves the others.
+        await throttle.wait(host)
+        async with sem:
+            status, etag, modified = await _request(session, 'HEAD', url, headers)
+        if status in _FALLBACK_TO_GET:
+            await throttle.wait(host)
+            async with sem:
+                status, etag, modified = await _request(session, 'GET', url, headers)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logging.debug(f"Link check failed for {url}: {e!r}")
+        dns_failure = (isinstance(e, aiohttp.ClientConnectorError)
+                       and isinstance(e.os_error, socket.gaierror))
+        return {'health': 'dead' if dns_failure else 'error', 'status': None}
+
+    if status == 304 and cached.get('health'):
+        return dict(cached, status=304)
+    return {
+        'health': verdict_for(status),
+        'status': status,
+        'etag': etag or '',
+        'last_modified': modified or '',
+    }
+
+
+async def check_links(urls, cache=None, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                      min_interval=DEFAULT_MIN_INTERVAL, timeout=DEFAULT_TIMEOUT, progress=None):
+    """Check each distinct URL once; return ``{url: result}`` and update ``cache`` in place."""
+    if not AIOHTTP_AVAILABLE:
+        raise RuntimeError("aiohttp not installed; install with 'pip install aiohttp' to check links.")
+    cache = cache if cache is not None else {}
+    unique = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    sem = asyncio.Semaphore(concurrency)
+    throttle = _HostThrottle(min_interval)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    results = {}
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={'User-Agent': USER_AGENT}) as session:
+        async def run(url):
+            result = await _check_one(session, sem, throttle, url, cache.get(url, {}))
+            result['checked_at'] = int(time.time())
+            results[url] = cache[url] = result
+            if progress:
+                progress(len(results), len(unique))
+
+        await asyncio.gather(*(run(u) for u in unique))
+    return results
+
+
+@instrument.timed("check_links")
+def check_registry(brokers, cache_path, **kwargs):
+    """Check every broker's link; return ``{broker index: health}`` for rows whose health changed."""
+    cache = load_cache(cache_path)
+    results = asyncio.run(check_links((b.get('opt_out_link', '') for b in brokers), cache, **kwargs))
+    save_cache(cache_path, cache)
+    changes = {}
+    for i, b in enumerate(brokers):
+        result = results.get(b.get('opt_out_link', '').strip())
+        if result and b.get('link_health', '') != result['health']:
+            changes[i] = result['health']
+    return changes
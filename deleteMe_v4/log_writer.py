@@ -0,0 +1,177 @@
+"""log_writer.py
+
+Background, batched log writing for deleteMe.
+
+``setup_logging`` points the root logger at a ``QueueHandler``, so a
+``logging.debug()`` on a hot path only formats the message and puts it on a
+queue. A ``BatchingQueueListener`` thread takes records off the queue and
+writes them to a size-rotated log file in the user data dir. The file is
+flushed once the queue runs dry (or every ``FLUSH_EVERY`` records under
+sustained load) instead of after every record.
+
+Pass ``json_lines=True`` for one JSON object per record instead of text, and
+``console=sys.stdout`` to also echo records of the ``deleteMe`` logger there.
+The echo is written synchronously by the caller, so it stays in order with the
+prompts and the splash around it; only the file goes through the queue.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FILE_NAME = "deleteMe.log"
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+FLUSH_EVERY = 500           # records written between flushes while the queue stays busy
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s: %(message)s'
+CONSOLE_LOGGER = "deleteMe"  # only this logger's records are echoed to the console
+CONSOLE_FORMAT = '[%(levelname)s] %(message)s'
+
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """``RotatingFileHandler`` that leaves flushing to ``flush_batch``.
+
+    The stock handler flushes after every record and, to decide on rotation,
+    seeks to the end of the file (another flush) and formats each record twice.
+    Here the file size is tracked in memory, each record is formatted once, and
+    the listener flushes once per batch. Rotation closes (and so flushes) the
+    old file as usual.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._size = None
+        super().__init__(*args, **kwargs)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg) if msg.isascii() else len(msg.encode('utf-8'))
+            if self.stream is None:
+                self.stream = self._open()
+            if self._size is None:
+                self._size = os.fstat(self.stream.fileno()).st_size
+            if 0 < self.maxBytes <= self._size + size and self._size:
+                self.doRollover()
+                self._size = 0
+            self.stream.write(msg)
+            self._size += size
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message (+ exc when present)."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """``QueueListener`` that flushes its handlers per batch rather than per record."""
+
+    def __init__(self, log_queue, *handlers, batch_size=FLUSH_EVERY):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self._unflushed = 0
+
+    def dequeue(self, block):
+        if self._unflushed >= self.batch_size:
+            self.flush()
+        try:
+            record = self.queue.get_nowait()
+        except queue.Empty:
+            # Queue drained: write out what we have before waiting for more.
+            self.flush()
+            record = self.queue.get(block)
+        self._unflushed += 1
+        return record
+
+    def flush(self):
+        for handler in self.handlers:
+            getattr(handler, 'flush_batch', handler.flush)()
+        self._unflushed = 0
+
+    def stop(self):
+        if self._thread is None:
+            return
+        super().stop()
+        self.flush()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Merges args into the message but keeps the traceback separate (``exc_text``).
+
+    The stock ``prepare`` bakes the traceback into the message, which would leave
+    ``JSONFormatter`` nothing to put in its ``exc`` field.
+    """
+
+    def prepare(self, record):
+        # A copy: the caller's record may still go to other handlers (pytest's caplog, say).
+        # Copying __dict__ directly is a few times cheaper than copy.copy().
+        original, record = record, object.__new__(type(record))
+        record.__dict__.update(original.__dict__)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_TRACEBACKS = logging.Formatter()
+
+
+def setup_logging(log_dir, level=logging.DEBUG, json_lines=False, console=None,
+                  max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT):
+    """Route the root logger through a background writer into ``log_dir``; returns the listener.
+
+    ``console``, when given, gets ``deleteMe`` records directly, not through the queue.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    handler = BatchedRotatingFileHandler(
+        os.path.join(log_dir, LOG_FILE_NAME),
+        maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8',
+    )
+    handler.setFormatter(JSONFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+    if console is not None:
+        echo = logging.StreamHandler(console)
+        echo.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        echo.addFilter(logging.Filter(CONSOLE_LOGGER))
+        root.addHandler(echo)
+
+    listener = BatchingQueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,181 @@
+"""quote_pool.py
+
+Motivational quotes, loaded once and served from memory.
+
+Quote files are fortune-style: quotes separated by lines holding a single
+``%``. A file with no ``%`` lines is read as one quote per line, and lines
+starting with ``#`` are comments, which covers ``custom_quotes.txt``.
+
+Each file is memory-mapped and scanned once into an array of (start, end)
+byte offsets, so even a very large custom corpus costs 16 bytes per quote and a
+quote is only decoded when it is picked. The remote list is fetched on a
+background thread at most once per ``REMOTE_TTL`` and cached on disk; it
+replaces the bundled copy of the same list once one has been downloaded.
+``QuotePool.pick`` never touches the network, so ``show_quote()`` never blocks.
+"""
+
+import logging
+import mmap
+import os
+import random
+import re
+import threading
+import time
+from array import array
+
+REMOTE_URL = "https://raw.githubusercontent.com/logicalrock/deleteMe/main/deleteMe_v4/motivational_quotes.txt"
+REMOTE_TTL = 24 * 3600      # seconds before the cached remote quotes are fetched again
+REMOTE_TIMEOUT = 5
+FALLBACK_QUOTE = "Keep going, you're doing great!"
+
+_SEPARATOR = re.compile(rb'^%[ \t\r]*$', re.M)
+_LINE = re.compile(rb'\n')
+
+
+class QuoteFile:
+    """One quote file, memory-mapped and indexed by byte offset.
+
+    Pass ``data`` to index bytes already in memory instead (the small remote
+    cache, which is rewritten in place and so must not stay mapped).
+    """
+
+    def __init__(self, path, data=None):
+        self.path = path
+        self._starts = array('q')
+        self._ends = array('q')
+        self._buf = data
+        if data is None:
+            with open(path, 'rb') as fh:
+                if os.fstat(fh.fileno()).st_size:
+                    self._buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf:
+            self._index()
+
+    def _index(self):
+        buf = self._buf
+        boundaries = _SEPARATOR if _SEPARATOR.search(buf) else _LINE
+        start = 0
+        for match in boundaries.finditer(buf):
+            self._add(start, match.start())
+            start = match.end()
+        self._add(start, len(buf))
+
+    def _add(self, start, end):
+        text = self._buf[start:end].strip()
+        if text and not text.startswith(b'#'):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        return self._buf[self._starts[i]:self._ends[i]].decode('utf-8', 'replace').strip()
+
+
+class QuotePool:
+    """Local quote files plus a remote list refreshed in the background.
+
+    ``bundled`` is the shipped copy of the remote list, used until a download
+    has been cached; ``paths`` are extra (custom) files that are always included.
+    """
+
+    def __init__(self, bundled=None, paths=(), cache_path=None, remote_url=REMOTE_URL, ttl=REMOTE_TTL):
+        self.bundled = bundled
+        self.paths = [p for p in paths if p]
+        self.cache_path = cache_path
+        self.remote_url = remote_url
+        self.ttl = ttl
+        # Both are replaced wholesale, never mutated, so pick() needs no lock.
+        self._local = ()
+        self._remote = ()
+        self._thread = None
+
+    # ------------------------------------------------------------------ #
+    # Loading
+    # ------------------------------------------------------------------ #
+    def load(self):
+        """Index the local files and the cached remote quotes. Never hits the network."""
+        local = []
+        for path in [self.bundled] + self.paths if self.bundled else self.paths:
+            try:
+                quotes = QuoteFile(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not load quotes from {path}: {e}")
+                continue
+            if len(quotes):
+                local.append(quotes)
+        self._local = tuple(local)
+        if self.cache_path:
+            try:
+                with open(self.cache_path, 'rb') as fh:
+                    self._set_remote(fh.read())
+            except OSError:
+                pass
+        return self
+
+    def _set_remote(self, body):
+        quotes = QuoteFile(self.cache_path, data=body)
+        self._remote = (quotes,) if len(quotes) else ()
+
+    def cache_is_fresh(self):
+        try:
+            return time.time() - os.path.getmtime(self.cache_path) < self.ttl
+        except OSError:
+            return False
+
+    def refresh(self):
+        """Fetch the remote quotes into the cache file; False if they could not be fetched."""
+        import urllib.request   # slow to import; keep it off the startup path
+        try:
+            with urllib.request.urlopen(self.remote_url, timeout=REMOTE_TIMEOUT) as resp:
+                body = resp.read()
+            body.decode('utf-8')
+        except (OSError, ValueError) as e:
+            logging.info(f"Remote quotes unavailable, keeping cached ones: {e}")
+            return False
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(body)
+        os.replace(tmp_path, self.cache_path)
+        self._set_remote(body)
+        return True
+
+    def start(self, offline=False):
+        """Load on a background thread, then refresh the remote quotes if the cache is stale."""
+        def run():
+            self.load()
+            if not offline and self.cache_path and not self.cache_is_fresh():
+                self.refresh()
+
+        self._thread = threading.Thread(target=run, name="quotes", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ------------------------------------------------------------------ #
+    # Picking
+    # ------------------------------------------------------------------ #
+    def __len__(self):
+        return sum(len(source) for source in self._sources())
+
+    def _sources(self):
+        local, remote = self._local, self._remote
+        if remote and self.bundled and local and local[0].path == self.bundled:
+            local = local[1:]
+        return local + remote
+
+    def pick(self, rng=random):
+        """A random quote from everything loaded so far, or ``FALLBACK_QUOTE``."""
+        sources = self._sources()
+        i = rng.randrange(sum(len(source) for source in sources) or 1)
+        for source in sources:
+            if i < len(source):
+                return source[i]
+            i -= len(source)
+        return FALLBACK_QUOTE
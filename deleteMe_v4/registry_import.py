@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""registry_import.py
+
+Stream ``Data_Broker_Full_Registry_2025.xlsx.xlsx`` into a broker CSV.
+
+The workbook is read straight out of the zip with ``iterparse``; each ``<row>``
+element is turned into a dict and then cleared, so memory stays flat no matter
+how many rows the sheet has. Rows are normalized to the v4 broker schema and
+upserted into a ``BrokerStore`` keyed on (broker name, opt-out link), which
+makes re-running the import against an existing registry a no-op apart from
+genuinely new brokers. New brokers are journaled one batch per write and the
+CSV is compacted once at the end.
+
+Usage::
+
+    python registry_import.py [workbook.xlsx] [--csv brokers.csv] [--batch-size 500]
+"""
+
+import argparse
+import csv
+import os
+import time
+import zipfile
+from pathlib import Path
+from xml.etree.ElementTree import iterparse
+
+from broker_journal import BrokerJournal
+from broker_store import BrokerStore
+
+APP_DIR = Path(__file__).resolve().parent
+WORKBOOK_FILE = APP_DIR / "Data_Broker_Full_Registry_2025.xlsx.xlsx"
+BROKERS_FILE = APP_DIR / "brokers.csv"
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+# -----------------------------------------------------------------------------
+# Streaming XLSX reader
+# -----------------------------------------------------------------------------
+def _column(ref):
+    letters = ''.join(ch for ch in ref if ch.isalpha())
+    col = 0
+    for ch in letters:
+        col = col * 26 + (ord(ch) - 64)
+    return col - 1
+
+
+def _shared_strings(zf):
+    try:
+        fh = zf.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with fh:
+        for _, elem in iterparse(fh):
+            if elem.tag == _NS + 'si':
+                strings.append(''.join(t.text or '' for t in elem.iter(_NS + 't')))
+                elem.clear()
+    return strings
+
+
+def iter_xlsx_rows(path, sheet='xl/worksheets/sheet1.xml'):
+    """Yield each data row of ``sheet`` as a dict keyed by the header row."""
+    with zipfile.ZipFile(path) as zf:
+        shared = _shared_strings(zf)
+        header = None
+        with zf.open(sheet) as fh:
+            for _, elem in iterparse(fh):
+                if elem.tag != _NS + 'row':
+                    continue
+                values = {}
+                for c in elem.iter(_NS + 'c'):
+                    kind = c.get('t')
+                    if kind == 'inlineStr':
+                        text = ''.join(t.text or '' for t in c.iter(_NS + 't'))
+                    else:
+                        v = c.find(_NS + 'v')
+                        text = v.text if v is not None and v.text else ''
+                        if kind == 's' and text:
+                            text = shared[int(text)]
+                    values[_column(c.get('r', ''))] = text
+                elem.clear()
+                if header is None:
+                    header = [values.get(i, '') for i in range(max(values, default=-1) + 1)]
+                    continue
+                yield {h: values.get(i, '') for i, h in enumerate(header) if h}
+
+
+def normalize_row(row):
+    """Map a registry row onto the v4 broker schema; None if it has no opt-out link."""
+    name = (row.get('Name') or '').strip()
+    link = (row.get('OptOutURL') or '').strip()
+    if not name or not link.startswith(('http', 'mailto:')):
+        return None
+    return {'name': name, 'opt_out_link': link, 'covered_by': '', 'completed': False}
+
+
+# -----------------------------------------------------------------------------
+# Import
+# -----------------------------------------------------------------------------
+def read_csv(path):
+    brokers = []
+    if not os.path.exists(path):
+        return brokers
+    with open(path, newline='', encoding='utf-8') as fh:
+        for row in csv.DictReader(fh):
+            brokers.append({
+                'name': row.get('name', '').strip(),
+                'opt_out_link': row.get('opt_out_link', '').strip(),
+                'covered_by': row.get('covered_by', '').strip(),
+                'completed': row.get('completed', 'False').strip().lower() == 'true'
+            })
+    return brokers
+
+
+def import_registry(rows, store, journal=None, batch_size=500):
+    """Upsert normalized ``rows`` into ``store``; return (seen, added, skipped)."""
+    keys = {(b['name'], b['opt_out_link']) for b in store}
+    seen = added = skipped = 0
+    batch = []
+
+    def flush():
+        if journal is not None and batch:
+            journal.record_batch(store.rows, [{'op': 'add', 'broker': b} for b in batch])
+        batch.clear()
+
+    for row in rows:
+        seen += 1
+        broker = normalize_row(row)
+        if broker is None:
+            skipped += 1
+            continue
+        key = (broker['name'], broker['opt_out_link'])
+        if key in keys:
+            continue
+        keys.add(key)
+        store.add(broker)
+        batch.append(broker)
+        added += 1
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return seen, added, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import the data-broker registry workbook.")
+    parser.add_argument('workbook', nargs='?', default=str(WORKBOOK_FILE))
+    parser.add_argument('--csv', default=str(BROKERS_FILE), help="broker CSV to upsert into")
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    journal = BrokerJournal(args.csv)
+    brokers = read_csv(args.csv)
+    journal.replay(brokers)
+    store = BrokerStore(brokers)
+
+    start = time.perf_counter()
+    seen, added, skipped = import_registry(
+        iter_xlsx_rows(args.workbook), store, journal, args.batch_size
+    )
+    if added or os.path.exists(journal.path) or not os.path.exists(args.csv):
+        journal.compact_now(store.rows)
+    elapsed = time.perf_counter() - start
+
+    rate = seen / elapsed if elapsed else float('inf')
+    print(f"Read {seen} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    print(f"Added {added} new brokers, skipped {skipped} rows without an opt-out link; "
+          f"registry now has {len(store)} brokers ➜ {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# deleteMe and the web app keep their data under platformdirs; point every XDG
+# dir at a scratch directory before anything imports them.
+_SCRATCH = tempfile.mkdtemp(prefix="deleteme-tests-")
+for var in ("XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_STATE_HOME"):
+    os.environ[var] = os.path.join(_SCRATCH, var.lower())
+os.environ.setdefault("DELETEME_NO_SPLASH", "1")
+os.environ["DATABASE_URL"] = f"sqlite:///{_SCRATCH}/web.db"
+os.environ["EMAIL_HOST"] = ""
+
+# The v3 and v4 CLIs are top-level modules rather than packages.
+sys.path.insert(0, str(ROOT / "deleteMe_v3"))
+sys.path.insert(0, str(ROOT / "deleteMe_v4"))
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def web():
+    """TestClient for the web app (shared scratch database; use unique user names)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as client:
+        yield client
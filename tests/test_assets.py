@@ -0,0 +1,57 @@
+import os
+import re
+import threading
+
+from app.core.assets import MANIFEST, build, ensure_built
+
+
+def make_sources(tmp_path):
+    source = tmp_path / "static"
+    source.mkdir()
+    (source / "style.css").write_text("body { color: #222; }\n" * 40)
+    (source / "dashboard.js").write_text("console.log('hi');\n")
+    return source, tmp_path / "build" / "static"
+
+
+def test_deleted_and_old_sources_trigger_a_rebuild(tmp_path):
+    source, out = make_sources(tmp_path)
+    assert set(ensure_built(source, out)) == {"style.css", "dashboard.js"}
+
+    (source / "dashboard.js").unlink()
+    assert set(ensure_built(source, out)) == {"style.css"}
+    assert not list(out.glob("dashboard*"))
+
+    # A copied-in file keeps its old mtime; it still has to be picked up.
+    added = source / "extra.txt"
+    added.write_text("hello")
+    os.utime(added, (0, 0))
+    assert set(ensure_built(source, out)) == {"style.css", "extra.txt"}
+
+
+def test_concurrent_builds_do_not_clobber_each_other(tmp_path):
+    source, out = make_sources(tmp_path)
+    errors = []
+
+    def run():
+        try:
+            build(source, out)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert (out / MANIFEST).exists()
+    assert sorted(p.name for p in out.parent.iterdir()) == ["static"]   # no scratch dirs left
+
+
+def test_pages_reference_served_fingerprinted_assets(web):
+    page = web.get("/").text
+    url = re.search(r'href="(/static/style\.[0-9a-f]{12}\.css)"', page).group(1)
+    resp = web.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "public, max-age=31536000, immutable"
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+import deleteMe
+from broker_journal import write_csv
+
+
+@pytest.fixture
+def user(monkeypatch, request):
+    monkeypatch.setattr(deleteMe, "user_name", f"batch{request.node.name[-12:]}")
+    monkeypatch.setattr(deleteMe, "BATCH_SIZE", 2)
+    monkeypatch.setattr(deleteMe, "BATCH_PACE", 0)
+    for name in ("BROKERS_FILE", "BATCH_FILE", "journal"):
+        monkeypatch.setattr(deleteMe, name, getattr(deleteMe, name))
+    deleteMe.setup_user_file()
+    write_csv(deleteMe.BROKERS_FILE, [
+        {'name': name, 'opt_out_link': f"https://{name.lower()}.example/optout",
+         'covered_by': '', 'completed': False, 'link_health': ''}
+        for name in ("Spokeo", "Radaris", "Acxiom", "Epsilon", "Oracle")
+    ])
+    yield
+    deleteMe.journal.wait()
+
+
+def run_batch(monkeypatch, answers):
+    opened = []
+    replies = iter(answers)
+    monkeypatch.setattr(deleteMe, "open_link", opened.append)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+    groups = deleteMe.index_brokers(deleteMe.load_brokers())
+    deleteMe.batch_opt_out(groups)
+    deleteMe.journal.wait()
+    return [link.split("//")[1].split(".")[0] for link in opened]
+
+
+def test_paused_batch_resumes_with_the_next_broker(monkeypatch, user):
+    # First batch: Spokeo done, Radaris skipped; then pause.
+    assert run_batch(monkeypatch, ["1", "n"]) == ["spokeo", "radaris"]
+    with open(deleteMe.BATCH_FILE, encoding='utf-8') as fh:
+        assert json.load(fh) == {'seen': [0, 1]}
+
+    # Resuming skips both handled brokers (including the one left pending).
+    assert run_batch(monkeypatch, ["all", "y", "none"]) == ["acxiom", "epsilon", "oracle"]
+    assert not os.path.exists(deleteMe.BATCH_FILE)
+    brokers = deleteMe.load_brokers()
+    assert [b['name'] for b in brokers if b['covered_by'] == "manual"] == ["Spokeo", "Acxiom", "Epsilon"]
+
+
+def test_unreadable_checkpoint_starts_over(monkeypatch, user):
+    with open(deleteMe.BATCH_FILE, 'w', encoding='utf-8') as fh:
+        fh.write("{not json")
+    assert run_batch(monkeypatch, ["none", "n"]) == ["spokeo", "radaris"]
+
+
+@pytest.mark.parametrize("answer, picked", [
+    ("all", [0, 1, 2]), ("Y", [0, 1, 2]), ("", []), ("none", []),
+    ("1,3", [0, 2]), ("3 1", [2, 0]), ("0,4,x,2", [1]),
+])
+def test_parse_batch_answer(answer, picked):
+    assert deleteMe.parse_batch_answer(answer, 3) == picked
@@ -0,0 +1,48 @@
+from broker_dedup import BrokerGroups, canonical_name, group_ids, registrable_domain
+from broker_store import BrokerStore
+
+
+def row(name, link):
+    return {'name': name, 'opt_out_link': link, 'covered_by': '', 'completed': False}
+
+
+def names(brokers, groups):
+    return [[brokers[i]['name'] for i in ids] for ids in groups]
+
+
+def test_similar_names_of_different_companies_stay_apart():
+    brokers = [row("BH MARKETING GROUP LLC", "https://usmarketinggrp.com/optout"),
+               row("BH MARKETING Group, LLC", "https://usmarketinggrp.com/optout"),
+               row("US Marketing Group", "https://usmarketinggrp.com/optout")]
+    assert names(brokers, group_ids(brokers)) == [
+        ["BH MARKETING GROUP LLC", "BH MARKETING Group, LLC"], ["US Marketing Group"]]
+
+
+def test_empty_names_are_not_merged():
+    brokers = [row("", "https://a.example/optout"), row("  ", "https://b.example/optout"),
+               row("...", "https://c.example/optout"), row("Spokeo", "https://spokeo.com/optout")]
+    assert group_ids(brokers) == [[0], [1], [2], [3]]
+
+    groups = BrokerGroups(BrokerStore(brokers))
+    assert groups.find("") is None
+    store_id = groups.store.add(row("", "https://d.example/optout"))
+    assert groups.members(groups.add(store_id)) == [store_id]
+
+
+def test_typos_merge_only_within_a_registrable_domain():
+    brokers = [row("NC Ventures, LLC", "https://www.ncsolutions.com/privacy"),
+               row("NC Vnetures, LLC", "https://optout.ncsolutions.com/"),
+               row("Skipmasher, Inc.", "https://skipsmasher.com/optout"),
+               row("Skipsmasher, Inc.", "https://skipsmasher.example.org/optout"),
+               row("Live Intent", "https://privacy.liveintent.com/"),
+               row("LiveIntent, Inc.", "mailto:privacy@liveintent.com")]
+    assert names(brokers, group_ids(brokers)) == [
+        ["NC Ventures, LLC", "NC Vnetures, LLC"], ["Skipmasher, Inc."], ["Skipsmasher, Inc."],
+        ["Live Intent", "LiveIntent, Inc."]]
+
+
+def test_canonical_name_and_registrable_domain():
+    assert canonical_name("33Across, Inc.") == "33across"
+    assert canonical_name("Pacific East Research Inc") == canonical_name("Pacificeast Research")
+    assert registrable_domain("consumer.risk.lexisnexis.com") == "lexisnexis.com"
+    assert registrable_domain("optout.example.co.uk") == "example.co.uk"
@@ -0,0 +1,61 @@
+import csv
+import json
+
+from broker_journal import BrokerJournal, write_csv
+
+
+def broker(name):
+    return {'name': name, 'opt_out_link': f"https://{name.lower()}.example/optout",
+            'covered_by': '', 'completed': False, 'link_health': ''}
+
+
+def load(path):
+    with open(path, newline='', encoding='utf-8') as fh:
+        return [dict(row, completed=row['completed'] == 'True') for row in csv.DictReader(fh)]
+
+
+def test_replay_after_crash_mid_compaction_does_not_duplicate_adds(tmp_path):
+    path = str(tmp_path / "brokers.csv")
+    brokers = [broker("Spokeo"), broker("Radaris")]
+    write_csv(path, brokers)
+    journal = BrokerJournal(path, threshold=1 << 30)
+
+    brokers.append(broker("Acxiom"))
+    journal.record_add(brokers, brokers[-1])
+    brokers.extend([broker("Epsilon"), broker("Oracle")])
+    journal.record_batch(brokers, [{'op': 'add', 'broker': brokers[-2]}, {'op': 'add', 'broker': brokers[-1]}])
+    brokers[0]['completed'] = True
+    journal.record_update(brokers, 0, completed=True)
+
+    # Compaction wrote the CSV, then the process died before trimming the journal.
+    write_csv(path, brokers)
+    replayed = load(path)
+    assert journal.replay(replayed) == 4
+    assert [b['name'] for b in replayed] == ["Spokeo", "Radaris", "Acxiom", "Epsilon", "Oracle"]
+    assert replayed[0]['completed'] is True
+
+
+def test_replay_appends_adds_missing_from_the_csv(tmp_path):
+    path = str(tmp_path / "brokers.csv")
+    brokers = [broker("Spokeo")]
+    write_csv(path, brokers)
+    journal = BrokerJournal(path, threshold=1 << 30)
+    brokers.append(broker("Acxiom"))
+    journal.record_add(brokers, brokers[-1])
+
+    replayed = load(path)
+    assert journal.replay(replayed) == 1
+    assert [b['name'] for b in replayed] == ["Spokeo", "Acxiom"]
+    with open(journal.path, encoding='utf-8') as fh:
+        assert json.loads(fh.readline())['i'] == 1
+
+
+def test_old_add_records_without_an_index_still_append(tmp_path):
+    path = str(tmp_path / "brokers.csv")
+    write_csv(path, [broker("Spokeo")])
+    journal = BrokerJournal(path)
+    with open(journal.path, 'w', encoding='utf-8') as fh:
+        fh.write(json.dumps({'op': 'add', 'broker': broker("Acxiom")}) + "\n")
+    replayed = load(path)
+    assert journal.replay(replayed) == 1
+    assert [b['name'] for b in replayed] == ["Spokeo", "Acxiom"]
@@ -0,0 +1,64 @@
+import csv
+
+import pytest
+
+from broker_mmap import MappedBrokerTable
+
+V4 = "name,opt_out_link,covered_by,completed,link_health\n"
+V3 = "name,url,email,notes,covered_by,status\n"
+
+MALFORMED = {
+    'stray quote in a name': V4 + 'Acme "X,https://a.com,,False,\nB,https://b.com,,False,\nC,https://c.com,Incogni,False,\n',
+    'two stray quotes': V4 + 'Acme "X,https://a.com,,False,\nB,https://b.com,,False,\nD "d,https://d.com,,True,\nE,https://e.com,,,\n',
+    'quote closing mid-line': V4 + 'Acme X",https://a.com,,False,\nB,https://b.com,,False,\n',
+    'text after a closing quote': V4 + '"Acme"Corp,https://a.com,,False,\n"B ""q""",https://b.com,,True,ok\n',
+    'quoted line break': V4 + '"Multi\nLine",https://m.com,,False,\r\n\r\nshort\n',
+    'quote left open': V4 + 'A,https://a.com,,False,\n"Open,https://o.com,,False,\nrest,of,file,,\n',
+    'v3 stray quote': V3 + 'Acme "X,https://a.com,,,,\n"V3 ""x""",https://v.com,e@x,"n\n2",,Completed\nW,https://w.com,,,manual,\n',
+}
+
+
+def dict_reader_rows(path):
+    """What ``load_brokers`` makes of the file, in the v4 shape the table produces."""
+    with open(path, newline='', encoding='utf-8') as fh:
+        rows = list(csv.DictReader(fh))
+    field = lambda row, key: (row.get(key) or '').strip()
+    v3 = rows and 'url' in rows[0]
+    return [{
+        'name': field(row, 'name'),
+        'opt_out_link': field(row, 'url' if v3 else 'opt_out_link'),
+        'covered_by': field(row, 'covered_by'),
+        'completed': field(row, 'status' if v3 else 'completed').lower() == ('completed' if v3 else 'true'),
+        'link_health': '' if v3 else field(row, 'link_health'),
+    } for row in rows]
+
+
+@pytest.mark.parametrize('data', MALFORMED.values(), ids=MALFORMED.keys())
+def test_malformed_quoting_reads_like_dict_reader(tmp_path, data):
+    path = tmp_path / "brokers.csv"
+    path.write_text(data, encoding='utf-8', newline='')
+    expected = dict_reader_rows(path)
+
+    with MappedBrokerTable(str(path)) as table:
+        assert len(table) == len(expected)
+        assert table.to_dicts() == expected
+        assert list(table.names()) == [row['name'] for row in expected]
+        assert [table.field(i, 'opt_out_link') for i in range(len(table))] == [r['opt_out_link'] for r in expected]
+        pending = [i for i, row in enumerate(expected) if not row['covered_by'] and not row['completed']]
+        assert table.pending_ids() == pending
+        assert [i for i in range(len(table)) if table.is_pending(i)] == pending
+
+
+def test_overlay_edits_and_appends(tmp_path):
+    path = tmp_path / "brokers.csv"
+    path.write_text(V4 + 'Spokeo,https://spokeo.com,,False,\n"Radaris, Inc.",https://radaris.com,,False,\n',
+                    encoding='utf-8', newline='')
+    with MappedBrokerTable(str(path)) as table:
+        table[0].update({'completed': True})
+        table.append({'name': "Acxiom", 'opt_out_link': "https://acxiom.com", 'covered_by': '',
+                      'completed': False, 'link_health': ''})
+
+        assert list(table.names()) == ["Spokeo", "Radaris, Inc.", "Acxiom"]
+        assert table.pending_ids() == [1, 2]
+        assert table.is_completed(0) and not table.is_pending(0)
+        assert table[1]['name'] == "Radaris, Inc."
@@ -0,0 +1,18 @@
+import pytest
+
+from broker_journal import FIELDNAMES
+from broker_records import V3_FIELDS, V4_FIELDS, detect_schema
+
+
+def test_detect_schema():
+    assert detect_schema(V4_FIELDS) == 'v4'
+    assert detect_schema(V4_FIELDS[:4]) == 'v4'
+    assert detect_schema(V3_FIELDS) == 'v3'
+    with pytest.raises(ValueError):
+        detect_schema(['name', 'link'])
+    with pytest.raises(ValueError):
+        detect_schema(None)
+
+
+def test_v4_fields_match_what_the_cli_writes():
+    assert V4_FIELDS == list(FIELDNAMES)
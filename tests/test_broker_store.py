@@ -0,0 +1,33 @@
+from broker_store import BrokerStore, is_done
+
+
+def broker(name, covered_by='', completed=False):
+    return {'name': name, 'opt_out_link': f"https://www.{name.lower()}.example/optout",
+            'covered_by': covered_by, 'completed': completed}
+
+
+def assert_indexes_match_rows(store):
+    assert store.pending_ids() == [i for i, b in enumerate(store) if not is_done(b)]
+    assert store.count_pending() == len(store.pending_ids())
+
+
+def test_pending_index_follows_add_and_update():
+    store = BrokerStore([broker("Spokeo"), broker("Radaris", covered_by="Incogni"), broker("Acxiom", completed=True)])
+    assert store.pending_ids() == [0]
+
+    assert store.add(broker("Epsilon")) == 3
+    assert store.add(broker("Oracle", covered_by="DeleteMe")) == 4
+    assert_indexes_match_rows(store)
+
+    store.update(0, covered_by="Kanary")
+    store.update(1, covered_by="")
+    store.update(2, completed="False")      # raw CSV value
+    store.update(3, name="Epsilon Data")    # no change in state
+    assert store.pending_ids() == [1, 2, 3]
+    assert_indexes_match_rows(store)
+
+    store.update(1, completed=True)
+    store.update(1, completed=True)
+    assert store.pending_ids() == [2, 3]
+    assert_indexes_match_rows(store)
+
@@ -0,0 +1,52 @@
+import argparse
+import json
+
+from broker_dedup import BrokerGroups
+from broker_store import BrokerStore
+
+import headless
+
+
+def test_company_pending_counts_completed_channels_as_done():
+    store = BrokerStore([
+        {'name': "Spokeo", 'opt_out_link': "https://spokeo.com/optout", 'covered_by': '', 'completed': True},
+        {'name': "Spokeo, Inc.", 'opt_out_link': "mailto:privacy@spokeo.com", 'covered_by': 'Incogni',
+         'completed': False},
+        {'name': "Radaris", 'opt_out_link': "https://radaris.com/optout", 'covered_by': '', 'completed': False},
+    ])
+    groups = BrokerGroups(store)
+    spokeo, radaris = groups.find("Spokeo"), groups.find("Radaris")
+
+    assert headless._company(groups, spokeo)['pending'] is False
+    assert headless._company(groups, radaris)['pending'] is True
+    assert groups.pending() == [radaris]
+
+
+class RecordingJournal:
+    def __init__(self):
+        self.batches = []
+
+    def record_batch(self, rows, records):
+        self.batches.append(records)
+
+
+def test_mark_done_rejects_mistyped_stdin_records(monkeypatch, capsys):
+    store = BrokerStore([
+        {'name': "Spokeo", 'opt_out_link': "https://spokeo.com/optout", 'covered_by': '', 'completed': False},
+        {'name': "Radaris", 'opt_out_link': "https://radaris.com/optout", 'covered_by': '', 'completed': False},
+    ])
+    groups = BrokerGroups(store)
+    journal = RecordingJournal()
+    monkeypatch.setattr(headless, "read_stdin_records",
+                        lambda: iter([{'name': 5}, {'id': True}, {'id': "1"}, {'name': "Spokeo"}]))
+    headless.cmd_mark_done(argparse.Namespace(ids=[], name=[], by="Incogni"), groups, journal)
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[:3] == [
+        {'ok': False, 'name': 5, 'error': "name must be a string"},
+        {'ok': False, 'id': True, 'error': "id must be an integer"},
+        {'ok': False, 'id': "1", 'error': "id must be an integer"},
+    ]
+    assert lines[3]['ok'] and lines[3]['name'] == "Spokeo"
+    assert (store[0]['covered_by'], store[1]['covered_by']) == ("Incogni", "")
+    assert [r['i'] for r in journal.batches[0]] == [0]
@@ -0,0 +1,54 @@
+from app.core.importer import MAX_RECORD_SIZE, BrokerCSVImport
+
+
+def parse(chunks):
+    parsed = BrokerCSVImport()
+    rows = []
+    for chunk in chunks:
+        for batch in parsed.feed(chunk):
+            rows += batch
+    for batch in parsed.close():
+        rows += batch
+    return parsed, rows
+
+
+def test_line_without_newline_is_capped():
+    parsed = BrokerCSVImport()
+    parsed.feed(b"name,opt_out_link\nGood,https://good.example\n")
+    for _ in range(4 * MAX_RECORD_SIZE // 4096):
+        parsed.feed(b"x" * 4096)
+        assert len(parsed._tail) <= MAX_RECORD_SIZE
+    parsed.feed(b"x" * 10 + b",https://long.example\nAfter,https://after.example\n")
+    parsed.close()
+    assert parsed.errors == [{'line': 3, 'error': f"record longer than {MAX_RECORD_SIZE} characters"}]
+    assert (parsed.rows, parsed.valid) == (3, 2)
+
+
+def test_oversized_final_line_is_dropped():
+    parsed, rows = parse([b"name,opt_out_link\n", b"y" * (MAX_RECORD_SIZE + 1)])
+    assert rows == []
+    assert parsed.error_count == 1 and parsed.errors[0]['line'] == 2
+
+
+def test_chunk_boundaries_do_not_matter():
+    data = b'name,opt_out_link\n"A, Inc.",https://a.example\n"B\nC",https://b.example\n'
+    whole = parse([data])[1]
+    assert parse([data[i:i + 1] for i in range(len(data))])[1] == whole
+    assert [r['name'] for r in whole] == ["A, Inc.", "B\nC"]
+
+
+def test_stray_quotes_inside_unquoted_fields_are_literal():
+    data = (b'name,opt_out_link\nAcme "X,https://a.com\nB,https://b.com\nC,https://c.com\n'
+            b'D "d,https://d.com\nE,https://e.com\n')
+    parsed, rows = parse([data])
+    assert [r['name'] for r in rows] == ['Acme "X', "B", "C", 'D "d', "E"]
+    assert (parsed.rows, parsed.error_count) == (5, 0)
+
+
+def test_quote_state_matches_csv_reader():
+    import csv
+    import io
+    data = ('name,opt_out_link\n"A ""quoted"" name",https://a.example\n"B"x,https://b.example\n'
+            'C,"https://c.example/""q"\n"D\nE ""F"" G",https://d.example\nH,https://h.example\n')
+    expected = [r['name'] for r in csv.DictReader(io.StringIO(data))]
+    assert [r['name'] for r in parse([data.encode()])[1]] == expected
@@ -0,0 +1,109 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import link_checker
+
+
+def run_against(routes, paths, **kwargs):
+    """Serve ``routes`` locally and check ``paths`` on it; returns ``{path: result}``."""
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        async with TestServer(app) as server:
+            urls = {str(server.make_url(p)): p for p in paths}
+            kwargs.setdefault('min_interval', 0)
+            results = await link_checker.check_links(urls, **kwargs)
+        return {urls[u]: r for u, r in results.items()}
+    return asyncio.run(main())
+
+
+def status(code):
+    async def handler(request):
+        return web.Response(status=code)
+    return handler
+
+
+def test_status_codes():
+    routes = [web.route('*', f'/{code}', status(code)) for code in (200, 404, 410, 429, 500, 503)]
+    results = run_against(routes, ['/200', '/404', '/410', '/429', '/500', '/503'])
+    assert {p: r['health'] for p, r in results.items()} == {
+        '/200': 'ok', '/404': 'dead', '/410': 'dead', '/429': 'blocked', '/500': 'error', '/503': 'error'}
+    assert results['/404']['status'] == 404
+
+
+def test_head_refused_falls_back_to_get():
+    methods = []
+
+    async def handler(request):
+        methods.append(request.method)
+        return web.Response(status=405 if request.method == 'HEAD' else 200)
+
+    assert run_against([web.route('*', '/form', handler)], ['/form'])['/form']['health'] == 'ok'
+    assert methods == ['HEAD', 'GET']
+
+
+def test_redirects_are_followed():
+    async def moved(request):
+        raise web.HTTPMovedPermanently('/new')
+
+    async def gone(request):
+        raise web.HTTPFound('/404')
+
+    routes = [web.route('*', '/old', moved), web.route('*', '/new', status(200)),
+              web.route('*', '/gone', gone), web.route('*', '/404', status(404))]
+    results = run_against(routes, ['/old', '/gone'])
+    assert (results['/old']['health'], results['/old']['status']) == ('ok', 200)
+    assert results['/gone']['health'] == 'dead'
+
+
+def test_timeout_is_an_error():
+    async def slow(request):
+        await asyncio.sleep(1)
+        return web.Response()
+
+    result = run_against([web.route('*', '/slow', slow)], ['/slow'], timeout=0.2)['/slow']
+    assert result == {'health': 'error', 'status': None, 'checked_at': result['checked_at']}
+
+
+def test_concurrency_limit():
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return web.Response()
+
+    paths = [f'/page/{i}' for i in range(20)]
+    results = run_against([web.route('*', '/page/{i}', handler)], paths, concurrency=3, per_host=10)
+    assert len(results) == 20 and all(r['health'] == 'ok' for r in results.values())
+    assert peak == 3
+
+
+def test_not_modified_keeps_the_cached_verdict():
+    async def handler(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(headers={'ETag': '"v1"'})
+
+    async def main():
+        app = web.Application()
+        app.add_routes([web.route('*', '/cached', handler)])
+        cache = {}
+        async with TestServer(app) as server:
+            url = str(server.make_url('/cached'))
+            await link_checker.check_links([url], cache, min_interval=0)
+            second = await link_checker.check_links([url], cache, min_interval=0)
+        return second[url]
+
+    result = asyncio.run(main())
+    assert (result['health'], result['status'], result['etag']) == ('ok', 304, '"v1"')
+
+
+def test_mailto_links_are_skipped():
+    results = asyncio.run(link_checker.check_links(['mailto:privacy@broker.example']))
+    assert results['mailto:privacy@broker.example']['health'] == 'skipped'
@@ -0,0 +1,54 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import link_checker
+
+
+def test_check_links_stores_and_publishes_changed_verdicts(web, monkeypatch):
+    storage = web.app.state.storage
+    storage.import_brokers([{'name': "Dead Link Broker", 'opt_out_link': "https://dead-link.example/optout"}])
+    target = next(b for b in storage.brokers_page(0, 100000) if b['name'] == "Dead Link Broker")
+    checked = []
+
+    async def fake_check_links(urls, cache=None, **kwargs):
+        checked.extend(urls)
+        return {target['opt_out_link']: {'health': 'dead', 'status': 404}}
+
+    monkeypatch.setattr(link_checker, "check_links", fake_check_links)
+    changes = []
+    storage.add_listener(lambda user_id, change: changes.append((user_id, change)))
+
+    assert TestClient(web.app).post("/brokers/check-links").status_code == 401
+    web.post("/users/create", json={"name": "link-checker"})
+    assert web.post("/brokers/check-links").status_code == 202
+    deadline = time.monotonic() + 5
+    while not web.app.state.link_check.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert web.app.state.link_check.result() == 1
+    assert len(checked) == storage.broker_count()
+    assert storage.get_broker(target['id'])['link_health'] == 'dead'
+    assert changes == [(None, {'type': 'link', 'broker_id': target['id'], 'link_health': 'dead'})]
+
+
+def test_link_health_changes_both_etags(web):
+    storage = web.app.state.storage
+    storage.import_brokers([{'name': "ETag Broker", 'opt_out_link': "https://etag.example/optout"}])
+    target = next(b for b in storage.brokers_page(0, 100000) if b['name'] == "ETag Broker")
+    user_id = web.post("/users/create", json={"name": "etag-watcher"}).json()["user"]["id"]
+    urls = ["/brokers", f"/users/{user_id}/brokers"]
+    tags = {url: web.get(url).headers["etag"] for url in urls}
+    for url in urls:
+        assert web.get(url, headers={"If-None-Match": tags[url]}).status_code == 304
+
+    assert storage.set_link_health(target['id'], 'dead')
+    for url in urls:
+        resp = web.get(url, headers={"If-None-Match": tags[url]})
+        assert resp.status_code == 200 and resp.headers["etag"] != tags[url]
+
+    # Writing the same verdict again changes nothing, so the tags stay valid.
+    tags = {url: web.get(url).headers["etag"] for url in urls}
+    assert not storage.set_link_health(target['id'], 'dead')
+    for url in urls:
+        assert web.get(url, headers={"If-None-Match": tags[url]}).status_code == 304
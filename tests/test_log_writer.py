@@ -0,0 +1,61 @@
+import io
+import logging
+import os
+import sys
+import threading
+
+import pytest
+
+import deleteMe
+from log_writer import LOG_FILE_NAME, _QueueHandler, setup_logging
+
+
+class ThreadRecordingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def write(self, text):
+        self.threads.add(threading.current_thread())
+        return super().write(text)
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_debug_is_echoed_in_order_by_the_caller(tmp_path, restore_root_logger):
+    console = ThreadRecordingStream()
+    listener = setup_logging(str(tmp_path), console=console)
+    deleteMe.debug("Waiting for input: Do you use Incogni?")
+    console.write("Do you use Incogni? (y/n): ")
+    logging.getLogger("link_checker").debug("not for the console")
+    listener.stop()
+
+    assert console.getvalue() == "[DEBUG] Waiting for input: Do you use Incogni?\nDo you use Incogni? (y/n): "
+    assert console.threads == {threading.current_thread()}
+    with open(os.path.join(tmp_path, LOG_FILE_NAME), encoding='utf-8') as fh:
+        log = fh.read()
+    assert "Waiting for input" in log and "not for the console" in log
+
+
+def test_prepare_leaves_the_callers_record_alone():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    record = logging.LogRecord("deleteMe", logging.ERROR, __file__, 1, "failed for %s", ("spokeo",), exc_info)
+
+    prepared = _QueueHandler(None).prepare(record)
+
+    assert (prepared.msg, prepared.args, prepared.exc_info) == ("failed for spokeo", None, None)
+    assert "ValueError: boom" in prepared.exc_text
+    assert (record.msg, record.args, record.exc_info) == ("failed for %s", ("spokeo",), exc_info)
@@ -0,0 +1,17 @@
+import instrument
+from app.core import metrics
+
+
+def test_app_metrics_share_the_cli_recorder():
+    instrument.reset()
+    metrics.enable()
+    try:
+        assert instrument.ENABLED and metrics.enabled()
+        metrics.record("storage.user_brokers_page", 0.25)
+        instrument.count("links_opened")
+        text = metrics.prometheus()
+    finally:
+        metrics.enable(False)
+    assert 'deleteme_op_seconds_total{op="storage.user_brokers_page"} 0.250000' in text
+    assert 'deleteme_events_total{event="links_opened"} 1' in text
+    assert instrument.snapshot()[0]["storage.user_brokers_page"] == (1, 0.25, 0.25)
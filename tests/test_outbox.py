@@ -0,0 +1,207 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.outbox import Outbox, draft_letter, mailto_address, split_draft
+
+
+class StubSMTP:
+    """Just enough of an SMTP server (in the spirit of aiosmtpd) to test the outbox.
+
+    Runs on its own event loop thread. ``replies[address]`` queues RCPT answers for
+    one recipient (``"451 4.7.1 Try later"``); anything unlisted is accepted.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []                   # (recipients, data)
+        self.rcpt_times = defaultdict(list)  # address -> monotonic time of each RCPT
+        self.replies = defaultdict(list)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        start = asyncio.start_server(self._session, "127.0.0.1", 0)
+        self._server = asyncio.run_coroutine_threadsafe(start, self._loop).result()
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _session(self, reader, writer):
+        self.connections += 1
+
+        def reply(line):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 stub ESMTP")
+        recipients = []
+        while line := await reader.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                writer.write(b"250-stub\r\n250 8BITMIME\r\n")
+            elif verb in ("HELO", "NOOP"):
+                reply("250 OK")
+            elif verb in ("MAIL", "RSET"):
+                recipients = []
+                reply("250 OK")
+            elif verb == "RCPT":
+                address = command.partition(":")[2].strip().strip("<>")
+                self.rcpt_times[address].append(time.monotonic())
+                queued = self.replies[address]
+                answer = queued.pop(0) if queued else "250 OK"
+                if answer.startswith("250"):
+                    recipients.append(address)
+                reply(answer)
+            elif verb == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                    data.append(chunk)
+                self.messages.append((recipients, b"".join(data).decode()))
+                reply("250 OK queued")
+            elif verb == "QUIT":
+                reply("221 Bye")
+                await writer.drain()
+                break
+            else:
+                reply("502 Command not implemented")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+def smtp():
+    server = StubSMTP()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def make_outbox(smtp, tmp_path):
+    """``make_outbox(**kwargs)``: an Outbox on a scratch database, sending to ``smtp``."""
+    opened = []
+
+    def make(**kwargs):
+        kwargs = {"sender": "me@deleteme.example", "domain_interval": 0, "backoff": 0.05, **kwargs}
+        outbox = Outbox(str(tmp_path / "outbox.db"), "127.0.0.1", smtp.port, **kwargs)
+        opened.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in opened:
+        outbox.pool.close()
+
+
+def rows(outbox):
+    return outbox._db.execute("SELECT recipient, status, attempts, last_error FROM outbox ORDER BY id").fetchall()
+
+
+def test_pooled_connections_are_reused(smtp, make_outbox):
+    outbox = make_outbox(pool_size=2)
+    for i in range(10):
+        outbox.enqueue(f"privacy@broker{i}.example", f"Opt-out {i}", "Please delete my data.")
+    assert outbox.run_pending() == {'sent': 10}
+    assert len(smtp.messages) == 10
+    assert 1 <= smtp.connections <= 2
+
+
+def test_domain_rate_limit(smtp, make_outbox):
+    outbox = make_outbox(domain_interval=0.3)
+    outbox.enqueue("a@same.example", "One", "body")
+    outbox.enqueue("b@same.example", "Two", "body")
+    assert outbox.run_pending() == {'sent': 2}
+    first, second = smtp.rcpt_times["a@same.example"][0], smtp.rcpt_times["b@same.example"][0]
+    # The interval runs from claim to claim; the first RCPT also waited for the connection.
+    assert second - first >= 0.2
+
+
+def test_temporary_failures_retry_with_backoff(smtp, make_outbox):
+    smtp.replies["privacy@busy.example"] = ["451 4.7.1 Try again later"] * 2
+    outbox = make_outbox(backoff=0.1)
+    outbox.enqueue("privacy@busy.example", "Opt-out", "body")
+    assert outbox.run_pending() == {'sent': 1}
+    assert rows(outbox) == [("privacy@busy.example", "sent", 3, None)]
+    first, second, third = smtp.rcpt_times["privacy@busy.example"]
+    assert second - first >= 0.1
+    assert third - second >= 0.2             # doubled
+    assert len(smtp.messages) == 1
+
+
+def test_permanent_failures_and_exhausted_retries(smtp, make_outbox):
+    smtp.replies["nobody@gone.example"] = ["550 5.1.1 No such user"]
+    smtp.replies["privacy@down.example"] = ["451 4.3.0 Down"] * 5
+    outbox = make_outbox(max_attempts=2, backoff=0.01)
+    outbox.enqueue("nobody@gone.example", "Opt-out", "body")
+    outbox.enqueue("privacy@down.example", "Opt-out", "body")
+    assert outbox.run_pending() == {'failed': 2}
+    (_, _, gone_attempts, gone_error), (_, _, down_attempts, _) = rows(outbox)
+    assert (gone_attempts, down_attempts) == (1, 2)
+    assert "550" in gone_error
+    assert smtp.messages == []
+
+
+def test_crashed_sends_are_requeued_once_the_lease_expires(smtp, make_outbox, tmp_path):
+    outbox = make_outbox()
+    outbox.enqueue("privacy@crash.example", "Opt-out", "body")
+    assert len(outbox._claim(10)) == 1       # claimed, then the process "dies" mid-send
+
+    # A restart while the lease is live must not send it a second time.
+    assert make_outbox().run_pending() == {'sending': 1}
+    assert smtp.messages == []
+
+    with sqlite3.connect(tmp_path / "outbox.db") as db:
+        db.execute("UPDATE outbox SET next_attempt = 0 WHERE status = 'sending'")
+    assert make_outbox().run_pending() == {'sent': 1}
+    assert [recipients for recipients, _ in smtp.messages] == [["privacy@crash.example"]]
+
+
+def test_only_one_outbox_claims_a_message(make_outbox):
+    first, second = make_outbox(), make_outbox()
+    first.enqueue("privacy@race.example", "Opt-out", "body")
+    assert len(first._claim(10)) == 1
+    assert second._claim(10) == []
+
+
+def test_mailto_address():
+    assert mailto_address("mailto:Privacy@exl.example?Subject=Opt%20Out") == "Privacy@exl.example"
+    assert mailto_address("https://exl.example/privacy") is None
+
+
+def test_letter_splits_into_subject_and_body():
+    subject, body = split_draft(draft_letter("Ada Lovelace", "Carney Direct"))
+    assert subject == "Data Privacy Request – Ada Lovelace"
+    assert body.startswith("Dear Carney Direct Privacy Team,")
+
+
+def test_email_route_queues_the_letter(web, tmp_path, monkeypatch):
+    storage = web.app.state.storage
+    storage.import_brokers([{'name': "Mail Only Broker", 'opt_out_link': "mailto:optout@mailonly.example"},
+                            {'name': "Web Only Broker", 'opt_out_link': "https://webonly.example/optout"}])
+    ids = {b['name']: b['id'] for b in storage.brokers_page(0, 100000)}
+    user_id = web.post("/users/create", json={"name": "emailer"}).json()["user"]["id"]
+    url = f"/users/{user_id}/brokers/{{}}/email"
+
+    assert web.post(url.format(ids["Mail Only Broker"])).status_code == 503
+
+    outbox = Outbox(str(tmp_path / "outbox.db"), "localhost", 1)   # never started
+    monkeypatch.setattr(web.app.state, "outbox", outbox)
+    resp = web.post(url.format(ids["Mail Only Broker"]))
+    assert resp.status_code == 202
+    assert resp.json()["to"] == "optout@mailonly.example"
+    assert outbox.counts() == {'queued': 1}
+    assert web.post(url.format(ids["Web Only Broker"])).status_code == 409
+    assert TestClient(web.app).post(url.format(ids["Mail Only Broker"])).status_code == 401
@@ -0,0 +1,74 @@
+import os
+import random
+import time
+
+from quote_pool import FALLBACK_QUOTE, QuoteFile, QuotePool
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def all_quotes(pool):
+    return {quote for source in pool._sources() for quote in (source[i] for i in range(len(source)))}
+
+
+def test_quote_file_formats(tmp_path):
+    fortune = QuoteFile(write(tmp_path / "f.txt", "First,\ntwo lines\n%\n  \n%\nSecond\n% \nThird"))
+    assert [fortune[i] for i in range(len(fortune))] == ["First,\ntwo lines", "Second", "Third"]
+    lines = QuoteFile(write(tmp_path / "l.txt", "# my quotes\nOne\n\nTwo\n"))
+    assert [lines[i] for i in range(len(lines))] == ["One", "Two"]
+    assert len(QuoteFile(write(tmp_path / "empty.txt", ""))) == 0
+
+
+def test_empty_pool_falls_back(tmp_path):
+    pool = QuotePool(str(tmp_path / "missing.txt"), [str(tmp_path / "also-missing.txt")]).load()
+    assert len(pool) == 0
+    assert pool.pick() == FALLBACK_QUOTE
+
+
+def test_refresh_replaces_the_bundled_copy(tmp_path):
+    bundled = write(tmp_path / "bundled.txt", "Bundled one\nBundled two\n")
+    custom = write(tmp_path / "custom.txt", "Mine\n")
+    remote = write(tmp_path / "remote.txt", "Remote one\n%\nRemote two\n")
+    cache = str(tmp_path / "cache.txt")
+    pool = QuotePool(bundled, [custom], cache_path=cache, remote_url=f"file://{remote}").load()
+    assert all_quotes(pool) == {"Bundled one", "Bundled two", "Mine"}
+    assert not pool.cache_is_fresh()
+
+    assert pool.refresh()
+    assert all_quotes(pool) == {"Remote one", "Remote two", "Mine"}
+    assert pool.cache_is_fresh()
+    # A new session serves the cached download without going to the network.
+    reloaded = QuotePool(bundled, [custom], cache_path=cache, remote_url="file:///nowhere").load()
+    assert all_quotes(reloaded) == {"Remote one", "Remote two", "Mine"}
+    assert reloaded.pick(random.Random(0)) in {"Remote one", "Remote two", "Mine"}
+
+
+def test_failed_refresh_keeps_the_cached_quotes(tmp_path):
+    cache = write(tmp_path / "cache.txt", "Cached\n")
+    pool = QuotePool(cache_path=cache, remote_url=f"file://{tmp_path}/missing.txt").load()
+    assert not pool.refresh()
+    assert all_quotes(pool) == {"Cached"}
+    with open(cache, encoding='utf-8') as fh:
+        assert fh.read() == "Cached\n"
+
+
+def test_start_refreshes_only_a_stale_cache(tmp_path):
+    remote = write(tmp_path / "remote.txt", "Fresh\n")
+    cache = write(tmp_path / "cache.txt", "Stale\n")
+    stale = time.time() - 2 * 24 * 3600
+    os.utime(cache, (stale, stale))
+
+    offline = QuotePool(cache_path=cache, remote_url=f"file://{remote}").start(offline=True)
+    offline.wait(5)
+    assert all_quotes(offline) == {"Stale"}
+
+    online = QuotePool(cache_path=cache, remote_url=f"file://{remote}").start()
+    online.wait(5)
+    assert all_quotes(online) == {"Fresh"}
+
+    again = QuotePool(cache_path=cache, remote_url=f"file://{tmp_path}/missing.txt").start()
+    again.wait(5)
+    assert all_quotes(again) == {"Fresh"}     # cache is fresh now, so no fetch was tried
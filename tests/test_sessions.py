@@ -0,0 +1,97 @@
+from app.core.sessions import SessionManager, ShardedTTLCache, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a", "gone") == "gone"
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.set("a", 2)       # setting again restarts the clock
+    clock.now = 9.9
+    assert cache.get("a") == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=3, ttl=60, clock=Clock())
+    for key in "abc":
+        cache.set(key, key)
+    cache.get("a")          # now most recent
+    cache.set("b", "B")     # so is b
+    cache.set("d", "d")
+    assert [cache.get(key) for key in "abcd"] == ["a", "B", None, "d"]
+    assert cache.pop("a") == "a" and cache.pop("a") is None
+
+
+def test_sharded_cache_keeps_the_total_size():
+    cache = ShardedTTLCache(maxsize=16, ttl=60, shards=4)
+    for i in range(100):
+        cache.set(i, i)
+    assert len(cache) <= 16
+    assert cache.get(99) == 99
+    cache.clear()
+    assert len(cache) == 0 and cache.get(99) is None
+
+
+class FakeStorage:
+    def __init__(self):
+        self.loads = 0
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def get_user(self, user_id):
+        self.loads += 1
+        return {'id': user_id, 'name': f"user{user_id}"} if user_id < 100 else None
+
+    def status_counts(self, user_id):
+        return {'pending': 3, 'done': 0}
+
+    def notify(self, user_id, change):
+        for callback in self.listeners:
+            callback(user_id, change)
+
+
+def test_sessions_are_signed_and_end():
+    manager = SessionManager(FakeStorage(), secret="test", ttl=60, maxsize=8, shards=1)
+    cookie = manager.create(7)
+    assert manager.user_id(cookie) == 7
+    session_id = cookie.partition(".")[0]
+    assert manager.user_id(session_id + ".forged") is None
+    assert manager.user_id(None) is None
+    assert SessionManager(FakeStorage(), secret="other", ttl=60, maxsize=8, shards=1).user_id(cookie) is None
+    manager.end(cookie)
+    assert manager.user_id(cookie) is None
+
+
+def test_profile_cache_is_dropped_on_status_changes_only():
+    storage = FakeStorage()
+    manager = SessionManager(storage, secret="test", ttl=60, maxsize=8, shards=2)
+    assert manager.profile(1)['user']['name'] == "user1"
+    manager.profile(1)
+    assert storage.loads == 1
+
+    storage.notify(None, {'type': 'link', 'broker_id': 3, 'link_health': 'dead'})
+    manager.profile(1)
+    assert storage.loads == 1
+
+    storage.notify(1, {'type': 'status', 'broker_id': 3, 'status': 'done', 'covered_by': ''})
+    manager.profile(1)
+    storage.notify(None, {'type': 'brokers', 'added': 2})
+    manager.profile(1)
+    assert storage.loads == 3
+    assert manager.profile(500) is None
@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+
+CSV = b"name,opt_out_link\nUpload Test Broker,https://upload-test.example/optout\n"
+
+
+def test_upload_needs_a_session(web):
+    anonymous = TestClient(web.app)
+    resp = anonymous.post("/brokers/upload", content=CSV, headers={"Content-Type": "text/csv"})
+    assert resp.status_code == 401
+
+
+def test_upload_with_a_session(web):
+    web.post("/users/create", json={"name": "uploader"})
+    resp = web.post("/brokers/upload", files={"file": ("brokers.csv", CSV, "text/csv")})
+    assert resp.status_code == 200
+    assert resp.json()["rows"] == 1
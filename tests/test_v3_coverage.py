@@ -0,0 +1,47 @@
+import footprint_scrubber as fs
+
+
+def registry(*covered_by):
+    return fs.BrokerList({'name': f"Broker {i}", 'url': f"https://b{i}.example", 'email': '', 'notes': '',
+                          'covered_by': c, 'status': ''} for i, c in enumerate(covered_by))
+
+
+def names(brokers):
+    return [b['name'] for b in brokers]
+
+
+def test_filter_matches_services_exactly():
+    brokers = registry("Incogni", "", "Rep", "none", "kanary; OneRep", "DeleteMe", "Optery;Incogni")
+    assert names(fs._filter_brokers(brokers, ["OneRep"])) == [
+        "Broker 0", "Broker 1", "Broker 2", "Broker 3", "Broker 5", "Broker 6"]
+    assert names(fs._filter_brokers(brokers, ["incogni", "Kanary"])) == [
+        "Broker 1", "Broker 2", "Broker 3", "Broker 5"]
+    assert fs._filter_brokers(brokers, []) is brokers
+    # Plain lists get a one-off index instead of the cached one.
+    assert names(fs._filter_brokers(list(brokers), ["DeleteMe"])) == names(brokers[:5] + brokers[6:])
+
+
+def test_mark_coverage_only_touches_uncovered_rows():
+    brokers = registry("", "None", "Incogni", "Optery")
+    assert fs.mark_coverage(brokers, "Optery") == 3
+    assert [b['covered_by'] for b in brokers] == ["Optery", "Optery", "Incogni;Optery", "Optery"]
+    assert fs.mark_coverage(brokers, "optery") == 0
+    assert fs._filter_brokers(brokers, ["Optery"]) == []
+    assert names(fs._filter_brokers(brokers, ["Incogni"])) == ["Broker 0", "Broker 1", "Broker 3"]
+
+
+def test_coverage_index_follows_appended_rows():
+    brokers = registry("Incogni")
+    assert fs._filter_brokers(brokers, ["Incogni"]) == []
+    brokers.append({'name': "New", 'url': '', 'email': '', 'notes': '', 'covered_by': '', 'status': ''})
+    assert names(fs._filter_brokers(brokers, ["Incogni"])) == ["New"]
+
+
+def test_auto_mark_coverage_saves_changes(tmp_path, monkeypatch):
+    path = tmp_path / "brokers.csv"
+    monkeypatch.setattr(fs, "BROKERS_FILE", path)
+    fs._save_brokers(registry("", "Kanary"))
+
+    fs.auto_mark_coverage("Kanary")
+
+    assert [b['covered_by'] for b in fs.load_brokers()] == ["Kanary", "Kanary"]
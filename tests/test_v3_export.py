@@ -0,0 +1,58 @@
+import mailbox
+import zipfile
+
+import pytest
+
+import footprint_scrubber as fs
+
+USER = {'full_name': "Jane Doe", 'emails': ["jane@example.com"], 'phone_numbers': ["555-0100"],
+        'addresses': ["1 Main St"]}
+
+
+def broker(name, email="privacy@example.com", covered_by=''):
+    return {'name': name, 'url': '', 'email': email, 'notes': '', 'covered_by': covered_by, 'status': ''}
+
+
+BROKERS = fs.BrokerList([
+    broker("Spokeo"), broker("spokeo"), broker("Acme/Data Inc."), broker("SPOKEO"),
+    broker("Covered", covered_by="Incogni"), broker("No Email", email=''), broker("../"),
+])
+EXPECTED = ["spokeo.txt", "spokeo-2.txt", "acme_data_inc.txt", "spokeo-3.txt", "broker.txt"]
+
+
+def test_letter_filenames_are_safe_and_distinct():
+    assert fs.letter_filenames(b for b in BROKERS if b['email'] and not b['covered_by']) == EXPECTED
+    assert fs.letter_filenames([broker("A"), broker("a")], suffix='.eml') == ["a.eml", "a-2.eml"]
+
+
+@pytest.fixture
+def app_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(fs, "APP_DIR", tmp_path)
+    return tmp_path
+
+
+def test_dir_export(app_dir):
+    out = fs.export_email_templates(BROKERS, USER, ["Incogni"], fmt='dir', workers=3, batch_size=2)
+    assert sorted(p.name for p in out.iterdir()) == sorted(EXPECTED)
+    letter = (out / "acme_data_inc.txt").read_text(encoding='utf-8')
+    assert "Dear Acme/Data Inc. Privacy Team" in letter and "- Email(s): jane@example.com" in letter
+
+
+def test_zip_export_keeps_registry_order(app_dir):
+    out = fs.export_email_templates(BROKERS, USER, ["Incogni"], fmt='zip', workers=3, batch_size=2)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == EXPECTED
+        assert "Dear SPOKEO Privacy Team" in zf.read("spokeo-3.txt").decode('utf-8')
+
+
+def test_mbox_export(app_dir):
+    out = fs.export_email_templates(BROKERS, USER, ["Incogni"], fmt='mbox', workers=3, batch_size=2)
+    messages = list(mailbox.mbox(str(out)))
+    assert len(messages) == len(EXPECTED)
+    assert [m['To'] for m in messages] == ["privacy@example.com"] * len(EXPECTED)
+    assert "Dear Acme/Data Inc. Privacy Team" in messages[2].get_payload()
+
+
+def test_unknown_format_is_rejected(app_dir):
+    with pytest.raises(ValueError):
+        fs.export_email_templates(BROKERS, USER, [], fmt='pdf')
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("cryptography")
+from cryptography.fernet import Fernet  # noqa: E402
+
+import footprint_scrubber as fs  # noqa: E402
+
+PROFILE = {'full_name': "Jane Doe", 'emails': ["jane@example.com"], 'usernames': [],
+           'phone_numbers': ["555-0100"], 'addresses': ["1 Main St"]}
+
+
+@pytest.fixture
+def v3_files(tmp_path, monkeypatch):
+    # A cheap scrypt cost keeps the tests fast; the format is the same.
+    monkeypatch.setattr(fs, "VAULT_KDF", {'n': 2 ** 10, 'r': 8, 'p': 1})
+    monkeypatch.setattr(fs, "VAULT_FILE", tmp_path / "user_data.vault")
+    monkeypatch.setattr(fs, "USER_DATA_FILE", tmp_path / "user_data.enc")
+    monkeypatch.setattr(fs, "_vault", None)
+    return tmp_path
+
+
+def passphrases(monkeypatch, *answers):
+    replies = iter(answers)
+    monkeypatch.setattr(fs.getpass, "getpass", lambda prompt="": next(replies))
+
+
+def test_vault_round_trip(v3_files):
+    vault = fs.ProfileVault(fs.VAULT_FILE)
+    assert not vault.exists
+    vault.create("correct horse")
+    vault.update(PROFILE)
+
+    assert os.stat(fs.VAULT_FILE).st_mode & 0o777 == 0o600
+    raw = fs.VAULT_FILE.read_text(encoding='utf-8')
+    assert "Jane" not in raw and "555-0100" not in raw
+    assert set(json.loads(raw)['fields']) == set(PROFILE)
+
+    reopened = fs.ProfileVault(fs.VAULT_FILE)
+    with pytest.raises(ValueError):
+        reopened.unlock("wrong")
+    assert not reopened.unlocked
+    reopened.unlock("correct horse")
+    assert {field: reopened[field] for field in PROFILE} == PROFILE
+    assert reopened.get('missing', []) == []
+
+
+def test_legacy_user_data_is_migrated_into_the_vault(v3_files, monkeypatch):
+    key = Fernet.generate_key()
+    fs.USER_DATA_FILE.with_suffix('.key').write_bytes(key)
+    fs.USER_DATA_FILE.write_bytes(Fernet(key).encrypt(json.dumps(PROFILE).encode()))
+    passphrases(monkeypatch, "one", "two", "s3cret", "s3cret")   # a mismatch first
+
+    data = fs.load_user_data()
+
+    assert data['full_name'] == "Jane Doe" and data['emails'] == ["jane@example.com"]
+    assert not fs.USER_DATA_FILE.exists() and not fs.USER_DATA_FILE.with_suffix('.key').exists()
+    assert fs.open_vault() is data      # unlocked once per session
+    vault = fs.ProfileVault(fs.VAULT_FILE)
+    vault.unlock("s3cret")
+    assert vault['addresses'] == ["1 Main St"]
+
+
+def test_three_wrong_passphrases_leave_the_vault_locked(v3_files, monkeypatch, capsys):
+    fs.ProfileVault(fs.VAULT_FILE).create("s3cret")
+    passphrases(monkeypatch, "a", "b", "c")
+    assert fs.open_vault() is None
+    assert capsys.readouterr().out.count("Wrong passphrase.") == 3
+    assert fs._vault is None
@@ -0,0 +1,41 @@
+import argparse
+import hashlib
+import os
+
+import deleteMe
+import instrument
+
+
+def test_open_link_opens_the_browser(monkeypatch):
+    opened = []
+    monkeypatch.setattr(deleteMe.webbrowser, "open", opened.append)
+    instrument.reset()
+    instrument.enable()
+    try:
+        deleteMe.open_link("https://spokeo.example/optout")
+    finally:
+        instrument.enable(False)
+
+    assert opened == ["https://spokeo.example/optout"]
+    timings, counters = instrument.snapshot()
+    assert counters["links_opened"] == 1
+    assert timings["open_link"][0] == 1
+
+
+def test_check_links_leaves_the_bundled_registry_alone(monkeypatch, tmp_path, capsys):
+    import link_checker     # imported lazily by deleteMe as well
+
+    def digest():
+        with open(deleteMe.BUNDLED_BROKERS_FILE, 'rb') as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+
+    before = digest()
+    monkeypatch.setattr(link_checker, "check_registry", lambda brokers, cache_path, **kw: {0: 'dead', 1: 'ok'})
+    monkeypatch.setattr(deleteMe, "LINK_CACHE_FILE", str(tmp_path / "link_cache.json"))
+    deleteMe.check_links(argparse.Namespace(user=None, concurrency=1, per_host=1, interval=0))
+
+    assert digest() == before
+    bundled_dir = os.path.dirname(deleteMe.BUNDLED_BROKERS_FILE)
+    assert not [name for name in os.listdir(bundled_dir) if name.startswith("brokers.csv.")]
+    out = capsys.readouterr().out
+    assert "results are kept in" in out and "• dead: 1" in out
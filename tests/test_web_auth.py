@@ -0,0 +1,60 @@
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+_names = itertools.count()
+
+
+def sign_in(client, prefix="user"):
+    """Sign a fresh user in on ``client``; returns the user's id."""
+    resp = client.post("/users/create", json={"name": f"{prefix}{next(_names)}"})
+    assert resp.status_code == 200
+    return resp.json()["user"]["id"]
+
+
+def broker_id(client, user_id):
+    return client.get(f"/users/{user_id}/brokers", params={"limit": 1}).json()["items"][0]["id"]
+
+
+@pytest.mark.parametrize("method, path", [
+    ("get", "/users/{uid}"),
+    ("get", "/users/{uid}/counts"),
+    ("get", "/users/{uid}/brokers"),
+])
+def test_user_routes_need_a_session(web, method, path):
+    uid = sign_in(web)
+    anonymous = TestClient(web.app)
+    assert getattr(anonymous, method)(path.format(uid=uid)).status_code == 401
+    assert getattr(web, method)(path.format(uid=uid)).status_code == 200
+
+
+def test_other_users_are_forbidden(web):
+    alice = sign_in(web, "alice")
+    bid = broker_id(web, alice)
+    mallory = TestClient(web.app)
+    sign_in(mallory, "mallory")
+
+    assert mallory.get(f"/users/{alice}").status_code == 403
+    assert mallory.get(f"/users/{alice}/counts").status_code == 403
+    assert mallory.get(f"/users/{alice}/brokers").status_code == 403
+    resp = mallory.put(f"/users/{alice}/brokers/{bid}", json={"status": "done"})
+    assert resp.status_code == 403
+    assert web.get(f"/users/{alice}/counts").json()["done"] == 0
+
+
+def test_own_status_change(web):
+    uid = sign_in(web)
+    bid = broker_id(web, uid)
+    resp = web.put(f"/users/{uid}/brokers/{bid}", json={"status": "done", "covered_by": "manual"})
+    assert resp.json() == {"ok": True, "changed": True}
+    assert web.get(f"/users/{uid}/counts").json()["done"] == 1
+
+
+def test_start_session_and_dashboard(web):
+    name = f"starter{next(_names)}"
+    resp = web.post("/start", data={"username": name}, follow_redirects=False)
+    assert resp.status_code == 303 and resp.headers["location"] == "/welcome"
+    page = web.get("/welcome")
+    assert page.status_code == 200 and f"Welcome back, {name}!" in page.text
+    assert TestClient(web.app).get("/welcome", follow_redirects=False).status_code == 303